@@ -1,11 +1,11 @@
 from django.contrib import admin
-from .models import Document, DocumentVersion
+from .models import Document, DocumentVersion, DocumentImportJob
 
 
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
-    list_display = ('title', 'user', 'file_type', 'created_at', 'updated_at')
-    list_filter = ('file_type', 'created_at')
+    list_display = ('title', 'user', 'file_type', 'status', 'created_at', 'updated_at')
+    list_filter = ('file_type', 'status', 'created_at')
     search_fields = ('title', 'user__email')
     readonly_fields = ('id', 'created_at', 'updated_at')
 
@@ -14,3 +14,10 @@ class DocumentAdmin(admin.ModelAdmin):
 class DocumentVersionAdmin(admin.ModelAdmin):
     list_display = ('document', 'version_number', 'created_at')
     list_filter = ('created_at',)
+
+
+@admin.register(DocumentImportJob)
+class DocumentImportJobAdmin(admin.ModelAdmin):
+    list_display = ('document', 'status', 'progress', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    readonly_fields = ('id', 'created_at', 'started_at', 'finished_at')
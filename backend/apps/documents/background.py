@@ -0,0 +1,27 @@
+"""
+Background services of web server processes.
+
+Started from the WSGI/ASGI entry points, so they run once in each web
+worker and never in management commands or the conversion worker
+processes they spawn. With a pre-forking server, load the application in
+each worker (no ``--preload``), as threads do not survive a fork.
+"""
+import threading
+
+from .conversion import get_scratch_sweeper
+from .import_jobs import get_import_pool
+
+_started = False
+_lock = threading.Lock()
+
+
+def start_background_services():
+    """Start this process's import job heartbeat and recovery, and the scratch sweeper."""
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    # Creating the pool takes over imports orphaned by a restart right away
+    get_import_pool()
+    get_scratch_sweeper()
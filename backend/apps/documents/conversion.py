@@ -0,0 +1,251 @@
+"""
+Converter services configured from Django settings.
+"""
+import os
+import atexit
+import hashlib
+import tempfile
+import threading
+from typing import Optional
+
+from django.conf import settings
+
+from services.document_converter import (
+    DocumentConverter,
+    ConversionCache,
+    ExportCache,
+    PreviewCache,
+    MemoryPreviewCache,
+    DiskPreviewCache,
+    RedisPreviewCache,
+    ScratchSweeper,
+    MediaStore,
+    IncrementalConverter,
+    OfficeConverter,
+    create_office_pool,
+    ConversionSandbox,
+    get_converter,
+)
+from services.document_converter.docx_output import OUTPUT_VERSION
+from services.document_converter.fragment_cache import shared_fragment_cache
+
+_cache_instance: Optional[ConversionCache] = None
+_export_cache_instance: Optional[ExportCache] = None
+_preview_cache_instance: Optional[PreviewCache] = None
+_media_store_instance: Optional[MediaStore] = None
+_office_pool_instance: Optional[OfficeConverter] = None
+_sandbox_instance: Optional[ConversionSandbox] = None
+_sweeper_instance: Optional[ScratchSweeper] = None
+_lock = threading.Lock()
+
+
+def get_conversion_cache() -> ConversionCache:
+    """Get global docx to HTML conversion cache."""
+    global _cache_instance
+    if _cache_instance is None:
+        with _lock:
+            if _cache_instance is None:
+                _cache_instance = ConversionCache(
+                    cache_dir=os.path.join(settings.MEDIA_ROOT, 'cache', 'conversions'),
+                    max_bytes=settings.CONVERSION_CACHE_MAX_MB * 1024 * 1024,
+                )
+    return _cache_instance
+
+
+def get_export_cache() -> ExportCache:
+    """Get global cache of generated docx exports."""
+    global _export_cache_instance
+    if _export_cache_instance is None:
+        with _lock:
+            if _export_cache_instance is None:
+                _export_cache_instance = ExportCache(
+                    cache_dir=os.path.join(settings.MEDIA_ROOT, 'cache', 'exports'),
+                    max_bytes=settings.EXPORT_CACHE_MAX_MB * 1024 * 1024,
+                )
+    return _export_cache_instance
+
+
+def get_preview_cache() -> PreviewCache:
+    """Get the preview cache backend selected by PREVIEW_CACHE_BACKEND."""
+    global _preview_cache_instance
+    if _preview_cache_instance is None:
+        with _lock:
+            if _preview_cache_instance is None:
+                backend = settings.PREVIEW_CACHE_BACKEND
+                max_bytes = settings.PREVIEW_CACHE_MAX_MB * 1024 * 1024
+                ttl = settings.PREVIEW_CACHE_TTL
+                if backend == 'redis':
+                    import redis
+                    _preview_cache_instance = RedisPreviewCache(
+                        redis.Redis.from_url(settings.REDIS_URL), max_bytes=max_bytes, ttl=ttl,
+                    )
+                elif backend == 'disk':
+                    _preview_cache_instance = DiskPreviewCache(
+                        cache_dir=os.path.join(settings.MEDIA_ROOT, 'cache', 'previews'),
+                        max_bytes=max_bytes, ttl=ttl,
+                    )
+                elif backend == 'memory':
+                    _preview_cache_instance = MemoryPreviewCache(max_bytes=max_bytes, ttl=ttl)
+                else:
+                    raise ValueError(f'Unknown PREVIEW_CACHE_BACKEND: {backend}')
+    return _preview_cache_instance
+
+
+def get_media_store() -> MediaStore:
+    """Get global store for images extracted from documents."""
+    global _media_store_instance
+    if _media_store_instance is None:
+        with _lock:
+            if _media_store_instance is None:
+                _media_store_instance = MediaStore(
+                    root_dir=os.path.join(settings.MEDIA_ROOT, 'images'),
+                    base_url=settings.DOCUMENT_IMAGE_URL,
+                    # Content imported before DOCUMENT_IMAGE_URL still references MEDIA_URL
+                    aliases=[f'{settings.MEDIA_URL}images/'],
+                )
+    return _media_store_instance
+
+
+def get_scratch_dir() -> str:
+    """Directory generated docx files too large for memory are written to."""
+    return settings.DOCX_SCRATCH_DIR or os.path.join(tempfile.gettempdir(), 'doc-studio-scratch')
+
+
+def build_scratch_sweeper() -> ScratchSweeper:
+    """Create a sweeper of abandoned scratch and cache temp files, not yet started."""
+    return ScratchSweeper(
+        scratch_dir=get_scratch_dir(),
+        max_age=settings.SCRATCH_MAX_AGE,
+        max_bytes=settings.SCRATCH_MAX_MB * 1024 * 1024,
+        cache_dirs=[os.path.join(settings.MEDIA_ROOT, 'cache')],
+        interval=settings.SCRATCH_SWEEP_INTERVAL,
+    )
+
+
+def get_scratch_sweeper() -> ScratchSweeper:
+    """
+    Get global scratch sweeper, sweeping in the background if enabled.
+
+    Only web workers call this (see apps.documents.background); converters
+    use get_scratch_dir, so commands and worker processes never sweep.
+    """
+    global _sweeper_instance
+    if _sweeper_instance is None:
+        with _lock:
+            if _sweeper_instance is None:
+                _sweeper_instance = build_scratch_sweeper()
+                if settings.SCRATCH_SWEEP_INTERVAL > 0:
+                    _sweeper_instance.start()
+                    atexit.register(_sweeper_instance.stop)
+    return _sweeper_instance
+
+
+def get_conversion_sandbox() -> Optional[ConversionSandbox]:
+    """Get global sandbox process pool, or None if disabled."""
+    global _sandbox_instance
+    if _sandbox_instance is None and settings.CONVERSION_SANDBOX_WORKERS > 0:
+        with _lock:
+            if _sandbox_instance is None:
+                _sandbox_instance = ConversionSandbox(
+                    workers=settings.CONVERSION_SANDBOX_WORKERS,
+                    timeout=settings.CONVERSION_TIMEOUT,
+                    max_memory_mb=settings.CONVERSION_MAX_MEMORY_MB,
+                    max_rss_mb=settings.CONVERSION_MAX_RSS_MB,
+                    max_jobs_per_worker=settings.CONVERSION_MAX_JOBS_PER_WORKER,
+                )
+                atexit.register(_sandbox_instance.shutdown)
+    return _sandbox_instance
+
+
+def get_document_converter(sandboxed: bool = True,
+                           timeout: Optional[int] = None) -> DocumentConverter:
+    """
+    Get a DocumentConverter backed by the shared cache and media store.
+
+    Args:
+        sandboxed: Run conversions in the sandbox pool; callers that are
+            already isolated worker processes pass False
+        timeout: Seconds each sandboxed conversion may take, instead of
+            CONVERSION_TIMEOUT
+    """
+    return DocumentConverter(
+        cache=get_conversion_cache(),
+        media_store=get_media_store(),
+        sandbox=get_conversion_sandbox() if sandboxed else None,
+        streaming_threshold_bytes=settings.DOCUMENT_STREAMING_IMPORT_THRESHOLD_MB * 1024 * 1024,
+        html_parser=settings.HTML_PARSER,
+        docx_engine=settings.DOCX_WRITER_ENGINE,
+        template_path=settings.DOCX_TEMPLATE_PATH or None,
+        max_memory_bytes=settings.DOCX_OUTPUT_MAX_MEMORY_MB * 1024 * 1024,
+        scratch_dir=get_scratch_dir(),
+        timeout=timeout,
+    )
+
+
+def docx_output_key(document, kind: str) -> str:
+    """
+    Hash of everything that shapes a document's generated docx.
+
+    Combines the fingerprint stored on the row with the settings that shape
+    the output, so changing them yields a new key.
+
+    Args:
+        document: Document model instance
+        kind: 'preview' or 'export'
+    """
+    template = settings.DOCX_TEMPLATE_PATH
+    template_mtime = os.path.getmtime(template) if template and os.path.exists(template) else 0
+    key = ':'.join(str(part) for part in (
+        kind, document.get_content_fingerprint(), OUTPUT_VERSION,
+        settings.DOCX_WRITER_ENGINE, settings.HTML_PARSER, template, template_mtime,
+    ))
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def docx_etag(document, kind: str) -> str:
+    """
+    ETag of a document's generated docx (see docx_output_key).
+
+    Exports are cached and served byte for byte, so their ETag is strong.
+    Preview packages are rebuilt incrementally and only equivalent in
+    content between requests, so theirs is weak.
+    """
+    etag = '"%s"' % docx_output_key(document, kind)
+    return f'W/{etag}' if kind == 'preview' else etag
+
+
+def get_preview_converter() -> IncrementalConverter:
+    """Get the global IncrementalConverter wired to the media store and sandbox."""
+    return get_converter(
+        media_store=get_media_store(),
+        sandbox=get_conversion_sandbox(),
+        html_parser=settings.HTML_PARSER,
+        docx_engine=settings.DOCX_WRITER_ENGINE,
+        template_path=settings.DOCX_TEMPLATE_PATH or None,
+        max_memory_bytes=settings.DOCX_OUTPUT_MAX_MEMORY_MB * 1024 * 1024,
+        compress_level=settings.DOCX_PREVIEW_COMPRESS_LEVEL,
+        cache=get_preview_cache(),
+        scratch_dir=get_scratch_dir(),
+        fragments=shared_fragment_cache(settings.FRAGMENT_CACHE_MAX_MB * 1024 * 1024),
+    )
+
+
+def get_office_pool() -> OfficeConverter:
+    """Get global pool of LibreOffice workers for this process (see create_office_pool)."""
+    global _office_pool_instance
+    if _office_pool_instance is None:
+        with _lock:
+            if _office_pool_instance is None:
+                office_root = os.path.join(tempfile.gettempdir(), 'doc-studio-office')
+                _office_pool_instance = create_office_pool(
+                    size=settings.OFFICE_POOL_SIZE,
+                    profile_root=os.path.join(office_root, str(os.getpid())),
+                    # Processes on this host reserve ports through lock files here
+                    port_lock_dir=os.path.join(office_root, 'ports'),
+                    base_port=settings.OFFICE_POOL_BASE_PORT,
+                    max_jobs_per_worker=settings.OFFICE_MAX_JOBS_PER_WORKER,
+                    soffice_path=settings.SOFFICE_PATH,
+                    timeout=settings.OFFICE_CONVERT_TIMEOUT,
+                )
+                atexit.register(_office_pool_instance.shutdown)
+    return _office_pool_instance
@@ -0,0 +1,227 @@
+"""
+Background import jobs for uploaded documents.
+
+Conversion runs on a bounded thread pool so the upload request can return
+immediately while mammoth works on the file. The queue itself lives in the
+web process, so each pool records itself as the owner of its jobs and keeps
+their heartbeat fresh; jobs whose owner stopped (a deploy, a crashed worker)
+are taken over by another pool, or failed once they ran too often.
+"""
+import os
+import time
+import socket
+import logging
+import threading
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from services.document_converter import ConversionError, convert_legacy_format
+from services.document_converter.docx_output import content_fingerprint
+
+from .models import Document, DocumentImportJob
+from .conversion import get_document_converter, get_office_pool
+
+logger = logging.getLogger(__name__)
+
+# Seconds between heartbeats of a pool's jobs; three missed ones orphan a job
+HEARTBEAT_INTERVAL = 30
+# Seconds between attempts while every sandbox worker is busy
+BUSY_RETRY_DELAY = 5
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class ImportQueueFull(Exception):
+    """Raised when the import backlog has reached its limit."""
+
+
+class ImportJobPool:
+    """Bounded pool of workers running document import jobs.
+
+    A background thread refreshes the heartbeat of the pool's jobs every
+    ``heartbeat_interval`` seconds and takes over orphaned ones, starting
+    with a pass as soon as the pool is created.
+    """
+
+    def __init__(self, max_workers: int, max_queued: int, max_attempts: int = 3,
+                 heartbeat_interval: int = HEARTBEAT_INTERVAL):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='doc-import'
+        )
+        # Caps running + queued jobs so a burst of uploads cannot pile up unbounded work
+        self._slots = threading.BoundedSemaphore(max_workers + max_queued)
+        self.max_attempts = max_attempts
+        self.heartbeat_interval = heartbeat_interval
+        self.owner = f'{socket.gethostname()}:{os.getpid()}'
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name='doc-import-heartbeat', daemon=True)
+        self._thread.start()
+
+    def submit(self, job: DocumentImportJob):
+        """Queue a job for conversion."""
+        if not self._slots.acquire(blocking=False):
+            raise ImportQueueFull('Import queue is full, try again later')
+        try:
+            DocumentImportJob.objects.filter(id=job.id).update(
+                owner=self.owner, heartbeat_at=timezone.now()
+            )
+            self._executor.submit(self._run, job.id)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def stop(self):
+        """Stop the heartbeat thread; queued jobs are taken over elsewhere."""
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _watch(self):
+        while True:
+            try:
+                self.heartbeat()
+                self.recover()
+            except Exception:
+                logger.exception('Import job heartbeat failed')
+            finally:
+                close_old_connections()
+            if self._stop.wait(self.heartbeat_interval):
+                return
+
+    def heartbeat(self):
+        """Mark this pool's queued and running jobs as alive."""
+        DocumentImportJob.objects.filter(
+            owner=self.owner, status__in=ACTIVE_STATUSES
+        ).update(heartbeat_at=timezone.now())
+
+    def recover(self) -> int:
+        """
+        Take over jobs whose owner stopped sending heartbeats.
+
+        Jobs that already ran ``max_attempts`` times are failed instead, so
+        a file that keeps killing its process cannot loop forever.
+
+        Returns:
+            Number of jobs queued here
+        """
+        cutoff = timezone.now() - timedelta(seconds=3 * self.heartbeat_interval)
+        stale = DocumentImportJob.objects.filter(status__in=ACTIVE_STATUSES).filter(
+            Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, created_at__lt=cutoff)
+        ).exclude(owner=self.owner).order_by('created_at')
+
+        recovered = 0
+        for job in stale:
+            if job.attempts >= self.max_attempts:
+                if self._claim(job, status='failed', finished_at=timezone.now(),
+                               error='Import was interrupted too many times'):
+                    Document.objects.filter(id=job.document_id).update(status='failed')
+                    logger.warning('Import job %s failed after %d attempts', job.id, job.attempts)
+                continue
+
+            if not self._slots.acquire(blocking=False):
+                break  # Full; the rest wait for the next pass
+            if self._claim(job, status='queued'):
+                self._executor.submit(self._run, job.id)
+                logger.info('Requeued import job %s from %s', job.id, job.owner or 'unknown')
+                recovered += 1
+            else:
+                self._slots.release()
+        return recovered
+
+    def _claim(self, job: DocumentImportJob, **fields) -> bool:
+        """Make this pool the job's owner unless another process got there first."""
+        return DocumentImportJob.objects.filter(
+            id=job.id, owner=job.owner, heartbeat_at=job.heartbeat_at, status=job.status
+        ).update(owner=self.owner, heartbeat_at=timezone.now(), **fields) == 1
+
+    def _run(self, job_id):
+        close_old_connections()
+        try:
+            run_import_job(job_id)
+        except Exception:
+            logger.exception('Import job %s crashed', job_id)
+        finally:
+            self._slots.release()
+            close_old_connections()
+
+
+def run_import_job(job_id):
+    """Convert the document attached to an import job and record the outcome."""
+    job = DocumentImportJob.objects.select_related('document').get(id=job_id)
+    document = job.document
+
+    job.status = 'running'
+    job.progress = 10
+    job.started_at = timezone.now()
+    job.attempts += 1
+    job.save(update_fields=['status', 'progress', 'started_at', 'attempts'])
+
+    try:
+        file_path = convert_legacy_format(get_office_pool(), document.file_path)
+        if file_path != document.file_path:
+            Document.objects.filter(id=document.id).update(file_path=file_path)
+
+        content_html = _convert(job_id, file_path, document.file_hash or None)
+    except Exception as e:
+        logger.warning('Import job %s failed: %s', job_id, e)
+        job.status = 'failed'
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        Document.objects.filter(id=document.id).update(status='failed')
+        return
+
+    job.progress = 90
+    job.save(update_fields=['progress'])
+
+    Document.objects.filter(id=document.id).update(
+        content_html=content_html,
+        content_fingerprint=content_fingerprint(document.title, content_html),
+        status='ready',
+        updated_at=timezone.now(),
+    )
+
+    job.status = 'succeeded'
+    job.progress = 100
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'progress', 'finished_at'])
+
+
+def _convert(job_id, file_path: str, content_hash: Optional[str]) -> str:
+    """Convert with the import time limit, waiting while the sandbox is busy."""
+    timeout = settings.DOCUMENT_IMPORT_TIMEOUT
+    converter = get_document_converter(timeout=timeout)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return converter.docx_to_html(file_path, content_hash=content_hash)
+        except ConversionError as e:
+            if e.code != 'busy' or time.monotonic() >= deadline:
+                raise
+            logger.info('Import job %s is waiting for a conversion worker', job_id)
+            time.sleep(BUSY_RETRY_DELAY)
+
+
+# Global pool instance
+_pool_instance: Optional[ImportJobPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_import_pool() -> ImportJobPool:
+    """Get global import job pool."""
+    global _pool_instance
+    if _pool_instance is None:
+        with _pool_lock:
+            if _pool_instance is None:
+                _pool_instance = ImportJobPool(
+                    max_workers=settings.DOCUMENT_IMPORT_WORKERS,
+                    max_queued=settings.DOCUMENT_IMPORT_MAX_QUEUED,
+                    max_attempts=settings.DOCUMENT_IMPORT_MAX_ATTEMPTS,
+                )
+    return _pool_instance
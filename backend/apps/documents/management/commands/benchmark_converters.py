@@ -0,0 +1,287 @@
+"""Benchmark HTML to docx conversion on generated documents."""
+import re
+import time
+import zipfile
+
+from django.core.management.base import BaseCommand, CommandError
+from docx import Document
+
+from services.document_converter import (
+    DocumentConverter, DocumentDiff, DocumentStructure, DocxOutput, FragmentCache,
+    IncrementalConverter,
+)
+from services.document_converter.incremental_converter import ChangeType
+from services.document_converter.html_parser import PARSERS, parse_html
+from services.document_converter.ooxml_writer import ENGINES
+
+
+def generate_html(blocks: int) -> str:
+    """Build an editor-style HTML document with the given number of blocks."""
+    parts = []
+    for i in range(blocks):
+        kind = i % 10
+        if kind == 0:
+            parts.append(f'<h2>Section {i}</h2>')
+        elif kind == 3:
+            parts.append(
+                f'<ul><li>Item {i} one</li><li>Item {i} <strong>two</strong></li></ul>'
+            )
+        elif kind == 6:
+            parts.append(
+                '<table><tr><th>Key</th><th>Value</th></tr>'
+                f'<tr><td>row {i}</td><td>{i * 7}</td></tr></table>'
+            )
+        elif kind == 5:
+            # Pasted content: every fragment wrapped in the same inline style
+            span = '<span style="font-family: Calibri; font-size: 11pt; color: #333">'
+            parts.append(
+                f'<p style="margin-bottom: 8pt; line-height: 115%">{span}Pasted </span>'
+                f'{span}paragraph {i} </span>{span}split into </span>{span}many spans.</span></p>'
+            )
+        elif kind == 8:
+            parts.append(f'<blockquote>Quoted paragraph {i}</blockquote>')
+        else:
+            parts.append(
+                f'<p style="text-align: justify">Paragraph {i} with <strong>bold</strong>, '
+                f'<em>italic</em> and <span style="color: #c00; font-size: 14pt">styled</span> '
+                'text that runs long enough to look like real prose.</p>'
+            )
+    return ''.join(parts)
+
+
+def generate_table_html(rows: int, cols: int = 6) -> str:
+    """Build one HTML table with a header row, a merged cell every 10 rows and styled cells."""
+    parts = ['<table><tr>', *(f'<th>Column {j}</th>' for j in range(cols)), '</tr>']
+    for i in range(rows):
+        parts.append('<tr>')
+        if i % 10 == 0:
+            parts.append(f'<td colspan="2" rowspan="2" style="background-color: #eef">Group {i}</td>')
+            first = 2
+        elif i % 10 == 1:
+            first = 2
+        else:
+            first = 0
+        for j in range(first, cols):
+            parts.append(f'<td>r{i}c{j} <strong>{i * j}</strong></td>')
+        parts.append('</tr>')
+    parts.append('</table>')
+    return ''.join(parts)
+
+
+def rewrite_html(html: str, edited) -> str:
+    """Change the text of the headings, paragraphs and quotes whose block number passes edited."""
+    def rewrite(match):
+        number = int(match.group(2))
+        return f'{match.group(1)} {number} (edited)' if edited(number) else match.group(0)
+    return re.sub(r'(Section|Paragraph|Quoted paragraph) (\d+)', rewrite, html)
+
+
+# Cell-by-cell filling is quadratic in the row count; larger tables skip it
+CELL_BY_CELL_MAX_ROWS = 2000
+
+# The full LCS table is quadratic in memory; larger documents skip it
+LCS_TABLE_MAX_BLOCKS = 2000
+
+# Fragment cache budget for the warm-cache preview cases
+FRAGMENT_CACHE_BYTES = 256 * 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = 'Benchmark HTML parsing and HTML to docx conversion'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--blocks', default='10,100,1000,10000',
+            help='Comma-separated document sizes in blocks (e.g. 10,1000,100000)'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=1,
+            help='Runs per measurement; the fastest is reported'
+        )
+        parser.add_argument(
+            '--table-rows', default='',
+            help='Also benchmark single tables of these row counts (e.g. 100,1000,10000)'
+        )
+        parser.add_argument(
+            '--diff-blocks', default='',
+            help='Also benchmark DocumentDiff on documents of these sizes (e.g. 1000,10000)'
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Also verify that every docx engine writes byte-identical packages'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['blocks'].split(',') if size]
+            table_sizes = [int(size) for size in options['table_rows'].split(',') if size]
+            diff_sizes = [int(size) for size in options['diff_blocks'].split(',') if size]
+        except ValueError:
+            raise CommandError(
+                '--blocks, --table-rows and --diff-blocks must be comma-separated lists of integers'
+            )
+        self.repeat = max(1, options['repeat'])
+        self.style_cache_info = {}
+
+        self.stdout.write(f'{"size":>8}  {"case":<40}{"seconds":>10}')
+        for blocks in sizes:
+            html = generate_html(blocks)
+            if options['check']:
+                self._check_engines(blocks, html)
+            for name, run in self._cases(html):
+                self.stdout.write(f'{blocks:>8}  {name:<40}{self._measure(run):>10.3f}')
+            for name, run in self._fragment_cases(html, blocks):
+                self.stdout.write(f'{blocks:>8}  {name:<40}{self._measure(run):>10.3f}')
+            for name, info in self.style_cache_info.items():
+                self.stdout.write(
+                    f'{blocks:>8}  style cache {name}: {info["hits"]} hits, '
+                    f'{info["misses"]} misses ({info["hit_rate"]:.1%})'
+                )
+
+        for rows in table_sizes:
+            html = generate_table_html(rows)
+            for name, run in self._table_cases(html, rows):
+                self.stdout.write(f'{rows:>8}  {name:<40}{self._measure(run):>10.3f}')
+
+        for blocks in diff_sizes:
+            for name, run in self._diff_cases(blocks, options['check']):
+                self.stdout.write(f'{blocks:>8}  {name:<40}{self._measure(run):>10.3f}')
+
+    def _cases(self, html):
+        """Yield (name, callable) pairs to time for one document."""
+        for parser in PARSERS:
+            yield f'parse/{parser}', lambda p=parser: DocumentStructure(html, parser=p)
+
+        # The previous path: html.parser, with every paragraph parsed a second time
+        yield 'preview/html.parser+reparse', lambda: self._preview(
+            html, 'html.parser', 'python-docx', reparse=True
+        )
+        for parser in PARSERS:
+            for engine in ENGINES:
+                yield f'preview/{parser}/{engine}', lambda p=parser, e=engine: self._preview(html, p, e)
+        for engine in ENGINES:
+            yield f'export/lxml/{engine}', lambda e=engine: self._export(html, 'lxml', e)
+
+    def _fragment_cases(self, html, blocks):
+        """Yield (name, callable) pairs to time full previews of edits against a warm fragment cache."""
+        middle = blocks // 20 * 10 + 1  # A plain paragraph near the middle
+        edits = (
+            ('one-edit', lambda number: number == middle),
+            ('edit-10%', lambda number: number % 10 == 1),
+        )
+        for engine in ENGINES:
+            fragments = FragmentCache(FRAGMENT_CACHE_BYTES)
+            self._preview(html, 'lxml', engine, fragments=fragments).discard()
+            for name, edited in edits:
+                # A new edit per run, so edited blocks are never rendered before
+                edited_html = rewrite_html(html, edited)
+                versions = iter([
+                    edited_html.replace('(edited)', f'(edited {run})') for run in range(self.repeat)
+                ])
+                yield f'preview/fragments/{name}/{engine}', lambda v=versions, f=fragments, e=engine: (
+                    self._preview(next(v), 'lxml', e, fragments=f)
+                )
+
+    def _table_cases(self, html, rows):
+        """Yield (name, callable) pairs to time for one table."""
+        if rows <= CELL_BY_CELL_MAX_ROWS:
+            # The previous path: python-docx table filled through rows[i].cells[j]
+            yield 'table/cell-by-cell', lambda: self._table_cell_by_cell(html)
+        for engine in ENGINES:
+            yield f'table/export/{engine}', lambda e=engine: self._export(html, 'lxml', e)
+
+    def _diff_cases(self, blocks, check):
+        """Yield (name, callable) pairs to time diffing edited versions of one document."""
+        html = generate_html(blocks)
+        old = DocumentStructure(html)
+        old.release_tree()
+        middle = blocks // 20 * 10 + 1  # A plain paragraph near the middle
+        edits = (
+            ('one-edit', lambda number: number == middle),
+            ('edit-10%', lambda number: number % 10 == 1),
+            ('rewrite-all', lambda number: True),
+        )
+        for name, edited in edits:
+            new = DocumentStructure(rewrite_html(html, edited))
+            new.release_tree()
+            if check:
+                self._check_diff(blocks, name, old, new)
+            yield f'diff/{name}', lambda n=new: DocumentDiff().diff(old, n)
+            if name == 'one-edit' and blocks <= LCS_TABLE_MAX_BLOCKS:
+                # The previous path: a full (m+1) x (n+1) LCS table
+                yield 'diff/one-edit/lcs-table', lambda n=new: self._lcs_table(
+                    old.get_element_hashes(), n.get_element_hashes()
+                )
+
+    def _check_diff(self, blocks, name, old, new):
+        """Fail unless applying the diff to the old hashes gives the new ones."""
+        hashes = old.get_element_hashes()
+        changes = DocumentDiff().diff(old, new)
+        deleted = {c.index for c in changes if c.type == ChangeType.DELETE}
+        inserted = {c.index: c.new_element.get_hash() for c in changes if c.type == ChangeType.INSERT}
+        kept = iter(h for i, h in enumerate(hashes) if i not in deleted)
+        result = [inserted[i] if i in inserted else next(kept) for i in range(len(new.elements))]
+        if result != new.get_element_hashes() or next(kept, None) is not None:
+            raise CommandError(f'diff/{name} does not reproduce the new document at {blocks} blocks')
+
+    def _lcs_table(self, a, b):
+        m, n = len(a), len(b)
+        dp = [[0] * (n + 1) for _ in range(m + 1)]
+        for i in range(1, m + 1):
+            for j in range(1, n + 1):
+                if a[i - 1] == b[j - 1]:
+                    dp[i][j] = dp[i - 1][j - 1] + 1
+                else:
+                    dp[i][j] = max(dp[i - 1][j], dp[i][j - 1])
+        return dp[m][n]
+
+    def _table_cell_by_cell(self, html):
+        rows = parse_html(html, 'lxml').find('table').find_all('tr')
+        cols = len(rows[0].find_all(['td', 'th']))
+        doc = Document()
+        table = doc.add_table(rows=len(rows), cols=cols)
+        table.style = 'Table Grid'
+        for i, row in enumerate(rows):
+            for j, cell in enumerate(row.find_all(['td', 'th'])):
+                if j < cols:
+                    table.rows[i].cells[j].text = cell.get_text()
+        return doc
+
+    def _preview(self, html, parser, engine, reparse=False, fragments=None):
+        # Without a fragment cache given, every block is rendered
+        converter = IncrementalConverter(
+            html_parser=parser, docx_engine=engine,
+            fragments=fragments if fragments is not None else FragmentCache(0)
+        )
+        structure = DocumentStructure(html, parser=parser)
+        if reparse:
+            structure.release_tree()
+        return converter._convert_full(structure)
+
+    def _export(self, html, parser, engine):
+        converter = DocumentConverter(html_parser=parser, docx_engine=engine)
+        output = converter.html_to_docx(html, 'benchmark')
+        self.style_cache_info = converter.style_parser.cache_info()
+        return output
+
+    def _check_engines(self, blocks, html):
+        """Fail unless all engines write identical package parts."""
+        for name, convert in (('preview', self._preview), ('export', self._export)):
+            packages = []
+            for engine in ENGINES:
+                with zipfile.ZipFile(convert(html, 'lxml', engine).open()) as package:
+                    packages.append({part: package.read(part) for part in package.namelist()})
+            if any(package != packages[0] for package in packages[1:]):
+                raise CommandError(f'{name} output differs between engines at {blocks} blocks')
+        self.stdout.write(f'{blocks:>8}  engines write identical packages')
+
+    def _measure(self, run):
+        best = None
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - start
+            if isinstance(result, DocxOutput):
+                result.discard()
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,268 @@
+"""Bulk import .docx files from a zip archive or directory."""
+import os
+import uuid
+import signal
+import hashlib
+import zipfile
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accounts.models import User
+from apps.documents.models import Document
+from services.document_converter.docx_output import content_fingerprint
+
+SUPPORTED_EXTENSIONS = ('.docx',)
+CHUNK_SIZE = 1024 * 1024
+
+
+def _init_worker(max_memory_mb):
+    """Configure Django and cap the address space of a spawned worker process."""
+    django.setup()
+    if resource and max_memory_mb:
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+@contextmanager
+def _time_limit(seconds):
+    """Raise TimeoutError in this (main) thread once seconds have passed."""
+    if not seconds or not hasattr(signal, 'setitimer'):
+        yield
+        return
+
+    def on_alarm(signum, frame):
+        raise TimeoutError(f'conversion took longer than {seconds}s')
+
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _convert_entry(file_path, file_hash, timeout):
+    """Convert one saved docx to HTML inside a worker process."""
+    from apps.documents.conversion import get_document_converter
+    # Pool workers take the sandbox's place: each has a memory cap (see
+    # _init_worker) and each file a time limit
+    converter = get_document_converter(sandboxed=False)
+    try:
+        with _time_limit(timeout):
+            return converter.docx_to_html(file_path, content_hash=file_hash)
+    except MemoryError:
+        raise MemoryError(f'conversion needed more than {settings.CONVERSION_MAX_MEMORY_MB} MB')
+
+
+class Command(BaseCommand):
+    help = 'Bulk import .docx files from a zip archive or a directory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Path to a .zip archive or a directory')
+        parser.add_argument('--user', required=True, help='Email of the owning user')
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Conversion processes (default: CPU count)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help='Documents inserted per database batch'
+        )
+        parser.add_argument(
+            '--timeout', type=int, default=settings.DOCUMENT_IMPORT_TIMEOUT,
+            help='Seconds allowed per file (default: DOCUMENT_IMPORT_TIMEOUT)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'User not found: {options["user"]}')
+
+        source = options['source']
+        if os.path.isdir(source):
+            entries = self._iter_directory(source)
+        elif zipfile.is_zipfile(source):
+            entries = self._iter_zip(source)
+        else:
+            raise CommandError(f'Not a zip archive or directory: {source}')
+
+        self.user = user
+        self.batch_size = options['batch_size']
+        self.pending_rows = []
+        self.imported = 0
+        self.failures = []
+
+        self.workers = max(1, options['workers'])
+        timeout = options['timeout']
+        # Cap in-flight work so entries are streamed rather than all extracted up front
+        max_in_flight = self.workers * 2
+        in_flight = {}
+
+        pool = self._new_pool()
+        try:
+            for name, open_entry in entries:
+                try:
+                    saved = self._save_entry(name, open_entry)
+                except Exception as e:
+                    self._record_failure(name, e)
+                    continue
+
+                args = (_convert_entry, saved['file_path'], saved['file_hash'], timeout)
+                try:
+                    future = pool.submit(*args)
+                except BrokenProcessPool:
+                    pool = self._replace_pool(pool, in_flight)
+                    future = pool.submit(*args)
+                in_flight[future] = saved
+
+                if len(in_flight) >= max_in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    broken = False
+                    for future in done:
+                        broken |= not self._collect(future, in_flight.pop(future))
+                    if broken:
+                        pool = self._replace_pool(pool, in_flight)
+
+            for future in list(in_flight):
+                self._collect(future, in_flight.pop(future))
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+        self._flush()
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {self.imported} documents'))
+        if self.failures:
+            self.stdout.write(self.style.WARNING(f'{len(self.failures)} files failed:'))
+            for name, error in self.failures:
+                self.stdout.write(f'  {name}: {error}')
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(settings.CONVERSION_MAX_MEMORY_MB,),
+        )
+
+    def _replace_pool(self, pool, in_flight):
+        """
+        Fail the entries of a broken pool and start a new one.
+
+        A worker that dies (e.g. killed for memory) breaks the whole pool,
+        failing every entry it still held.
+        """
+        for future in list(in_flight):
+            self._collect(future, in_flight.pop(future))
+        pool.shutdown(wait=False)
+        self.stdout.write(self.style.WARNING('A conversion worker died; restarting the pool'))
+        return self._new_pool()
+
+    def _iter_directory(self, root):
+        """Yield (name, opener) for supported files under a directory."""
+        for dirpath, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                if not filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                    continue
+                path = os.path.join(dirpath, filename)
+                yield os.path.relpath(path, root), (lambda p=path: open(p, 'rb'))
+
+    def _iter_zip(self, zip_path):
+        """Yield (name, opener) for supported entries of a zip archive."""
+        max_size = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+        with zipfile.ZipFile(zip_path) as archive:
+            for info in archive.infolist():
+                name = info.filename
+                if info.is_dir() or name.startswith('__MACOSX/'):
+                    continue
+                if not name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    continue
+                if info.file_size > max_size:
+                    self._record_failure(name, f'exceeds {settings.MAX_UPLOAD_SIZE_MB} MB')
+                    continue
+                yield name, (lambda i=info: archive.open(i))
+
+    def _save_entry(self, name, open_entry):
+        """Stream an entry into the upload directory, hashing it on the way."""
+        upload_dir = os.path.join(settings.MEDIA_ROOT, 'documents')
+        os.makedirs(upload_dir, exist_ok=True)
+
+        doc_id = uuid.uuid4()
+        file_ext = os.path.splitext(name)[1].lower()
+        file_path = os.path.join(upload_dir, f'{doc_id}{file_ext}')
+        sha256 = hashlib.sha256()
+        size = 0
+
+        with open_entry() as src, open(file_path, 'wb') as dest:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                sha256.update(chunk)
+                dest.write(chunk)
+                size += len(chunk)
+
+        return {
+            'id': doc_id,
+            'name': name,
+            'file_path': file_path,
+            'file_hash': sha256.hexdigest(),
+            'file_size': size,
+        }
+
+    def _collect(self, future, saved):
+        """
+        Turn a finished conversion into a pending Document row.
+
+        Returns:
+            False if the pool broke under this entry, True otherwise
+        """
+        try:
+            content_html = future.result()
+        except BrokenProcessPool:
+            self._record_failure(saved['name'], 'conversion worker died (crash or memory limit)')
+            os.remove(saved['file_path'])
+            return False
+        except Exception as e:
+            self._record_failure(saved['name'], e)
+            os.remove(saved['file_path'])
+            return True
+
+        filename = os.path.basename(saved['name'])
+        self.pending_rows.append(Document(
+            id=saved['id'],
+            user=self.user,
+            title=filename,
+            original_filename=filename,
+            file_path=saved['file_path'],
+            file_type='word',
+            file_size=saved['file_size'],
+            file_hash=saved['file_hash'],
+            content_html=content_html,
+            content_fingerprint=content_fingerprint(filename, content_html),
+        ))
+        if len(self.pending_rows) >= self.batch_size:
+            self._flush()
+        return True
+
+    def _flush(self):
+        """Insert collected documents in one batch."""
+        if not self.pending_rows:
+            return
+        Document.objects.bulk_create(self.pending_rows, batch_size=self.batch_size)
+        self.imported += len(self.pending_rows)
+        self.stdout.write(f'Imported {self.imported} documents so far')
+        self.pending_rows = []
+
+    def _record_failure(self, name, error):
+        self.failures.append((name, str(error)))
@@ -0,0 +1,24 @@
+"""Delete abandoned scratch packages and cache temp files once."""
+from django.core.management.base import BaseCommand
+
+from apps.documents.conversion import build_scratch_sweeper
+
+
+class Command(BaseCommand):
+    help = 'Delete expired scratch docx files and abandoned cache temp files, and report the space reclaimed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age', type=int, default=None,
+            help='Treat files older than this many seconds as abandoned (default: SCRATCH_MAX_AGE)'
+        )
+
+    def handle(self, *args, **options):
+        sweeper = build_scratch_sweeper()
+        if options['max_age'] is not None:
+            sweeper.max_age = options['max_age']
+        result = sweeper.sweep()
+        self.stdout.write(
+            f'Removed {result["files"]} files ({result["bytes"] / (1024 * 1024):.1f} MB) '
+            f'from {sweeper.scratch_dir} and {", ".join(sweeper.cache_dirs)}'
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0003_add_document_file_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='content_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
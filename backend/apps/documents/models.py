@@ -2,10 +2,18 @@ import uuid
 from django.db import models
 from django.conf import settings
 
+from services.document_converter.docx_output import content_fingerprint
+
 
 class Document(models.Model):
     """Document model for storing uploaded documents."""
 
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -17,9 +25,15 @@ class Document(models.Model):
     file_path = models.CharField(max_length=500)
     file_type = models.CharField(max_length=50)  # docx, pdf, etc.
     file_size = models.BigIntegerField(default=0)
+    file_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)  # SHA-256 of upload
 
     # Content stored as HTML for Tiptap editor
     content_html = models.TextField(blank=True, default='')
+    # content_fingerprint() of title and content_html, the ETag of generated docx files
+    content_fingerprint = models.CharField(max_length=64, blank=True, default='')
+
+    # Import state; 'pending' while a background import job is converting the file
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ready')
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -31,6 +45,35 @@ class Document(models.Model):
     def __str__(self):
         return f"{self.title} ({self.user.email})"
 
+    # (title, content_html) the stored fingerprint was computed from
+    _fingerprinted = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = instance.__dict__
+        if loaded.get('content_fingerprint') and 'title' in loaded and 'content_html' in loaded:
+            instance._fingerprinted = (instance.title, instance.content_html)
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'title', 'content_html'} & set(update_fields):
+            # Only rehash when the content differs from what was fingerprinted
+            content = (self.title, self.content_html)
+            if not self.content_fingerprint or content != self._fingerprinted:
+                self.content_fingerprint = content_fingerprint(*content)
+                self._fingerprinted = content
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'content_fingerprint'}
+        super().save(*args, **kwargs)
+
+    def get_content_fingerprint(self, refresh: bool = False) -> str:
+        """Stored content fingerprint, computed for rows saved before it existed."""
+        if refresh or not self.content_fingerprint:
+            return content_fingerprint(self.title, self.content_html)
+        return self.content_fingerprint
+
 
 class DocumentVersion(models.Model):
     """Document version history."""
@@ -53,3 +96,53 @@ class DocumentVersion(models.Model):
 
     def __str__(self):
         return f"{self.document.title} v{self.version_number}"
+
+
+class DocumentImportJob(models.Model):
+    """Background conversion job for an uploaded document."""
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.CASCADE,
+        related_name='import_jobs'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    progress = models.IntegerField(default=0)  # 0-100
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Process running the job ("host:pid") and when it last reported; jobs whose
+    # owner stops reporting are taken over by another process
+    owner = models.CharField(max_length=255, blank=True, default='')
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'document_import_jobs'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.document.title} import ({self.status})"
+
+    @property
+    def queue_seconds(self):
+        """Time spent waiting for a worker."""
+        if not self.started_at:
+            return None
+        return (self.started_at - self.created_at).total_seconds()
+
+    @property
+    def run_seconds(self):
+        """Time spent converting."""
+        if not self.started_at or not self.finished_at:
+            return None
+        return (self.finished_at - self.started_at).total_seconds()
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Document, DocumentVersion
+from .models import Document, DocumentVersion, DocumentImportJob
 
 
 class DocumentSerializer(serializers.ModelSerializer):
@@ -7,9 +7,9 @@ class DocumentSerializer(serializers.ModelSerializer):
         model = Document
         fields = (
             'id', 'title', 'original_filename', 'file_path', 'file_type',
-            'file_size', 'content_html', 'created_at', 'updated_at'
+            'file_size', 'content_html', 'status', 'created_at', 'updated_at'
         )
-        read_only_fields = ('id', 'created_at', 'updated_at')
+        read_only_fields = ('id', 'status', 'created_at', 'updated_at')
 
 
 class DocumentListSerializer(serializers.ModelSerializer):
@@ -19,13 +19,15 @@ class DocumentListSerializer(serializers.ModelSerializer):
         model = Document
         fields = (
             'id', 'title', 'original_filename', 'file_type',
-            'file_size', 'created_at', 'updated_at'
+            'file_size', 'status', 'created_at', 'updated_at'
         )
 
 
 class DocumentUploadSerializer(serializers.Serializer):
     file = serializers.FileField()
     title = serializers.CharField(max_length=255, required=False)
+    # Convert in a background import job instead of inside the request
+    background = serializers.BooleanField(required=False, default=False)
 
 
 class DocumentUpdateSerializer(serializers.Serializer):
@@ -37,3 +39,17 @@ class DocumentVersionSerializer(serializers.ModelSerializer):
     class Meta:
         model = DocumentVersion
         fields = ('id', 'version_number', 'created_at')
+
+
+class DocumentImportJobSerializer(serializers.ModelSerializer):
+    document_status = serializers.CharField(source='document.status', read_only=True)
+    queue_seconds = serializers.FloatField(read_only=True)
+    run_seconds = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = DocumentImportJob
+        fields = (
+            'id', 'status', 'progress', 'error', 'document_status',
+            'created_at', 'started_at', 'finished_at',
+            'queue_seconds', 'run_seconds'
+        )
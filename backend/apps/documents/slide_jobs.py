@@ -0,0 +1,215 @@
+"""
+Background slide rendering for PPT documents.
+
+Renders are keyed by the deck's content hash, so identical decks share one
+set of slides. A lock in the shared cache (Redis) makes rendering
+single-flight across processes and nodes. The lock holder renders straight
+into the deck's final directory, so URLs of slides handed out while it
+renders stay valid; a ``.rendering`` marker in the directory, removed once
+every page is done, tells a partial render from a complete one.
+"""
+import os
+import glob
+import uuid
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any
+
+from django.conf import settings
+from django.core.cache import cache
+
+from services.document_converter import SlideRenderer
+
+from .conversion import get_office_pool
+
+logger = logging.getLogger(__name__)
+
+# How long a failure is reported before a request retries the render
+FAILED_STATE_TTL = 60
+
+# Deletes the lock only while it still holds the given token
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.SLIDE_RENDER_JOBS,
+                    thread_name_prefix='slide-render'
+                )
+    return _executor
+
+
+def _slides_root() -> str:
+    return os.path.join(settings.MEDIA_ROOT, 'slides')
+
+
+# Present in a slides directory until its render completes
+RENDERING_MARKER = '.rendering'
+
+
+def _lock_key(key: str) -> str:
+    return f'slides:lock:{key}'
+
+
+def _state_key(key: str) -> str:
+    return f'slides:state:{key}'
+
+
+def _lock_ttl() -> int:
+    # Refreshed after every page, so this only bounds a stalled render
+    return settings.OFFICE_CONVERT_TIMEOUT * 2
+
+
+def get_slides_key(document) -> str:
+    """Content hash of the deck, computed and stored if missing."""
+    if not document.file_hash:
+        sha256 = hashlib.sha256()
+        with open(document.file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(chunk)
+        document.file_hash = sha256.hexdigest()
+        document.save(update_fields=['file_hash'])
+    return document.file_hash
+
+
+def get_slides(document) -> Dict[str, Any]:
+    """
+    Get the render state of a document's slides, starting a render if needed.
+
+    Returns:
+        Dict with 'status' ('ready', 'rendering' or 'failed'), 'dir_name'
+        (directory under MEDIA_ROOT/slides holding the slides so far),
+        'total' and 'error'
+    """
+    key = get_slides_key(document)
+    if _is_complete(os.path.join(_slides_root(), key)):
+        return {'status': 'ready', 'dir_name': key, 'total': None}
+
+    state = cache.get(_state_key(key))
+    if state and state['status'] == 'failed':
+        # Every poller sees the failure until it expires; then a request retries
+        return state
+
+    if state is None or cache.get(_lock_key(key)) is None:
+        state = _start_render(document.file_path, key) or cache.get(_state_key(key))
+
+    # Another process holds the lock but has not published its state yet
+    return state or {'status': 'rendering', 'dir_name': None, 'total': None}
+
+
+def _is_complete(slides_dir: str) -> bool:
+    return os.path.isdir(slides_dir) and not os.path.exists(
+        os.path.join(slides_dir, RENDERING_MARKER)
+    )
+
+
+def _create_slides_dir(key: str) -> str:
+    """Create a deck's slides directory marked as rendering, or re-mark a partial one."""
+    slides_dir = os.path.join(_slides_root(), key)
+    if not os.path.isdir(slides_dir):
+        # Create it with the marker inside, so it never looks complete while empty
+        staging_dir = os.path.join(_slides_root(), f'.tmp-{key}-{uuid.uuid4().hex}')
+        os.makedirs(staging_dir)
+        open(os.path.join(staging_dir, RENDERING_MARKER), 'w').close()
+        try:
+            os.rename(staging_dir, slides_dir)
+        except OSError:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+    if not _is_complete(slides_dir):
+        open(os.path.join(slides_dir, RENDERING_MARKER), 'w').close()
+    return slides_dir
+
+
+def _start_render(file_path: str, key: str) -> Optional[Dict[str, Any]]:
+    """Take the render lock and queue a render; None if someone else holds it."""
+    token = uuid.uuid4().hex
+    if not cache.add(_lock_key(key), token, timeout=_lock_ttl()):
+        return None
+
+    slides_dir = _create_slides_dir(key)
+    if _is_complete(slides_dir):
+        # Finished by the previous lock holder meanwhile
+        _release_lock(key, token)
+        return {'status': 'ready', 'dir_name': key, 'total': None}
+
+    # Staging directories and page temp files of an earlier holder were abandoned;
+    # pages it finished are valid, as the deck is the same
+    for stale_path in glob.glob(os.path.join(_slides_root(), f'.tmp-{key}-*')):
+        shutil.rmtree(stale_path, ignore_errors=True)
+    for stale_path in glob.glob(os.path.join(slides_dir, '.tmp-*')):
+        try:
+            os.remove(stale_path)
+        except OSError:
+            pass
+
+    state = {'status': 'rendering', 'dir_name': key, 'total': None}
+    cache.set(_state_key(key), state, timeout=_lock_ttl())
+    _get_executor().submit(render_slides, file_path, key, token)
+    return state
+
+
+def render_slides(file_path: str, key: str, token: str):
+    """Convert a deck to PDF and rasterize it into its slides directory."""
+    slides_dir = os.path.join(_slides_root(), key)
+    renderer = SlideRenderer(
+        dpi=settings.SLIDE_RENDER_DPI,
+        workers=settings.SLIDE_RENDER_WORKERS,
+    )
+
+    def on_progress(rendered, total):
+        cache.set(
+            _state_key(key),
+            {'status': 'rendering', 'dir_name': key, 'total': total},
+            timeout=_lock_ttl()
+        )
+        cache.touch(_lock_key(key), timeout=_lock_ttl())
+
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pdf_path = get_office_pool().convert(file_path, 'pdf', temp_dir)
+            renderer.render(pdf_path, slides_dir, on_progress=on_progress)
+
+        os.remove(os.path.join(slides_dir, RENDERING_MARKER))
+        cache.delete(_state_key(key))
+    except Exception as e:
+        logger.warning('Slide rendering failed for %s: %s', file_path, e)
+        error = 'pdf2image not installed' if isinstance(e, ImportError) else str(e)
+        cache.set(
+            _state_key(key),
+            {'status': 'failed', 'dir_name': None, 'total': None, 'error': error},
+            timeout=FAILED_STATE_TTL
+        )
+    finally:
+        _release_lock(key, token)
+
+
+def _release_lock(key: str, token: str):
+    """Release the render lock if it is still held with this render's token."""
+    lock_key = _lock_key(key)
+    client = getattr(cache, 'client', None)
+    if not hasattr(client, 'get_client'):
+        # Not django-redis (e.g. the local memory cache of a single process)
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+        return
+    # GET and DEL in one script, so a lock that expired and was taken by
+    # another render in between is never deleted
+    client.get_client(write=True).eval(
+        _RELEASE_LOCK_SCRIPT, 1, cache.make_key(lock_key), client.encode(token)
+    )
@@ -0,0 +1,82 @@
+"""
+Sandbox ConversionErrors map to 503 when workers are busy and 422 otherwise.
+"""
+import io
+import os
+from unittest import mock
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.accounts.models import User
+from apps.documents.models import Document
+from services.document_converter import ConversionError
+
+CODES = {
+    'busy': status.HTTP_503_SERVICE_UNAVAILABLE,
+    'timeout': status.HTTP_422_UNPROCESSABLE_ENTITY,
+    'memory': status.HTTP_422_UNPROCESSABLE_ENTITY,
+    'crashed': status.HTTP_422_UNPROCESSABLE_ENTITY,
+    'failed': status.HTTP_422_UNPROCESSABLE_ENTITY,
+}
+
+
+def failing_converter(code):
+    error = ConversionError(code, f'{code} message')
+    converter = mock.Mock()
+    converter.convert.side_effect = error
+    converter.html_to_docx.side_effect = error
+    converter.docx_to_html.side_effect = error
+    return converter
+
+
+class ConversionErrorResponseTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='writer', email='writer@example.com', password='secret'
+        )
+        self.client.force_authenticate(self.user)
+        self.document = Document.objects.create(
+            user=self.user, title='Notes', file_type='word', content_html='<p>Hello</p>',
+        )
+
+    def assertErrorResponse(self, response, code):
+        self.assertEqual(CODES[code], response.status_code)
+        self.assertEqual({'error': f'{code} message', 'code': code}, response.json())
+        if code == 'busy':
+            self.assertEqual('10', response['Retry-After'])
+        else:
+            self.assertFalse(response.has_header('Retry-After'))
+
+    def test_preview(self):
+        for code in CODES:
+            with self.subTest(code=code), mock.patch(
+                    'apps.documents.views.get_preview_converter',
+                    return_value=failing_converter(code)):
+                response = self.client.get(f'/api/documents/{self.document.id}/preview/')
+                self.assertErrorResponse(response, code)
+
+    def test_export(self):
+        for code in CODES:
+            with self.subTest(code=code), mock.patch(
+                    'apps.documents.views.get_document_converter',
+                    return_value=failing_converter(code)):
+                response = self.client.get(f'/api/documents/{self.document.id}/export/')
+                self.assertErrorResponse(response, code)
+
+    def test_upload(self):
+        documents_dir = os.path.join(settings.MEDIA_ROOT, 'documents')
+        before = set(os.listdir(documents_dir)) if os.path.isdir(documents_dir) else set()
+        for code in CODES:
+            with self.subTest(code=code), mock.patch(
+                    'apps.documents.views.get_document_converter',
+                    return_value=failing_converter(code)):
+                upload = io.BytesIO(b'PK not really a docx')
+                upload.name = 'notes.docx'
+                response = self.client.post('/api/documents/', {'file': upload}, format='multipart')
+                self.assertErrorResponse(response, code)
+        # The rejected uploads are not kept
+        self.assertEqual(before, set(os.listdir(documents_dir)))
+        self.assertEqual(1, Document.objects.count())
@@ -0,0 +1,177 @@
+"""
+Background import jobs: running, failing, taking over orphans, and the
+upload responses that queue them.
+"""
+import io
+import os
+import time
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.test import TransactionTestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from apps.accounts.models import User
+from apps.documents.import_jobs import ImportJobPool, ImportQueueFull
+from apps.documents.models import Document, DocumentImportJob
+from services.document_converter import ConversionError
+
+
+class ImportJobPoolTests(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='importer', email='importer@example.com', password='secret'
+        )
+        self.converter = mock.Mock()
+        self.converter.docx_to_html.return_value = '<p>Imported</p>'
+        for target, value in (('get_document_converter', self.converter),
+                              ('get_office_pool', None)):
+            patcher = mock.patch(f'apps.documents.import_jobs.{target}', return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def pool(self, **kwargs):
+        kwargs = {'max_workers': 1, 'max_queued': 0, 'heartbeat_interval': 3600, **kwargs}
+        pool = ImportJobPool(**kwargs)
+        self.addCleanup(pool.stop)
+        return pool
+
+    def job(self, **fields):
+        document = Document.objects.create(
+            user=self.user, title='Report', original_filename='report.docx',
+            file_path='/uploads/report.docx', file_type='word', status='pending',
+        )
+        return DocumentImportJob.objects.create(document=document, **fields)
+
+    def wait_for(self, job, *statuses):
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            job.refresh_from_db()
+            if job.status in statuses:
+                return job
+            time.sleep(0.05)
+        self.fail(f'job still {job.status}')
+
+    def test_submit(self):
+        pool = self.pool()
+        job = self.job()
+        pool.submit(job)
+
+        job = self.wait_for(job, 'succeeded')
+        self.assertEqual(100, job.progress)
+        self.assertEqual(1, job.attempts)
+        self.assertEqual(pool.owner, job.owner)
+        self.assertIsNotNone(job.started_at)
+        self.assertIsNotNone(job.finished_at)
+        document = Document.objects.get(id=job.document_id)
+        self.assertEqual('ready', document.status)
+        self.assertEqual('<p>Imported</p>', document.content_html)
+        self.assertEqual(document.get_content_fingerprint(refresh=True), document.content_fingerprint)
+
+    def test_failing_job(self):
+        self.converter.docx_to_html.side_effect = ConversionError('timeout', 'Conversion took too long')
+        pool = self.pool()
+        job = self.job()
+        pool.submit(job)
+
+        job = self.wait_for(job, 'failed')
+        self.assertEqual('Conversion took too long', job.error)
+        self.assertEqual('failed', Document.objects.get(id=job.document_id).status)
+        # The slot was given back
+        self.converter.docx_to_html.side_effect = None
+        second = self.job()
+        pool.submit(second)
+        self.wait_for(second, 'succeeded')
+
+    def test_queue_full(self):
+        release = threading.Event()
+        self.converter.docx_to_html.side_effect = lambda *args, **kwargs: (
+            release.wait(10) and '<p>Imported</p>'
+        )
+        pool = self.pool()
+        running = self.job()
+        pool.submit(running)
+        with self.assertRaises(ImportQueueFull):
+            pool.submit(self.job())
+        release.set()
+        self.wait_for(running, 'succeeded')
+
+    def test_stale_heartbeat_taken_over(self):
+        stale = timezone.now() - timedelta(days=1)
+        orphan = self.job(status='running', owner='gone:1', heartbeat_at=stale, attempts=1)
+        exhausted = self.job(status='running', owner='gone:1', heartbeat_at=stale, attempts=3)
+        alive = self.job(status='queued', owner='busy:2', heartbeat_at=timezone.now())
+
+        # The pool takes over orphans on its first heartbeat pass
+        pool = self.pool(max_queued=4, max_attempts=3)
+
+        orphan = self.wait_for(orphan, 'succeeded')
+        self.assertEqual(pool.owner, orphan.owner)
+        self.assertEqual(2, orphan.attempts)
+        self.assertEqual('ready', Document.objects.get(id=orphan.document_id).status)
+
+        exhausted = self.wait_for(exhausted, 'failed')
+        self.assertEqual('Import was interrupted too many times', exhausted.error)
+        self.assertEqual('failed', Document.objects.get(id=exhausted.document_id).status)
+
+        self.assertEqual(0, pool.recover())
+        alive.refresh_from_db()
+        self.assertEqual(('queued', 'busy:2'), (alive.status, alive.owner))
+        self.assertEqual(1, self.converter.docx_to_html.call_count)
+
+
+class UploadImportJobTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='uploader', email='uploader@example.com', password='secret'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.documents_dir = os.path.join(settings.MEDIA_ROOT, 'documents')
+        os.makedirs(self.documents_dir, exist_ok=True)
+        self.files_before = set(os.listdir(self.documents_dir))
+        self.addCleanup(self.remove_uploads)
+
+    def remove_uploads(self):
+        for name in set(os.listdir(self.documents_dir)) - self.files_before:
+            os.remove(os.path.join(self.documents_dir, name))
+
+    def upload(self, pool):
+        upload = io.BytesIO(b'PK large docx')
+        upload.name = 'large.docx'
+        with mock.patch('apps.documents.views.get_import_pool', return_value=pool):
+            return self.client.post(
+                '/api/documents/', {'file': upload, 'background': True}, format='multipart'
+            )
+
+    def test_accepted(self):
+        pool = mock.Mock()
+        response = self.upload(pool)
+
+        self.assertEqual(status.HTTP_202_ACCEPTED, response.status_code)
+        data = response.json()
+        self.assertEqual('pending', data['status'])
+        self.assertEqual('queued', data['import_job']['status'])
+        job = DocumentImportJob.objects.get(id=data['import_job']['id'])
+        self.assertEqual(data['id'], str(job.document_id))
+        pool.submit.assert_called_once_with(job)
+        self.assertTrue(os.path.exists(job.document.file_path))
+
+    def test_queue_full(self):
+        pool = mock.Mock()
+        pool.submit.side_effect = ImportQueueFull('Import queue is full, try again later')
+        response = self.upload(pool)
+
+        self.assertEqual(status.HTTP_503_SERVICE_UNAVAILABLE, response.status_code)
+        self.assertEqual('30', response['Retry-After'])
+        self.assertEqual({'error': 'Import queue is full, try again later'}, response.json())
+        # Nothing of the rejected upload is kept
+        self.assertFalse(Document.objects.exists())
+        self.assertFalse(DocumentImportJob.objects.exists())
+        self.assertEqual(self.files_before, set(os.listdir(self.documents_dir)))
@@ -0,0 +1,103 @@
+"""
+Slide renders are single-flight, and a failure is reported for its TTL.
+"""
+import os
+import time
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from apps.accounts.models import User
+from apps.documents import slide_jobs
+from apps.documents.models import Document
+from services.document_converter import OfficeConversionError
+
+DECK_HASH = 'ab' * 32
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SlideJobTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        cache.clear()
+
+        user = User.objects.create_user(username='presenter', email='presenter@example.com',
+                                        password='secret')
+        self.document = Document.objects.create(
+            user=user, title='Deck', original_filename='deck.pptx',
+            file_path='/uploads/deck.pptx', file_type='ppt', file_hash=DECK_HASH,
+        )
+        self.slides_dir = os.path.join(media_root, 'slides', DECK_HASH)
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 10
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail('timed out')
+            time.sleep(0.02)
+
+    def test_concurrent_requests_start_one_render(self):
+        renders = []
+        release = threading.Event()
+
+        def render(file_path, key, token):
+            renders.append(key)
+            release.wait(10)
+            open(os.path.join(self.slides_dir, 'slide_1.png'), 'wb').close()
+            os.remove(os.path.join(self.slides_dir, slide_jobs.RENDERING_MARKER))
+            slide_jobs._release_lock(key, token)
+
+        requests = 8
+        barrier = threading.Barrier(requests)
+        states = []
+
+        def request():
+            barrier.wait()
+            states.append(slide_jobs.get_slides(self.document))
+
+        with mock.patch.object(slide_jobs, 'render_slides', render):
+            threads = [threading.Thread(target=request) for _ in range(requests)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual({'rendering'}, {state['status'] for state in states})
+
+            release.set()
+            self.wait_for(lambda: slide_jobs.get_slides(self.document)['status'] == 'ready')
+
+        self.assertEqual([DECK_HASH], renders)
+        self.assertEqual(['slide_1.png'], os.listdir(self.slides_dir))
+
+    def test_failed_state_kept_for_its_ttl(self):
+        office = mock.Mock()
+        office.convert.side_effect = OfficeConversionError('soffice crashed')
+
+        with mock.patch.object(slide_jobs, 'get_office_pool', return_value=office), \
+                mock.patch.object(slide_jobs, 'FAILED_STATE_TTL', 1):
+            self.assertEqual('rendering', slide_jobs.get_slides(self.document)['status'])
+            self.wait_for(lambda: cache.get(slide_jobs._state_key(DECK_HASH), {}).get('status') == 'failed')
+            failed_at = time.monotonic()
+            # The lock is released, but polls keep getting the failure
+            self.assertIsNone(cache.get(slide_jobs._lock_key(DECK_HASH)))
+            for _ in range(3):
+                state = slide_jobs.get_slides(self.document)
+                self.assertEqual('failed', state['status'])
+                self.assertEqual('soffice crashed', state['error'])
+            self.assertLess(time.monotonic() - failed_at, 1)
+            self.assertEqual(1, office.convert.call_count)
+
+            # Once it expires, the next request retries
+            time.sleep(1.1)
+            self.assertEqual('rendering', slide_jobs.get_slides(self.document)['status'])
+            self.wait_for(lambda: office.convert.call_count == 2
+                          and cache.get(slide_jobs._lock_key(DECK_HASH)) is None)
@@ -1,10 +1,16 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import DocumentViewSet
+from .views import DocumentImageView, DocumentViewSet, SlideImageView
 
 router = DefaultRouter()
 router.register(r'', DocumentViewSet, basename='document')
 
 urlpatterns = [
+    path(
+        'slide-images/<str:key>/<str:size>/slide_<int:page>.<str:fmt>',
+        SlideImageView.as_view(),
+        name='slide-image'
+    ),
+    path('images/<str:prefix>/<str:name>', DocumentImageView.as_view(), name='document-image'),
     path('', include(router.urls)),
 ]
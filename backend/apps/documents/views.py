@@ -1,21 +1,41 @@
 import os
+import re
 import uuid
+import hashlib
+import mimetypes
 from django.conf import settings
-from django.http import FileResponse
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils.http import parse_etags
+from django.urls import reverse
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.views import APIView
 
-from .models import Document, DocumentVersion
+from .models import Document, DocumentVersion, DocumentImportJob
 from .serializers import (
     DocumentSerializer,
     DocumentListSerializer,
     DocumentUploadSerializer,
     DocumentUpdateSerializer,
     DocumentVersionSerializer,
+    DocumentImportJobSerializer,
+)
+from .import_jobs import get_import_pool, ImportQueueFull
+from .conversion import (
+    docx_etag, docx_output_key, get_document_converter, get_export_cache,
+    get_media_store, get_preview_converter, get_office_pool,
+)
+from .slide_jobs import get_slides
+from services.document_converter import (
+    ConversionError,
+    OfficeConversionError,
+    convert_legacy_format,
+    list_slides,
+    SlideDerivatives,
 )
-from services.document_converter import DocumentConverter, get_converter
 
 
 class DocumentViewSet(viewsets.ModelViewSet):
@@ -57,14 +77,35 @@ class DocumentViewSet(viewsets.ModelViewSet):
 
         # Save file
         doc_id = uuid.uuid4()
-        file_path = self._save_file(file, doc_id, file_ext)
+        file_path, file_hash = self._save_file(file, doc_id, file_ext)
+
+        # Large Word files are converted by a background import job
+        threshold = settings.DOCUMENT_IMPORT_ASYNC_THRESHOLD_MB * 1024 * 1024
+        if file_ext in self.ALLOWED_EXTENSIONS['word'] and (
+            serializer.validated_data['background'] or file.size >= threshold
+        ):
+            return self._create_import_job(request, doc_id, title, file, file_path, file_hash)
+
+        # mammoth and the slide renderer only read OOXML, so upgrade .doc/.ppt first
+        try:
+            file_path = convert_legacy_format(get_office_pool(), file_path)
+        except OfficeConversionError as e:
+            os.remove(file_path)
+            return Response(
+                {'error': f'Failed to convert {file_ext} file: {str(e)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
         # Determine file type category
         if file_ext in self.ALLOWED_EXTENSIONS['word']:
             file_type = 'word'
             # Convert Word to HTML
-            converter = DocumentConverter()
-            content_html = converter.docx_to_html(file_path)
+            converter = get_document_converter()
+            try:
+                content_html = converter.docx_to_html(file_path, content_hash=file_hash)
+            except ConversionError as e:
+                os.remove(file_path)
+                return self._conversion_error_response(e)
         else:
             file_type = 'ppt'
             # PPT files don't convert to HTML
@@ -79,6 +120,7 @@ class DocumentViewSet(viewsets.ModelViewSet):
             file_path=file_path,
             file_type=file_type,
             file_size=file.size,
+            file_hash=file_hash,
             content_html=content_html,
         )
 
@@ -87,6 +129,37 @@ class DocumentViewSet(viewsets.ModelViewSet):
             status=status.HTTP_201_CREATED
         )
 
+    def _create_import_job(self, request, doc_id, title, file, file_path, file_hash):
+        """Create a pending document and queue its conversion."""
+        document = Document.objects.create(
+            id=doc_id,
+            user=request.user,
+            title=title,
+            original_filename=file.name,
+            file_path=file_path,
+            file_type='word',
+            file_size=file.size,
+            file_hash=file_hash,
+            status='pending',
+        )
+        job = DocumentImportJob.objects.create(document=document)
+
+        try:
+            get_import_pool().submit(job)
+        except ImportQueueFull as e:
+            document.delete()
+            os.remove(file_path)
+            response = Response(
+                {'error': str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+            response['Retry-After'] = '30'
+            return response
+
+        data = DocumentSerializer(document).data
+        data['import_job'] = DocumentImportJobSerializer(job).data
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
     def update(self, request, *args, **kwargs):
         """Update document content."""
         document = self.get_object()
@@ -97,6 +170,11 @@ class DocumentViewSet(viewsets.ModelViewSet):
             document.title = serializer.validated_data['title']
 
         if 'content_html' in serializer.validated_data:
+            if document.status == 'pending':
+                return Response(
+                    {'error': 'Document is still being imported'},
+                    status=status.HTTP_409_CONFLICT
+                )
             # Create version before updating
             self._create_version(document)
             document.content_html = serializer.validated_data['content_html']
@@ -108,17 +186,29 @@ class DocumentViewSet(viewsets.ModelViewSet):
     def export(self, request, pk=None):
         """Export document as docx."""
         document = self.get_object()
-        converter = DocumentConverter()
-
-        # Generate docx from HTML
-        export_path = converter.html_to_docx(
-            document.content_html,
-            document.title
-        )
+        etag = docx_etag(document, 'export')
+        if self._etag_matches(request, etag):
+            return self._not_modified(etag)
+        # Serve unchanged documents from the shared export cache
+        export_cache = get_export_cache()
+        cache_key = docx_output_key(document, 'export')
+        stream = export_cache.get(cache_key)
+        if stream is None:
+            converter = get_document_converter()
+
+            # Generate docx from HTML
+            try:
+                output = converter.html_to_docx(
+                    document.content_html,
+                    document.title
+                )
+            except ConversionError as e:
+                return self._conversion_error_response(e)
+            export_cache.put(cache_key, output)
+            stream = output.open()
 
-        from django.http import FileResponse
         response = FileResponse(
-            open(export_path, 'rb'),
+            stream,
             content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
         )
         # Remove .docx extension if already present in title
@@ -126,6 +216,7 @@ class DocumentViewSet(viewsets.ModelViewSet):
         if filename.lower().endswith('.docx'):
             filename = filename[:-5]
         response['Content-Disposition'] = f'attachment; filename="{filename}.docx"'
+        self._set_etag(response, etag)
         return response
 
     @action(detail=True, methods=['get'])
@@ -135,28 +226,52 @@ class DocumentViewSet(viewsets.ModelViewSet):
         versions = document.versions.all()
         return Response(DocumentVersionSerializer(versions, many=True).data)
 
+    @action(detail=True, methods=['get'])
+    def import_status(self, request, pk=None):
+        """Get progress, timing and errors of the latest import job."""
+        document = self.get_object()
+        job = document.import_jobs.first()
+        if job is None:
+            return Response(
+                {'error': 'No import job for this document'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(DocumentImportJobSerializer(job).data)
+
     @action(detail=True, methods=['get'])
     def preview(self, request, pk=None):
         """Get current content as docx for preview using incremental converter."""
         document = self.get_object()
+        etag = docx_etag(document, 'preview')
+        if self._etag_matches(request, etag):
+            return self._not_modified(etag)
 
         # Use incremental converter for better performance
-        converter = get_converter()
-        export_path = converter.convert(
-            document.content_html,
-            doc_id=str(document.id)
-        )
+        converter = get_preview_converter()
+        try:
+            output = converter.convert(
+                document.content_html,
+                doc_id=str(document.id)
+            )
+        except ConversionError as e:
+            return self._conversion_error_response(e)
 
         response = FileResponse(
-            open(export_path, 'rb'),
+            output.open(),
             content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
         )
         response['Content-Disposition'] = f'inline; filename="preview.docx"'
+        self._set_etag(response, etag)
         return response
 
     @action(detail=True, methods=['get'])
     def slides(self, request, pk=None):
-        """Get PPT slides as images for preview."""
+        """
+        Get PPT slides as images for preview.
+
+        Slides render in the background; while status is 'rendering' the
+        response lists the slides finished so far and clients poll again.
+        """
         document = self.get_object()
 
         if document.file_type != 'ppt':
@@ -165,40 +280,73 @@ class DocumentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Check if slides already generated
-        slides_dir = os.path.join(settings.MEDIA_ROOT, 'slides', str(document.id))
-        if os.path.exists(slides_dir):
-            slides = self._get_slide_urls(slides_dir, document.id)
-            return Response({'slides': slides})
-
-        # Generate slides from PPT
-        try:
-            slides = self._convert_ppt_to_images(document)
-            return Response({'slides': slides})
-        except Exception as e:
+        state = get_slides(document)
+        if state['status'] == 'failed':
             return Response(
-                {'error': f'Failed to convert PPT: {str(e)}'},
+                {'error': f"Failed to convert PPT: {state.get('error', '')}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        slides = []
+        if state['dir_name']:
+            slides = self._get_slide_urls(
+                state['dir_name'],
+                with_sizes=state['status'] == 'ready'
+            )
+        return Response({
+            'slides': slides,
+            'status': state['status'],
+            'total': state['total'] if state['status'] == 'rendering' else len(slides),
+        })
+
     @action(detail=True, methods=['post'])
     def clear_preview_cache(self, request, pk=None):
         """Clear preview cache for this document."""
         document = self.get_object()
-        converter = get_converter()
+        converter = get_preview_converter()
         converter.clear_cache(str(document.id))
         return Response({'status': 'cache cleared'})
 
+    def _etag_matches(self, request, etag):
+        """Whether the request's If-None-Match already names this ETag."""
+        header = request.META.get('HTTP_IF_NONE_MATCH')
+        if not header:
+            return False
+        etags = parse_etags(header)
+        # If-None-Match uses weak comparison
+        opaque = etag.removeprefix('W/')
+        return '*' in etags or any(tag.removeprefix('W/') == opaque for tag in etags)
+
+    def _not_modified(self, etag):
+        response = HttpResponseNotModified()
+        self._set_etag(response, etag)
+        return response
+
+    def _set_etag(self, response, etag):
+        response['ETag'] = etag
+        # Clients must revalidate, which is free while the content is unchanged
+        response['Cache-Control'] = 'private, no-cache'
+
+    def _conversion_error_response(self, error):
+        """Structured response for a conversion that failed in the sandbox."""
+        if error.code == 'busy':
+            response = Response(error.to_dict(), status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = '10'
+            return response
+        return Response(error.to_dict(), status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
     def _save_file(self, file, doc_id, file_ext):
-        """Save uploaded file to disk."""
+        """Save uploaded file to disk, returning its path and SHA-256."""
         upload_dir = os.path.join(settings.MEDIA_ROOT, 'documents')
         os.makedirs(upload_dir, exist_ok=True)
 
         file_path = os.path.join(upload_dir, f'{doc_id}{file_ext}')
+        sha256 = hashlib.sha256()
         with open(file_path, 'wb+') as dest:
             for chunk in file.chunks():
+                sha256.update(chunk)
                 dest.write(chunk)
-        return file_path
+        return file_path, sha256.hexdigest()
 
     def _create_version(self, document):
         """Create a new version of the document."""
@@ -211,53 +359,88 @@ class DocumentViewSet(viewsets.ModelViewSet):
             content_html=document.content_html,
         )
 
-    def _convert_ppt_to_images(self, document):
-        """Convert PPT to images using LibreOffice and pdf2image."""
-        import subprocess
-        import tempfile
-
-        slides_dir = os.path.join(settings.MEDIA_ROOT, 'slides', str(document.id))
-        os.makedirs(slides_dir, exist_ok=True)
-
-        # Use LibreOffice to convert PPT to PDF first
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Convert to PDF using LibreOffice
-            subprocess.run([
-                'soffice',
-                '--headless',
-                '--convert-to', 'pdf',
-                '--outdir', temp_dir,
-                document.file_path
-            ], check=True, timeout=120)
-
-            # Find the generated PDF
-            pdf_name = os.path.splitext(os.path.basename(document.file_path))[0] + '.pdf'
-            pdf_path = os.path.join(temp_dir, pdf_name)
-
-            if not os.path.exists(pdf_path):
-                raise Exception('PDF conversion failed')
-
-            # Convert PDF to images
-            try:
-                from pdf2image import convert_from_path
-                images = convert_from_path(pdf_path, dpi=150)
-
-                for i, image in enumerate(images):
-                    image_path = os.path.join(slides_dir, f'slide_{i + 1}.png')
-                    image.save(image_path, 'PNG')
-            except ImportError:
-                raise Exception('pdf2image not installed')
+    def _get_slide_urls(self, dir_name, with_sizes=False):
+        """
+        Get list of slide image URLs.
 
-        return self._get_slide_urls(slides_dir, document.id)
+        With with_sizes, each slide also gets a thumbnail URL and a srcset of
+        lazily generated sizes; 'url' stays the full-size PNG fallback.
+        """
+        slides_dir = os.path.join(settings.MEDIA_ROOT, 'slides', dir_name)
+        derivatives = SlideDerivatives()
+        fmt = settings.SLIDE_IMAGE_FORMAT
+        if fmt not in derivatives.supported_formats():
+            fmt = 'png'
 
-    def _get_slide_urls(self, slides_dir, doc_id):
-        """Get list of slide image URLs."""
         slides = []
-        if os.path.exists(slides_dir):
-            files = sorted([f for f in os.listdir(slides_dir) if f.endswith('.png')])
-            for i, filename in enumerate(files):
-                slides.append({
-                    'page': i + 1,
-                    'url': f'{settings.MEDIA_URL}slides/{doc_id}/{filename}'
-                })
+        for page, filename in list_slides(slides_dir):
+            slide = {
+                'page': page,
+                'url': f'{settings.MEDIA_URL}slides/{dir_name}/{filename}'
+            }
+            if with_sizes:
+                widths = derivatives.widths(slides_dir, page)
+                sizes = {
+                    size: self.request.build_absolute_uri(reverse('slide-image', kwargs={
+                        'key': dir_name, 'size': size, 'page': page, 'fmt': fmt,
+                    }))
+                    for size in derivatives.SIZES
+                }
+                slide['thumbnail'] = sizes['thumb']
+                slide['srcset'] = ', '.join(
+                    f'{url} {widths[size]}w' for size, url in sizes.items()
+                )
+            slides.append(slide)
         return slides
+
+
+class ContentAddressedFileMixin:
+    """
+    Public access to files named by the SHA-256 of their content.
+
+    Slide images and images extracted from documents are served without
+    authentication, so they work in plain <img> tags inside content_html
+    and slide lists, like files under MEDIA_URL. The URL is the only
+    secret: anyone holding it can read the image, and revoking access to
+    a document does not revoke links already shared. Names cannot be
+    guessed without the content itself, and the files never change, so
+    responses may be cached forever.
+    """
+
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def file_response(self, path: str, content_type: str) -> FileResponse:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+
+
+class SlideImageView(ContentAddressedFileMixin, APIView):
+    """Serve one size of a slide, generating it on first request."""
+
+    KEY_RE = re.compile(r'^[0-9a-f]{64}$')
+
+    def get(self, request, key, size, page, fmt):
+        derivatives = SlideDerivatives()
+        if (not self.KEY_RE.match(key) or size not in derivatives.SIZES
+                or fmt not in derivatives.supported_formats()):
+            raise Http404
+
+        slides_dir = os.path.join(settings.MEDIA_ROOT, 'slides', key)
+        path = derivatives.get(slides_dir, page, size, fmt)
+        if path is None:
+            raise Http404
+        return self.file_response(path, f'image/{fmt}')
+
+
+class DocumentImageView(ContentAddressedFileMixin, APIView):
+    """Serve an image extracted from a document into the media store."""
+
+    def get(self, request, prefix, name):
+        path = get_media_store().path_for_name(prefix, name)
+        if path is None:
+            raise Http404
+
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        return self.file_response(path, content_type)
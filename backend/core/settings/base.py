@@ -92,6 +92,10 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # Media files
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.getenv('MEDIA_ROOT', BASE_DIR / 'uploads')
+# Public URL prefix of images extracted from documents, written into content_html.
+# The API serves them under /api/documents/images/; the frontend proxies /api/backend/
+# there. Set an absolute URL when the editor is not served through that proxy.
+DOCUMENT_IMAGE_URL = os.getenv('DOCUMENT_IMAGE_URL', '/api/backend/documents/images/')
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -138,3 +142,77 @@ CORS_ALLOW_CREDENTIALS = True
 MAX_UPLOAD_SIZE_MB = int(os.getenv('MAX_UPLOAD_SIZE_MB', 50))
 DATA_UPLOAD_MAX_MEMORY_SIZE = MAX_UPLOAD_SIZE_MB * 1024 * 1024
 FILE_UPLOAD_MAX_MEMORY_SIZE = MAX_UPLOAD_SIZE_MB * 1024 * 1024
+
+# Document import jobs
+# Uploads at or above this size are converted by a background import job
+DOCUMENT_IMPORT_ASYNC_THRESHOLD_MB = int(os.getenv('DOCUMENT_IMPORT_ASYNC_THRESHOLD_MB', 5))
+DOCUMENT_IMPORT_WORKERS = int(os.getenv('DOCUMENT_IMPORT_WORKERS', 2))
+DOCUMENT_IMPORT_MAX_QUEUED = int(os.getenv('DOCUMENT_IMPORT_MAX_QUEUED', 32))
+# Sandbox time limit of one import conversion; imports also retry this long while
+# every conversion worker is busy
+DOCUMENT_IMPORT_TIMEOUT = int(os.getenv('DOCUMENT_IMPORT_TIMEOUT', 600))
+# Imports interrupted by a restart are requeued; after this many runs they fail
+DOCUMENT_IMPORT_MAX_ATTEMPTS = int(os.getenv('DOCUMENT_IMPORT_MAX_ATTEMPTS', 3))
+# Word files at least this large are converted by the streaming importer
+DOCUMENT_STREAMING_IMPORT_THRESHOLD_MB = int(os.getenv('DOCUMENT_STREAMING_IMPORT_THRESHOLD_MB', 10))
+
+# BeautifulSoup parser for HTML to docx conversion: 'lxml' or 'html.parser'
+HTML_PARSER = os.getenv('HTML_PARSER', 'lxml')
+# docx writer for export and preview: 'ooxml' (direct) or 'python-docx'
+DOCX_WRITER_ENGINE = os.getenv('DOCX_WRITER_ENGINE', 'ooxml')
+# Corporate .docx template for exports (styles, numbering, headers); empty for the default
+DOCX_TEMPLATE_PATH = os.getenv('DOCX_TEMPLATE_PATH', '')
+# Generated docx files up to this size are served from memory, larger ones from an unlinked temp file
+DOCX_OUTPUT_MAX_MEMORY_MB = int(os.getenv('DOCX_OUTPUT_MAX_MEMORY_MB', 16))
+# zlib level for parts rewritten in preview packages (0 stores them); exports keep full compression
+DOCX_PREVIEW_COMPRESS_LEVEL = int(os.getenv('DOCX_PREVIEW_COMPRESS_LEVEL', 1))
+# Scratch directory for generated docx files too large for memory; empty for a
+# doc-studio-scratch directory under the system temp dir
+DOCX_SCRATCH_DIR = os.getenv('DOCX_SCRATCH_DIR', '')
+# Scratch files older than this many seconds are abandoned and swept
+SCRATCH_MAX_AGE = int(os.getenv('SCRATCH_MAX_AGE', 3600))
+# Quota for scratch files; the oldest are swept first when it is exceeded
+SCRATCH_MAX_MB = int(os.getenv('SCRATCH_MAX_MB', 1024))
+# Seconds between background sweeps in each web worker; 0 disables them
+SCRATCH_SWEEP_INTERVAL = int(os.getenv('SCRATCH_SWEEP_INTERVAL', 300))
+
+# Content-addressed cache of docx to HTML conversions (stored under MEDIA_ROOT)
+CONVERSION_CACHE_MAX_MB = int(os.getenv('CONVERSION_CACHE_MAX_MB', 512))
+# Cache of generated docx exports shared by all workers (stored under MEDIA_ROOT)
+EXPORT_CACHE_MAX_MB = int(os.getenv('EXPORT_CACHE_MAX_MB', 256))
+# Last preview package and structure per document: 'disk' (under MEDIA_ROOT, shared by the
+# workers of a node), 'redis' (shared by all nodes) or 'memory' (per process)
+PREVIEW_CACHE_BACKEND = os.getenv('PREVIEW_CACHE_BACKEND', 'disk')
+PREVIEW_CACHE_MAX_MB = int(os.getenv('PREVIEW_CACHE_MAX_MB', 256))
+# Seconds an unused preview entry is kept
+PREVIEW_CACHE_TTL = int(os.getenv('PREVIEW_CACHE_TTL', 24 * 60 * 60))
+# Rendered docx blocks reused across previews and documents, per worker process
+FRAGMENT_CACHE_MAX_MB = int(os.getenv('FRAGMENT_CACHE_MAX_MB', 32))
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+# LibreOffice worker pool (PPT rendering and legacy .doc/.ppt conversion);
+# without the uno bindings every conversion starts its own soffice instead
+SOFFICE_PATH = os.getenv('SOFFICE_PATH', 'soffice')
+OFFICE_POOL_SIZE = int(os.getenv('OFFICE_POOL_SIZE', 2))
+# Workers reserve free UNO ports from here on, host-wide through lock files
+OFFICE_POOL_BASE_PORT = int(os.getenv('OFFICE_POOL_BASE_PORT', 2002))
+OFFICE_MAX_JOBS_PER_WORKER = int(os.getenv('OFFICE_MAX_JOBS_PER_WORKER', 50))
+OFFICE_CONVERT_TIMEOUT = int(os.getenv('OFFICE_CONVERT_TIMEOUT', 120))
+
+# Slide previews
+SLIDE_RENDER_DPI = int(os.getenv('SLIDE_RENDER_DPI', 150))
+# pdftoppm processes per deck; defaults to the CPU count
+SLIDE_RENDER_WORKERS = int(os.getenv('SLIDE_RENDER_WORKERS', os.cpu_count() or 1))
+# Decks rendered concurrently per web process
+SLIDE_RENDER_JOBS = int(os.getenv('SLIDE_RENDER_JOBS', 2))
+# Format of lazily generated slide sizes (webp or avif); PNG is the fallback
+SLIDE_IMAGE_FORMAT = os.getenv('SLIDE_IMAGE_FORMAT', 'webp')
+
+# Sandboxed conversion workers (set CONVERSION_SANDBOX_WORKERS=0 to convert in-process)
+CONVERSION_SANDBOX_WORKERS = int(os.getenv('CONVERSION_SANDBOX_WORKERS', 2))
+CONVERSION_TIMEOUT = int(os.getenv('CONVERSION_TIMEOUT', 60))
+# Address-space cap per worker; a job that needs more fails cleanly
+CONVERSION_MAX_MEMORY_MB = int(os.getenv('CONVERSION_MAX_MEMORY_MB', 1536))
+# Workers whose peak RSS passes this are recycled after their job
+CONVERSION_MAX_RSS_MB = int(os.getenv('CONVERSION_MAX_RSS_MB', 512))
+CONVERSION_MAX_JOBS_PER_WORKER = int(os.getenv('CONVERSION_MAX_JOBS_PER_WORKER', 100))
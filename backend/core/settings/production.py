@@ -34,3 +34,27 @@ SECURE_CONTENT_TYPE_NOSNIFF = True
 X_FRAME_OPTIONS = 'DENY'
 CSRF_COOKIE_SECURE = True
 SESSION_COOKIE_SECURE = True
+
+# Logging: warnings everywhere, plus the INFO lines of the document
+# services (import jobs, cache hit rates)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': 'WARNING',
+    },
+    'loggers': {
+        'apps.documents': {
+            'level': 'INFO',
+        },
+        'services.document_converter': {
+            'level': 'INFO',
+        },
+    },
+}
@@ -7,3 +7,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings.development')
 
 application = get_wsgi_application()
+
+# Background work of each web worker (see apps.documents.background)
+from apps.documents.background import start_background_services  # noqa: E402
+
+start_background_services()
@@ -1,5 +1,28 @@
 # Document converter service
 from .converter import DocumentConverter
+from .docx_output import DocxOutput
+from .conversion_cache import ConversionCache
+from .export_cache import ExportCache
+from .fragment_cache import FragmentCache
+from .preview_cache import (
+    PreviewCache,
+    MemoryPreviewCache,
+    DiskPreviewCache,
+    RedisPreviewCache,
+)
+from .media_store import MediaStore
+from .scratch_sweeper import ScratchSweeper
+from .streaming_importer import StreamingDocxImporter
+from .sandbox import ConversionSandbox, ConversionError
+from .office_pool import (
+    OfficeWorkerPool,
+    OneShotOfficeConverter,
+    OfficeConverter,
+    OfficeConversionError,
+    create_office_pool,
+    convert_legacy_format,
+)
+from .slide_renderer import SlideRenderer, SlideDerivatives, list_slides
 from .style_parser import StyleParser, FontStyle, ParagraphStyle, PageSetup
 from .incremental_converter import (
     IncrementalConverter,
@@ -10,6 +33,28 @@ from .incremental_converter import (
 
 __all__ = [
     'DocumentConverter',
+    'DocxOutput',
+    'ConversionCache',
+    'ExportCache',
+    'FragmentCache',
+    'PreviewCache',
+    'MemoryPreviewCache',
+    'DiskPreviewCache',
+    'RedisPreviewCache',
+    'MediaStore',
+    'ScratchSweeper',
+    'StreamingDocxImporter',
+    'ConversionSandbox',
+    'ConversionError',
+    'OfficeWorkerPool',
+    'OneShotOfficeConverter',
+    'OfficeConverter',
+    'OfficeConversionError',
+    'create_office_pool',
+    'convert_legacy_format',
+    'SlideRenderer',
+    'SlideDerivatives',
+    'list_slides',
     'StyleParser',
     'FontStyle',
     'ParagraphStyle',
@@ -0,0 +1,72 @@
+"""
+Hit/miss counters of the converter caches.
+
+Counters are kept per process. Every ``log_every`` lookups a cache logs its
+totals at INFO, so hit rates of the real workload show up in the server
+logs without any extra tooling.
+"""
+import logging
+import threading
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# Lookups between two log lines of one cache
+LOG_EVERY = 1000
+
+
+class CacheStats:
+    """Thread-safe hit, miss and eviction counters of one cache."""
+
+    def __init__(self, name: str, log_every: int = LOG_EVERY):
+        """
+        Args:
+            name: Cache name used in log lines
+            log_every: Lookups between log lines; 0 never logs
+        """
+        self.name = name
+        self.log_every = log_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def hit(self):
+        self._lookup(hit=True)
+
+    def miss(self):
+        self._lookup(hit=False)
+
+    def evicted(self, count: int = 1):
+        with self._lock:
+            self.evictions += count
+
+    def _lookup(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            due = self.log_every and (self.hits + self.misses) % self.log_every == 0
+        if due:
+            self.log()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the counters and the hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def log(self):
+        """Log the counters at INFO."""
+        stats = self.as_dict()
+        logger.info(
+            '%s: %d hits, %d misses (%.1f%% hit rate), %d evictions',
+            self.name, stats['hits'], stats['misses'], stats['hit_rate'] * 100,
+            stats['evictions'],
+        )
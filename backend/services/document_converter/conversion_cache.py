@@ -0,0 +1,70 @@
+"""
+Content-addressed cache for docx to HTML conversion results.
+"""
+import os
+import uuid
+from typing import Optional, Dict, Any
+
+from .cache_stats import CacheStats
+from .disk_budget import DiskBudget
+
+
+class ConversionCache:
+    """Disk cache mapping a source file's content hash to its converted HTML.
+
+    Entries are shared by every user and worker that can see ``cache_dir``.
+    Recency is tracked through file mtimes, and the least recently used
+    entries are evicted once the cache grows past ``max_bytes``; the size is
+    tracked incrementally, see ``DiskBudget``.
+    """
+
+    # Bump when converter output changes so stale entries are never served
+    VERSION = 'v2'
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = str(cache_dir)
+        self.max_bytes = max_bytes
+        self._stats = CacheStats('conversion cache')
+        self._budget = DiskBudget(
+            self.cache_dir, max_bytes, '.html', on_evict=self._stats.evicted
+        )
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_path(self, content_hash: str) -> str:
+        return os.path.join(
+            self.cache_dir,
+            content_hash[:2],
+            f'{content_hash}.{self.VERSION}.html'
+        )
+
+    def get(self, content_hash: str) -> Optional[str]:
+        """Return cached HTML for a content hash, or None on a miss."""
+        path = self._entry_path(content_hash)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                html = f.read()
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            self._stats.miss()
+            return None
+
+        self._stats.hit()
+        return html
+
+    def put(self, content_hash: str, html: str):
+        """Store HTML under a content hash and evict old entries if needed."""
+        path = self._entry_path(content_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temp file first so readers never see a partial entry
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        data = html.encode('utf-8')
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        self._budget.added(len(data))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for this process."""
+        return self._stats.as_dict()
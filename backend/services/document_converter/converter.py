@@ -1,57 +1,135 @@
 """
 Document converter service for converting between docx and HTML.
 """
+import io
 import os
-import uuid
-import tempfile
 from pathlib import Path
+from typing import Optional
 
 import mammoth
 from docx import Document
 from docx.shared import Inches, Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.image.exceptions import UnrecognizedImageError
 
 from .style_parser import StyleParser
+from .html_parser import parse_html
+from .ooxml_writer import open_document
+from .ooxml_compact import compact_document
+from .docx_output import DocxOutput, save_docx
+from .table_builder import TableCell, build_table, cell_from_html
+from .conversion_cache import ConversionCache
+from .media_store import MediaStore, open_image
+from .sandbox import ConversionSandbox
+from .streaming_importer import StreamingDocxImporter
 
 
 class DocumentConverter:
     """Service for converting documents between formats."""
 
-    def __init__(self):
+    def __init__(self, cache: Optional[ConversionCache] = None,
+                 media_store: Optional[MediaStore] = None,
+                 sandbox: Optional[ConversionSandbox] = None,
+                 streaming_threshold_bytes: Optional[int] = None,
+                 html_parser: Optional[str] = None,
+                 docx_engine: str = 'python-docx',
+                 template_path: Optional[str] = None,
+                 max_memory_bytes: Optional[int] = None,
+                 scratch_dir: Optional[str] = None,
+                 timeout: Optional[int] = None):
         self.style_parser = StyleParser()
-
-    def docx_to_html(self, file_path: str) -> str:
+        self.cache = cache
+        self.media_store = media_store
+        self.sandbox = sandbox
+        # Files at least this large use the streaming importer; None disables it
+        self.streaming_threshold_bytes = streaming_threshold_bytes
+        self.html_parser = html_parser
+        self.docx_engine = docx_engine
+        self.template_path = template_path
+        self.max_memory_bytes = max_memory_bytes
+        self.scratch_dir = scratch_dir  # Where packages too large for memory are written
+        self.timeout = timeout  # Per-conversion sandbox limit; None for the sandbox's own
+
+    def __getstate__(self):
+        # Shipped to sandbox workers, which run the conversion itself only
+        state = self.__dict__.copy()
+        state['cache'] = None
+        state['sandbox'] = None
+        return state
+
+    def _run(self, method, *args):
+        """Run a conversion step in the sandbox if one is configured."""
+        if self.sandbox:
+            return self.sandbox.call(method, *args, timeout=self.timeout)
+        return method(*args)
+
+    def docx_to_html(self, file_path: str, content_hash: str = None) -> str:
         """
         Convert a docx file to HTML for Tiptap editor.
 
         Args:
             file_path: Path to the docx file
+            content_hash: SHA-256 of the file, used as the conversion cache key
 
         Returns:
             HTML string
         """
+        if self.cache and content_hash:
+            cached = self.cache.get(content_hash)
+            if cached is not None:
+                return cached
+
+        html = self._run(self._docx_to_html, file_path)
+
+        if self.cache and content_hash:
+            self.cache.put(content_hash, html)
+        return html
+
+    def _docx_to_html(self, file_path: str) -> str:
+        convert_options = {}
+        if self.media_store:
+            # Write images to the media store instead of inlining base64 data URIs
+            convert_options['convert_image'] = mammoth.images.img_element(self._store_image)
+
+        if self._use_streaming(file_path):
+            out = io.StringIO()
+            StreamingDocxImporter(**convert_options).convert(file_path, out)
+            return out.getvalue()
+
         with open(file_path, 'rb') as docx_file:
-            result = mammoth.convert_to_html(docx_file)
+            result = mammoth.convert_to_html(docx_file, **convert_options)
             return result.value
 
-    def html_to_docx(self, html_content: str, title: str) -> str:
+    def _use_streaming(self, file_path: str) -> bool:
+        if self.streaming_threshold_bytes is None:
+            return False
+        return os.path.getsize(file_path) >= self.streaming_threshold_bytes
+
+    def _store_image(self, image) -> dict:
+        """mammoth image handler that saves image bytes to the media store."""
+        with image.open() as image_bytes:
+            url = self.media_store.save(image_bytes.read(), image.content_type)
+        return {'src': url}
+
+    def html_to_docx(self, html_content: str, title: str) -> DocxOutput:
         """
-        Convert HTML content to a docx file.
+        Convert HTML content to a docx package.
 
         Args:
             html_content: HTML string from Tiptap editor
             title: Document title
 
         Returns:
-            Path to the generated docx file
+            The generated package; read it with ``open()``
         """
-        from bs4 import BeautifulSoup
+        return self._run(self._html_to_docx, html_content, title)
 
+    def _html_to_docx(self, html_content: str, title: str) -> DocxOutput:
         # Create a new document
-        doc = Document()
+        doc = open_document(engine=self.docx_engine, template=self.template_path)
 
         # Parse HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = parse_html(html_content, self.html_parser)
 
         # Process page setup if present
         page_setup_elem = soup.find('page-setup')
@@ -79,12 +157,9 @@ class DocumentConverter:
             if element.name not in ['page-setup', 'header', 'footer']:
                 self._process_element(doc, element)
 
-        # Save to temp file
-        temp_dir = tempfile.gettempdir()
-        output_path = os.path.join(temp_dir, f'{uuid.uuid4()}.docx')
-        doc.save(output_path)
+        compact_document(doc)
 
-        return output_path
+        return save_docx(doc, self.max_memory_bytes, scratch_dir=self.scratch_dir)
 
     def _process_element(self, doc: Document, element):
         """Process an HTML element and add it to the document."""
@@ -96,23 +171,21 @@ class DocumentConverter:
             return
 
         # Get element styles
-        styles = {}
-        if hasattr(element, 'get') and element.get('style'):
-            styles = self.style_parser.parse_style_string(element.get('style'))
+        styles = element.get('style') if hasattr(element, 'get') else None
 
         if element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
             level = int(element.name[1])
             heading = doc.add_heading('', level=level)
             self._process_inline(heading, element)
             if styles:
-                para_style = self.style_parser.parse_paragraph_style(styles)
+                para_style = self.style_parser.paragraph_style(styles)
                 self.style_parser.apply_paragraph_style(heading, para_style)
 
         elif element.name == 'p':
             para = doc.add_paragraph()
             self._process_inline(para, element)
             if styles:
-                para_style = self.style_parser.parse_paragraph_style(styles)
+                para_style = self.style_parser.paragraph_style(styles)
                 self.style_parser.apply_paragraph_style(para, para_style)
 
         elif element.name == 'ul':
@@ -120,8 +193,7 @@ class DocumentConverter:
                 para = doc.add_paragraph(style='List Bullet')
                 self._process_inline(para, li)
                 if li.get('style'):
-                    li_styles = self.style_parser.parse_style_string(li.get('style'))
-                    para_style = self.style_parser.parse_paragraph_style(li_styles)
+                    para_style = self.style_parser.paragraph_style(li.get('style'))
                     self.style_parser.apply_paragraph_style(para, para_style)
 
         elif element.name == 'ol':
@@ -129,8 +201,7 @@ class DocumentConverter:
                 para = doc.add_paragraph(style='List Number')
                 self._process_inline(para, li)
                 if li.get('style'):
-                    li_styles = self.style_parser.parse_style_string(li.get('style'))
-                    para_style = self.style_parser.parse_paragraph_style(li_styles)
+                    para_style = self.style_parser.paragraph_style(li.get('style'))
                     self.style_parser.apply_paragraph_style(para, para_style)
 
         elif element.name == 'blockquote':
@@ -138,12 +209,15 @@ class DocumentConverter:
             para.style = 'Quote'
             self._process_inline(para, element)
             if styles:
-                para_style = self.style_parser.parse_paragraph_style(styles)
+                para_style = self.style_parser.paragraph_style(styles)
                 self.style_parser.apply_paragraph_style(para, para_style)
 
         elif element.name == 'table':
             self._process_table(doc, element)
 
+        elif element.name == 'img':
+            self._add_image(doc.add_paragraph(), element)
+
         elif element.name in ['div', 'section', 'article']:
             # Container elements - process children
             for child in element.children:
@@ -172,8 +246,7 @@ class DocumentConverter:
             elif child.name == 'span':
                 run = paragraph.add_run(child.get_text())
                 if child.get('style'):
-                    span_styles = self.style_parser.parse_style_string(child.get('style'))
-                    font_style = self.style_parser.parse_font_style(span_styles)
+                    font_style = self.style_parser.font_style(child.get('style'))
                     self.style_parser.apply_font_style(run, font_style)
             elif child.name == 'a':
                 # Links - add text with underline
@@ -181,29 +254,41 @@ class DocumentConverter:
                 run.underline = True
             elif child.name == 'br':
                 paragraph.add_run('\n')
+            elif child.name == 'img':
+                self._add_image(paragraph, child)
             else:
                 # Recursively process nested inline elements
                 self._process_inline(paragraph, child)
 
-    def _process_table(self, doc: Document, table_element):
-        """Process an HTML table element."""
-        rows = table_element.find_all('tr')
-        if not rows:
+    def _add_image(self, paragraph, img_element):
+        """Embed an <img> (data URI or media store URL) as an inline picture."""
+        stream = open_image(img_element.get('src'), self.media_store)
+        if stream is None:
             return
 
-        # Count columns from first row
-        first_row = rows[0]
-        cols = len(first_row.find_all(['td', 'th']))
+        width = None
+        if str(img_element.get('width', '')).isdigit():
+            width = self.style_parser.parse_size(f"{img_element.get('width')}px")
 
-        if cols == 0:
-            return
+        try:
+            paragraph.add_run().add_picture(stream, width=width)
+        except UnrecognizedImageError:
+            pass  # Formats python-docx cannot embed (e.g. WMF) are skipped
 
-        # Create table
-        table = doc.add_table(rows=len(rows), cols=cols)
-        table.style = 'Table Grid'
-
-        for i, row in enumerate(rows):
-            cells = row.find_all(['td', 'th'])
-            for j, cell in enumerate(cells):
-                if j < cols:
-                    table.rows[i].cells[j].text = cell.get_text()
+    def _process_table(self, doc: Document, table_element):
+        """Process an HTML table element."""
+        rows = []
+        for row in table_element.find_all('tr'):
+            cells = []
+            for cell in row.find_all(['td', 'th'], recursive=False):
+                styles = self.style_parser.parse_style_string(cell.get('style'))
+                cells.append(cell_from_html(cell, styles, self.style_parser))
+            rows.append(cells)
+        build_table(doc, rows, self._fill_cell)
+
+    def _fill_cell(self, paragraph, cell: TableCell):
+        """Write a table cell's inline content and paragraph formatting."""
+        self._process_inline(paragraph, cell.content)
+        if cell.content.get('style'):
+            para_style = self.style_parser.paragraph_style(cell.content.get('style'))
+            self.style_parser.apply_paragraph_style(paragraph, para_style)
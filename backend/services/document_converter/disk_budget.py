@@ -0,0 +1,117 @@
+"""
+Byte budget of a cache directory shared by several processes.
+
+Scanning the directory on every write makes each write cost as much as the
+number of entries. ``DiskBudget`` scans it once, then only counts what this
+process writes, and scans again when those writes could have used up the
+room left at the last scan. Eviction goes down to ``LOW_WATER`` of the
+budget, so scans stay rare while the cache is full.
+
+Other processes writing to the same directory are only seen at scans, so
+the budget is approximate: with N writers it can be exceeded by up to N
+times the room left at their last scans.
+"""
+import os
+import time
+import threading
+from typing import Callable, Optional
+
+# Eviction stops at this fraction of the budget
+LOW_WATER = 0.9
+
+
+class DiskBudget:
+    """Keep the entries of a directory tree within a byte budget.
+
+    Entries are files ending in ``suffix``; their mtime is their last use,
+    so the least recently used go first. Entries older than ``ttl`` are
+    removed whenever the directory is scanned.
+    """
+
+    def __init__(self, root_dir: str, max_bytes: int, suffix: str,
+                 ttl: Optional[int] = None,
+                 on_evict: Optional[Callable[[int], None]] = None):
+        """
+        Args:
+            root_dir: Cache directory
+            max_bytes: Total size of all entries
+            suffix: File name suffix of entries; other files are ignored
+            ttl: Seconds after which an unused entry expires
+            on_evict: Called with the number of entries each scan evicted
+        """
+        self.root_dir = str(root_dir)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._lock = threading.Lock()
+        self._room: Optional[int] = None  # Bytes left at the last scan; None before the first
+        self._written = 0  # Bytes written by this process since then
+
+    def added(self, size: int):
+        """Record a written entry and evict if the budget may be exceeded."""
+        with self._lock:
+            self._written += size
+            due = self._room is None or self._written > self._room
+            if due:
+                # Other writers wait for this scan instead of starting their own
+                self._room = self._written = 0
+        if due:
+            self.scan()
+
+    def reset(self):
+        """Forget the last scan, e.g. after entries were removed behind its back."""
+        with self._lock:
+            self._room = None
+            self._written = 0
+
+    def scan(self) -> int:
+        """
+        Total the directory, removing expired and least recently used entries.
+
+        Returns:
+            Bytes used by the remaining entries
+        """
+        now = time.time()
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.root_dir):
+            for name in files:
+                if not name.endswith(self.suffix):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if self.ttl and now - stat.st_mtime > self.ttl:
+                    _remove(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        evicted = 0
+        if total > self.max_bytes:
+            target = int(self.max_bytes * LOW_WATER)
+            entries.sort()
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                if _remove(path):
+                    total -= size
+                    evicted += 1
+
+        with self._lock:
+            self._room = max(self.max_bytes - total, 0)
+            self._written = 0
+        if evicted and self.on_evict:
+            self.on_evict(evicted)
+        return total
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
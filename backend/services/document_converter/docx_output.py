@@ -0,0 +1,253 @@
+"""
+Generated docx packages handed from the converters to their callers.
+
+Packages are written to memory, and only moved to a temporary file once
+they grow past a size limit. Preview saves can copy the compressed bytes
+of parts that did not change from the previous package instead of
+deflating them again. ``DocxOutput`` can be returned from a sandbox
+worker process; ``open`` gives the caller a readable stream and removes the
+temporary file, so exports and previews leave nothing behind on disk.
+"""
+import io
+import os
+import copy
+import zlib
+import struct
+import hashlib
+import tempfile
+import zipfile
+from typing import BinaryIO, Optional
+
+from docx.opc.pkgwriter import PackageWriter
+
+from .ooxml_writer import OoxmlDocument
+
+# Packages up to this size stay in memory
+DEFAULT_MAX_MEMORY_BYTES = 16 * 1024 * 1024
+
+# Names of packages spilled to the scratch directory
+SCRATCH_PREFIX = 'doc-studio-'
+SCRATCH_SUFFIX = '.docx'
+
+# Bump when the converters write different docx output for the same input
+OUTPUT_VERSION = 1
+
+
+def content_fingerprint(title: str, html: str) -> str:
+    """
+    Fingerprint everything in a document that shapes its generated docx.
+
+    Page setup, header and footer are part of the editor HTML, so the
+    title and the HTML cover them.
+
+    Returns:
+        SHA-256 hex digest
+    """
+    digest = hashlib.sha256()
+    digest.update(f'{OUTPUT_VERSION}:{len(title)}:'.encode())
+    digest.update(title.encode())
+    digest.update(html.encode())
+    return digest.hexdigest()
+
+
+class DocxOutput:
+    """A generated docx, as bytes or as a temporary file owned by the reader."""
+
+    def __init__(self, data: Optional[bytes] = None, path: Optional[str] = None):
+        self.data = data
+        self.path = path
+
+    @property
+    def size(self) -> int:
+        return len(self.data) if self.data is not None else os.path.getsize(self.path)
+
+    def open(self) -> BinaryIO:
+        """
+        Get the package as a binary stream positioned at the start.
+
+        A temporary file is unlinked as soon as it is open; it goes away
+        when the stream is closed.
+        """
+        if self.data is not None:
+            return io.BytesIO(self.data)
+        stream = open(self.path, 'rb')
+        self.discard()
+        return stream
+
+    def discard(self):
+        """Remove the temporary file, if there is one."""
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+
+class _SpooledWriter(io.RawIOBase):
+    """Seekable sink kept in memory up to max_size, then moved to a named temp file."""
+
+    def __init__(self, max_size: int, scratch_dir: Optional[str] = None):
+        self._max_size = max_size
+        self._scratch_dir = scratch_dir
+        self._file = io.BytesIO()
+        self.path: Optional[str] = None
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def write(self, data) -> int:
+        if self.path is None and self._file.tell() + len(data) > self._max_size:
+            self._rollover()
+        return self._file.write(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        super().close()
+        if self.path is not None:
+            self._file.close()
+
+    def _rollover(self):
+        if self._scratch_dir:
+            os.makedirs(self._scratch_dir, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix=SCRATCH_PREFIX, suffix=SCRATCH_SUFFIX,
+                                         dir=self._scratch_dir or None)
+        spilled = os.fdopen(fd, 'w+b')
+        spilled.write(self._file.getvalue())
+        spilled.seek(self._file.tell())
+        self._file = spilled
+
+    def getvalue(self) -> bytes:
+        return self._file.getvalue()
+
+
+class _PartReusingWriter:
+    """PhysPkgWriter for python-docx that copies unchanged parts of a base package.
+
+    A part whose serialized XML equals the base package's member is copied
+    as already-compressed bytes; other parts are compressed at
+    ``compress_level`` (0 stores them uncompressed).
+    """
+
+    # Local file header: signature .. extra field length
+    _LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+
+    def __init__(self, stream, base: Optional[bytes], compress_level: Optional[int]):
+        compression = zipfile.ZIP_STORED if compress_level == 0 else zipfile.ZIP_DEFLATED
+        self._zipf = zipfile.ZipFile(stream, 'w', compression=compression,
+                                     compresslevel=compress_level or None)
+        self._base_data = base
+        self._base = zipfile.ZipFile(io.BytesIO(base)) if base else None
+        self.reused = 0
+
+    def write(self, pack_uri, blob: bytes):
+        name = pack_uri.membername
+        info = self._unchanged(name, blob)
+        if info is None:
+            self._zipf.writestr(name, blob)
+        else:
+            self._copy(info)
+            self.reused += 1
+
+    def close(self):
+        self._zipf.close()
+        if self._base is not None:
+            self._base.close()
+
+    def _unchanged(self, name: str, blob: bytes) -> Optional[zipfile.ZipInfo]:
+        """Get the base member holding exactly this blob, if any."""
+        if self._base is None:
+            return None
+        try:
+            info = self._base.getinfo(name)
+        except KeyError:
+            return None
+        if info.file_size != len(blob) or info.CRC != zlib.crc32(blob):
+            return None
+        # Inflating is far cheaper than deflating; rule out CRC collisions
+        return info if self._base.read(info) == blob else None
+
+    def _copy(self, info: zipfile.ZipInfo):
+        """Append a base member without recompressing it."""
+        header = self._LOCAL_HEADER.unpack_from(self._base_data, info.header_offset)
+        start = info.header_offset + self._LOCAL_HEADER.size + header[-2] + header[-1]
+        raw = self._base_data[start:start + info.compress_size]
+
+        copied = copy.copy(info)
+        copied.flag_bits &= ~0x08  # Sizes go in the local header, no data descriptor
+        copied.extra = b''
+        zipf = self._zipf
+        copied.header_offset = zipf.fp.tell()
+        zipf.fp.write(copied.FileHeader(False))
+        zipf.fp.write(raw)
+        zipf.start_dir = zipf.fp.tell()
+        zipf.filelist.append(copied)
+        zipf.NameToInfo[copied.filename] = copied
+        zipf._didModify = True
+
+
+def _write_package(doc, stream, base: Optional[bytes], compress_level: Optional[int]):
+    """Write a document's package as python-docx would, through _PartReusingWriter."""
+    if isinstance(doc, OoxmlDocument):
+        doc._flush()
+        doc = doc._document
+    package = doc.part.package
+    for part in package.parts:
+        part.before_marshal()
+    writer = _PartReusingWriter(stream, base, compress_level)
+    try:
+        PackageWriter._write_content_types_stream(writer, package.parts)
+        PackageWriter._write_pkg_rels(writer, package.rels)
+        PackageWriter._write_parts(writer, package.parts)
+    finally:
+        writer.close()
+
+
+def save_docx(doc, max_memory_bytes: Optional[int] = None, base: Optional[bytes] = None,
+              compress_level: Optional[int] = None,
+              scratch_dir: Optional[str] = None) -> DocxOutput:
+    """
+    Save a python-docx Document without leaving files on disk.
+
+    Args:
+        doc: Document (or OoxmlDocument) to save
+        max_memory_bytes: Size above which the package goes to a temporary
+            file instead of memory
+        base: Previous package of the same document; parts that did not
+            change are copied from it without recompressing
+        compress_level: zlib level for parts that are written, 0 to store
+            them; None keeps python-docx's default deflate
+        scratch_dir: Directory for packages too large for memory; None for
+            the system temp directory
+
+    Returns:
+        The saved package
+    """
+    if max_memory_bytes is None:
+        max_memory_bytes = DEFAULT_MAX_MEMORY_BYTES
+    writer = _SpooledWriter(max_memory_bytes, scratch_dir)
+    try:
+        if base is None and compress_level is None:
+            doc.save(writer)
+        else:
+            _write_package(doc, writer, base, compress_level)
+    except BaseException:
+        writer.close()
+        if writer.path is not None:
+            os.remove(writer.path)
+        raise
+    if writer.path is None:
+        return DocxOutput(data=writer.getvalue())
+    writer.close()
+    return DocxOutput(path=writer.path)
@@ -0,0 +1,86 @@
+"""
+Disk cache of generated docx exports.
+"""
+import os
+import uuid
+import shutil
+from typing import BinaryIO, Optional, Dict, Any
+
+from .cache_stats import CacheStats
+from .disk_budget import DiskBudget
+from .docx_output import DocxOutput
+
+
+class ExportCache:
+    """Disk cache mapping a content and options hash to a generated docx.
+
+    Entries are shared by every worker that can see ``cache_dir``. Recency
+    is tracked through file mtimes, and the least recently used entries are
+    evicted once the cache grows past ``max_bytes``; the size is tracked
+    incrementally, see ``DiskBudget``.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = str(cache_dir)
+        self.max_bytes = max_bytes
+        self._stats = CacheStats('export cache')
+        self._budget = DiskBudget(
+            self.cache_dir, max_bytes, '.docx', on_evict=self._stats.evicted
+        )
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f'{key}.docx')
+
+    def get(self, key: str) -> Optional[BinaryIO]:
+        """
+        Open the cached docx for a key.
+
+        The stream stays readable if the entry is evicted meanwhile.
+
+        Returns:
+            Binary stream, or None on a miss
+        """
+        path = self._entry_path(key)
+        try:
+            stream = open(path, 'rb')
+        except OSError:
+            self._stats.miss()
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+
+        self._stats.hit()
+        return stream
+
+    def put(self, key: str, output: DocxOutput):
+        """Store a copy of a generated docx and evict old entries if needed."""
+        if output.size > self.max_bytes:
+            return
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temp file first so readers never see a partial entry
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                if output.data is not None:
+                    f.write(output.data)
+                else:
+                    with open(output.path, 'rb') as source:
+                        shutil.copyfileobj(source, f)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+        self._budget.added(output.size)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for this process."""
+        return self._stats.as_dict()
@@ -0,0 +1,99 @@
+"""
+Per-process cache of rendered docx body blocks.
+
+Rendering an element through python-docx costs far more than copying the
+``w:p`` / ``w:tbl`` elements it produced, and most elements are unchanged
+between previews or repeated across documents. Fragments are kept as
+parsed elements and handed out as deep copies, so callers may move and
+modify them freely.
+"""
+import copy
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from lxml import etree
+
+
+class FragmentCache:
+    """LRU of rendered blocks, bounded by their serialized size.
+
+    Pickling a cache (e.g. with a converter shipped to a sandbox worker)
+    only carries its budget: it unpickles as the receiving process's own
+    shared cache, which then persists across that worker's jobs.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (blocks, size)
+        self._entries: OrderedDict = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __reduce__(self):
+        return shared_fragment_cache, (self.max_bytes,)
+
+    def get(self, key: str) -> Optional[List[Any]]:
+        """Return fresh copies of the blocks stored for a key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return [copy.deepcopy(block) for block in entry[0]]
+
+    def put(self, key: str, blocks: List[Any]):
+        """Store copies of an element's blocks and evict old entries if needed."""
+        size = sum(len(etree.tostring(block)) for block in blocks)
+        if size > self.max_bytes:
+            return
+        blocks = [copy.deepcopy(block) for block in blocks]
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (blocks, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[1]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._size,
+            }
+
+
+_shared: Dict[int, FragmentCache] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_fragment_cache(max_bytes: int) -> FragmentCache:
+    """Get this process's fragment cache with the given budget."""
+    with _shared_lock:
+        cache = _shared.get(max_bytes)
+        if cache is None:
+            cache = _shared[max_bytes] = FragmentCache(max_bytes)
+        return cache
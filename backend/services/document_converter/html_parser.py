@@ -0,0 +1,37 @@
+"""
+HTML parsing shared by the HTML to docx converters.
+"""
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+except ImportError:  # Fall back to the pure-Python parser
+    lxml = None
+
+PARSERS = ('lxml', 'html.parser')
+
+
+def resolve_parser(parser: str = None) -> str:
+    """Pick the BeautifulSoup parser to use, falling back if lxml is missing."""
+    parser = parser or 'lxml'
+    if parser not in PARSERS:
+        raise ValueError(f'Unknown HTML parser: {parser}')
+    if parser == 'lxml' and lxml is None:
+        return 'html.parser'
+    return parser
+
+
+def parse_html(html: str, parser: str = None):
+    """
+    Parse editor HTML once into a tree.
+
+    Args:
+        html: HTML fragment from the editor
+        parser: 'lxml' (default) or 'html.parser'
+
+    Returns:
+        The node whose children are the fragment's top-level elements
+    """
+    soup = BeautifulSoup(html, resolve_parser(parser))
+    # lxml wraps fragments in <html><body>
+    return soup.body if soup.body is not None else soup
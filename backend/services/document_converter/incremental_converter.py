@@ -1,20 +1,43 @@
 """
 Incremental document converter for efficient docx updates.
 """
+import io
 import os
-import uuid
 import hashlib
-import tempfile
 import copy
-from dataclasses import dataclass, field
+import logging
+from bisect import bisect_left
+from itertools import islice
+from dataclasses import dataclass, field, fields
 from typing import List, Optional, Dict, Any, Tuple
 from enum import Enum
 
-from bs4 import BeautifulSoup, Tag
+from bs4 import Tag
 from docx import Document
-from docx.shared import Pt, Inches
+from docx.oxml.ns import qn
+from docx.shared import Pt, Inches, Emu
+from docx.image.exceptions import UnrecognizedImageError
 
 from .style_parser import StyleParser, FontStyle, ParagraphStyle, PageSetup
+from .html_parser import parse_html
+from .ooxml_writer import add_blocks, open_document
+from .ooxml_compact import coalesce_blocks, compact_blocks, compact_document
+from .docx_output import DocxOutput, save_docx
+from .table_builder import TableCell, build_table, cell_from_html
+from .media_store import MediaStore, open_image
+from .sandbox import ConversionSandbox
+from .preview_cache import PreviewCache, MemoryPreviewCache
+from .fragment_cache import FragmentCache, shared_fragment_cache
+
+logger = logging.getLogger(__name__)
+
+_SECT_PR = qn('w:sectPr')
+
+# Budget of the per-process preview cache used when none is given
+DEFAULT_PREVIEW_CACHE_BYTES = 256 * 1024 * 1024
+
+# Budget of the per-process fragment cache used when none is given
+DEFAULT_FRAGMENT_CACHE_BYTES = 32 * 1024 * 1024
 
 
 class ElementType(Enum):
@@ -47,10 +70,26 @@ class DocumentElement:
     list_type: str = ''  # 'bullet' or 'number'
     styles: Dict[str, str] = field(default_factory=dict)
     children: List['DocumentElement'] = field(default_factory=list)  # For tables
+    # Parsed node this element came from, reused when building the docx
+    node: Optional[Tag] = field(default=None, repr=False, compare=False)
+    # Hash of an element restored without its HTML, see DocumentStructure.from_dict
+    digest: Optional[str] = field(default=None, repr=False, compare=False)
+
+    def __getstate__(self):
+        # Parse trees are not pickled across processes; html is re-parsed if needed
+        state = self.__dict__.copy()
+        state['node'] = None
+        return state
 
     def get_hash(self) -> str:
-        """Get content hash for comparison."""
-        content = f"{self.type.value}:{self.level}:{self.content}:{self.list_type}"
+        """Get content hash for comparison.
+
+        Covers the element's HTML, so inline formatting and image sources
+        (content-addressed in the media store) count as changes.
+        """
+        if self.digest is not None:
+            return self.digest
+        content = f"{self.type.value}:{self.level}:{self.list_type}:{self.html}"
         return hashlib.md5(content.encode()).hexdigest()[:16]
 
 
@@ -66,20 +105,23 @@ class Change:
 class DocumentStructure:
     """Parse HTML into structured document representation."""
 
-    def __init__(self, html: str):
+    def __init__(self, html: str, parser: Optional[str] = None):
         self.html = html
+        self.parser = parser
         self.elements: List[DocumentElement] = []
         self.page_setup: Optional[PageSetup] = None
         self.header_content: str = ''
         self.footer_content: str = ''
+        # Body blocks (w:p/w:tbl) each element produced in the docx built from it
+        self.block_counts: List[int] = []
         self._parse()
 
     def _parse(self):
         """Parse HTML into elements."""
-        soup = BeautifulSoup(self.html, 'html.parser')
+        root = parse_html(self.html, self.parser)
         style_parser = StyleParser()
 
-        for element in soup.children:
+        for element in root.children:
             if isinstance(element, Tag):
                 self._parse_element(element, style_parser)
 
@@ -131,7 +173,8 @@ class DocumentStructure:
                 type=ElementType.PARAGRAPH,
                 content=element.get_text(),
                 html=str(element),
-                styles=styles
+                styles=styles,
+                node=element
             ))
 
         # Lists
@@ -169,11 +212,16 @@ class DocumentStructure:
             # Parse table structure
             for row in element.find_all('tr'):
                 row_children = []
-                for cell in row.find_all(['td', 'th']):
+                for cell in row.find_all(['td', 'th'], recursive=False):
+                    cell_styles = {}
+                    if cell.get('style'):
+                        cell_styles = style_parser.parse_style_string(cell.get('style'))
                     row_children.append(DocumentElement(
                         type=ElementType.PARAGRAPH,
                         content=cell.get_text(),
-                        html=str(cell)
+                        html=str(cell),
+                        styles=cell_styles,
+                        node=cell
                     ))
                 if row_children:
                     table_elem.children.append(DocumentElement(
@@ -190,6 +238,14 @@ class DocumentStructure:
                 if isinstance(child, Tag):
                     self._parse_element(child, style_parser)
 
+    def release_tree(self):
+        """Drop references to the parse tree once the docx has been built."""
+        pending = list(self.elements)
+        while pending:
+            element = pending.pop()
+            element.node = None
+            pending.extend(element.children)
+
     def get_hash(self) -> str:
         """Get hash of entire document structure."""
         content = ''.join(e.get_hash() for e in self.elements)
@@ -199,110 +255,301 @@ class DocumentStructure:
         """Get list of element hashes."""
         return [e.get_hash() for e in self.elements]
 
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get what the next preview needs from this structure, as JSON types.
+
+        Elements keep only their type and hash, which is enough to diff
+        against and to patch the package built from this structure.
+        """
+        page_setup = None
+        if self.page_setup is not None:
+            page_setup = {f.name: getattr(self.page_setup, f.name) for f in fields(PageSetup)}
+        return {
+            'elements': [[e.type.value, e.level, e.list_type, e.get_hash()] for e in self.elements],
+            'block_counts': self.block_counts,
+            'page_setup': page_setup,
+            'header': self.header_content,
+            'footer': self.footer_content,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DocumentStructure':
+        """
+        Rebuild a structure saved with to_dict.
+
+        Raises:
+            ValueError: If data was not written by to_dict
+        """
+        try:
+            structure = cls.__new__(cls)
+            structure.html = ''
+            structure.parser = None
+            structure.elements = [
+                DocumentElement(type=ElementType(type_), content='', html='', level=int(level),
+                                list_type=str(list_type), digest=str(digest))
+                for type_, level, list_type, digest in data['elements']
+            ]
+            structure.block_counts = [int(count) for count in data['block_counts']]
+            page_setup = data['page_setup']
+            structure.page_setup = None if page_setup is None else PageSetup(**{
+                name: None if value is None else Emu(int(value))
+                for name, value in page_setup.items()
+            })
+            structure.header_content = str(data['header'])
+            structure.footer_content = str(data['footer'])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f'Not a saved document structure: {e}') from e
+        return structure
+
+    def same_section(self, other: 'DocumentStructure') -> bool:
+        """Check whether page setup, header and footer match another structure."""
+        return (self.page_setup == other.page_setup
+                and self.header_content == other.header_content
+                and self.footer_content == other.footer_content)
+
 
 class DocumentDiff:
-    """Calculate differences between two document structures."""
+    """Calculate differences between two document structures.
+
+    Common leading and trailing elements are trimmed first. Elements that
+    occur exactly once in both versions anchor the rest (patience diff),
+    and the gaps between anchors are diffed with Myers' linear-space
+    O((N+M)D) algorithm. A gap that needs more than ``max_gap_edits``
+    edits is treated as replaced outright instead of searched further.
+    """
+
+    def __init__(self, max_gap_edits: int = 1000):
+        self.max_gap_edits = max_gap_edits
 
     def diff(self, old: DocumentStructure, new: DocumentStructure) -> List[Change]:
-        """Calculate changes between old and new document."""
+        """Calculate changes between old and new document.
+
+        Elements are compared by hash, so a changed element shows up as a
+        delete plus an insert.
+        """
         changes = []
 
         old_hashes = old.get_element_hashes()
         new_hashes = new.get_element_hashes()
 
-        # Use LCS (Longest Common Subsequence) for diff
-        lcs = self._lcs(old_hashes, new_hashes)
-
         old_idx = 0
         new_idx = 0
-        lcs_idx = 0
-
-        while old_idx < len(old_hashes) or new_idx < len(new_hashes):
-            if lcs_idx < len(lcs):
-                # Skip to next LCS element
-                while old_idx < len(old_hashes) and old_hashes[old_idx] != lcs[lcs_idx]:
-                    changes.append(Change(
-                        type=ChangeType.DELETE,
-                        index=old_idx,
-                        old_element=old.elements[old_idx]
-                    ))
-                    old_idx += 1
+        for old_match, new_match in self._matches(old_hashes, new_hashes) + [
+                (len(old_hashes), len(new_hashes))]:
+            while old_idx < old_match:
+                changes.append(Change(
+                    type=ChangeType.DELETE,
+                    index=old_idx,
+                    old_element=old.elements[old_idx]
+                ))
+                old_idx += 1
 
-                while new_idx < len(new_hashes) and new_hashes[new_idx] != lcs[lcs_idx]:
-                    changes.append(Change(
-                        type=ChangeType.INSERT,
-                        index=new_idx,
-                        new_element=new.elements[new_idx]
-                    ))
-                    new_idx += 1
-
-                # Skip the matching element
-                if old_idx < len(old_hashes) and new_idx < len(new_hashes):
-                    # Check if styles changed
-                    if old.elements[old_idx].styles != new.elements[new_idx].styles:
-                        changes.append(Change(
-                            type=ChangeType.MODIFY,
-                            index=new_idx,
-                            old_element=old.elements[old_idx],
-                            new_element=new.elements[new_idx]
-                        ))
-                    old_idx += 1
-                    new_idx += 1
-                    lcs_idx += 1
-            else:
-                # No more LCS elements
-                while old_idx < len(old_hashes):
-                    changes.append(Change(
-                        type=ChangeType.DELETE,
-                        index=old_idx,
-                        old_element=old.elements[old_idx]
-                    ))
-                    old_idx += 1
+            while new_idx < new_match:
+                changes.append(Change(
+                    type=ChangeType.INSERT,
+                    index=new_idx,
+                    new_element=new.elements[new_idx]
+                ))
+                new_idx += 1
 
-                while new_idx < len(new_hashes):
-                    changes.append(Change(
-                        type=ChangeType.INSERT,
-                        index=new_idx,
-                        new_element=new.elements[new_idx]
-                    ))
-                    new_idx += 1
+            # Skip the matching element; equal hashes mean equal styles too
+            old_idx += 1
+            new_idx += 1
 
         return changes
 
-    def _lcs(self, a: List[str], b: List[str]) -> List[str]:
-        """Find longest common subsequence."""
-        m, n = len(a), len(b)
-        dp = [[0] * (n + 1) for _ in range(m + 1)]
-
-        for i in range(1, m + 1):
-            for j in range(1, n + 1):
-                if a[i-1] == b[j-1]:
-                    dp[i][j] = dp[i-1][j-1] + 1
-                else:
-                    dp[i][j] = max(dp[i-1][j], dp[i][j-1])
-
-        # Backtrack to find LCS
-        result = []
-        i, j = m, n
-        while i > 0 and j > 0:
-            if a[i-1] == b[j-1]:
-                result.append(a[i-1])
-                i -= 1
-                j -= 1
-            elif dp[i-1][j] > dp[i][j-1]:
-                i -= 1
+    def _matches(self, a: List[str], b: List[str]) -> List[Tuple[int, int]]:
+        """Get (old index, new index) pairs of a common subsequence, in order."""
+        # Trim common prefix and suffix
+        prefix = 0
+        limit = min(len(a), len(b))
+        while prefix < limit and a[prefix] == b[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and a[-1 - suffix] == b[-1 - suffix]:
+            suffix += 1
+
+        matches = [(i, i) for i in range(prefix)]
+        a_hi, b_hi = len(a) - suffix, len(b) - suffix
+        a_lo = b_lo = prefix
+        for a_anchor, b_anchor in self._unique_anchors(a, a_lo, a_hi, b, b_lo, b_hi):
+            self._myers(a, a_lo, a_anchor, b, b_lo, b_anchor, matches)
+            matches.append((a_anchor, b_anchor))
+            a_lo, b_lo = a_anchor + 1, b_anchor + 1
+        self._myers(a, a_lo, a_hi, b, b_lo, b_hi, matches)
+        matches.extend((a_hi + i, b_hi + i) for i in range(suffix))
+        return matches
+
+    @staticmethod
+    def _unique_anchors(a, a_lo, a_hi, b, b_lo, b_hi) -> List[Tuple[int, int]]:
+        """Longest increasing run of elements that occur once in each range."""
+        # value -> its index, or -1 if it repeats (plain ints keep the GC out of it)
+        a_index: Dict[str, int] = {}
+        for i in range(a_lo, a_hi):
+            a_index[a[i]] = -1 if a[i] in a_index else i
+        b_index: Dict[str, int] = {}
+        for j in range(b_lo, b_hi):
+            b_index[b[j]] = -1 if b[j] in b_index else j
+        pairs = sorted((i, b_index[value]) for value, i in a_index.items()
+                       if i >= 0 and b_index.get(value, -1) >= 0)
+
+        # Longest increasing subsequence of new positions (patience sorting)
+        tail_values: List[int] = []  # Smallest new position ending a run of each length
+        tails: List[int] = []  # Index into pairs of that run's last pair
+        previous = [-1] * len(pairs)
+        for index, (_, j) in enumerate(pairs):
+            length = bisect_left(tail_values, j)
+            if length > 0:
+                previous[index] = tails[length - 1]
+            if length == len(tails):
+                tails.append(index)
+                tail_values.append(j)
             else:
-                j -= 1
+                tails[length] = index
+                tail_values[length] = j
+
+        anchors = []
+        index = tails[-1] if tails else -1
+        while index >= 0:
+            anchors.append(pairs[index])
+            index = previous[index]
+        return anchors[::-1]
+
+    def _myers(self, a, a_lo, a_hi, b, b_lo, b_hi, matches: List[Tuple[int, int]]):
+        """Append the matches between a[a_lo:a_hi] and b[b_lo:b_hi], in linear space."""
+        # Pending work in reverse order: ranges to split, and middle snakes to emit
+        stack: List[Tuple] = [(a_lo, a_hi, b_lo, b_hi)]
+        bounded = True
+        while stack:
+            item = stack.pop()
+            if len(item) == 3:
+                x, y, length = item
+                matches.extend((x + k, y + k) for k in range(length))
+                continue
+
+            a_lo, a_hi, b_lo, b_hi = item
+            if a_lo == a_hi or b_lo == b_hi:
+                continue
+            snake = self._middle_snake(a, a_lo, a_hi, b, b_lo, b_hi,
+                                       self.max_gap_edits if bounded else None)
+            bounded = False
+            if snake is None:
+                continue  # Too many edits: treat the whole range as replaced
+            x, y, u, v, edits = snake
+            if edits <= 1:
+                # The ranges differ by at most one element
+                i, j = a_lo, b_lo
+                while i < a_hi and j < b_hi:
+                    if a[i] == b[j]:
+                        matches.append((i, j))
+                        i += 1
+                        j += 1
+                    elif a_hi - a_lo > b_hi - b_lo:
+                        i += 1
+                    else:
+                        j += 1
+                continue
+            stack.append((u, a_hi, v, b_hi))
+            stack.append((x, y, u - x))
+            stack.append((a_lo, x, b_lo, y))
+
+    @staticmethod
+    def _middle_snake(a, a_lo, a_hi, b, b_lo, b_hi, max_edits: Optional[int]):
+        """
+        Find the middle snake of an optimal edit path (Myers 1986, section 4b).
 
-        return result[::-1]
+        Forward paths run from the start of both ranges, reverse paths from
+        their ends, each spending half of the edits.
+
+        Returns:
+            (x, y, u, v, edits): the snake from (x, y) to (u, v) in absolute
+            indices and the range's edit distance, or None if that exceeds
+            max_edits
+        """
+        n, m = a_hi - a_lo, b_hi - b_lo
+        delta = n - m
+        odd = delta & 1
+        half = (n + m + 1) // 2
+        if max_edits is not None:
+            half = min(half, max_edits // 2 + 1)
+        offset = half + 1
+        forward = [0] * (2 * offset + 1)
+        reverse = [0] * (2 * offset + 1)
+        for d in range(half + 1):
+            for k in range(-d, d + 1, 2):
+                if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                    x = forward[offset + k + 1]
+                else:
+                    x = forward[offset + k - 1] + 1
+                y = x - k
+                x0, y0 = x, y
+                while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                    x += 1
+                    y += 1
+                forward[offset + k] = x
+                if odd and delta - (d - 1) <= k <= delta + (d - 1) \
+                        and x + reverse[offset + delta - k] >= n:
+                    edits = 2 * d - 1
+                    if max_edits is not None and edits > max_edits:
+                        return None
+                    return a_lo + x0, b_lo + y0, a_lo + x, b_lo + y, edits
+
+            for k in range(-d, d + 1, 2):
+                if k == -d or (k != d and reverse[offset + k - 1] < reverse[offset + k + 1]):
+                    x = reverse[offset + k + 1]
+                else:
+                    x = reverse[offset + k - 1] + 1
+                y = x - k
+                x0, y0 = x, y
+                while x < n and y < m and a[a_hi - 1 - x] == b[b_hi - 1 - y]:
+                    x += 1
+                    y += 1
+                reverse[offset + k] = x
+                if not odd and -d <= delta - k <= d \
+                        and x + forward[offset + delta - k] >= n:
+                    edits = 2 * d
+                    if max_edits is not None and edits > max_edits:
+                        return None
+                    return a_hi - x, b_hi - y, a_hi - x0, b_hi - y0, edits
+        return None
 
 
 class IncrementalConverter:
     """Convert HTML to docx with incremental update support."""
 
-    def __init__(self):
+    def __init__(self, media_store: Optional[MediaStore] = None,
+                 sandbox: Optional[ConversionSandbox] = None,
+                 html_parser: Optional[str] = None,
+                 docx_engine: str = 'python-docx',
+                 template_path: Optional[str] = None,
+                 max_memory_bytes: Optional[int] = None,
+                 compress_level: Optional[int] = None,
+                 cache: Optional[PreviewCache] = None,
+                 scratch_dir: Optional[str] = None,
+                 fragments: Optional[FragmentCache] = None):
         self.style_parser = StyleParser()
-        self._cache: Dict[str, Tuple[str, DocumentStructure]] = {}  # doc_id -> (docx_path, structure)
+        self.media_store = media_store
+        self.sandbox = sandbox
+        self.html_parser = html_parser
+        self.docx_engine = docx_engine
+        self.template_path = template_path
+        self.max_memory_bytes = max_memory_bytes
+        self.compress_level = compress_level  # zlib level for preview parts, 0 stores them
+        self.scratch_dir = scratch_dir  # Where packages too large for memory are written
+        # doc_id -> (docx, structure) of the last preview
+        self.cache = cache if cache is not None else MemoryPreviewCache(DEFAULT_PREVIEW_CACHE_BYTES)
+        # Rendered blocks per element, shared by all documents of this process
+        self.fragments = (fragments if fragments is not None
+                          else shared_fragment_cache(DEFAULT_FRAGMENT_CACHE_BYTES))
+
+    def __getstate__(self):
+        # Shipped to sandbox workers without the per-document cache; the
+        # fragment cache unpickles as the worker's own
+        state = self.__dict__.copy()
+        state['cache'] = None
+        state['sandbox'] = None
+        return state
 
     def convert(self, html: str, doc_id: str = None) -> str:
         """
@@ -313,16 +560,56 @@ class IncrementalConverter:
             doc_id: Document ID for caching
 
         Returns:
-            Path to generated docx file
+            The generated package; read it with ``open()``
+        """
+        cached = self.cache.get(doc_id) if doc_id else None
+
+        if self.sandbox:
+            output, new_structure = self.sandbox.call(self.convert_detached, html, cached)
+        else:
+            output, new_structure = self.convert_detached(html, cached)
+
+        if doc_id:
+            if output.data is not None:
+                self.cache.put(doc_id, output.data, new_structure)
+            else:
+                # Packages spilled to disk belong to the caller; the next preview converts in full
+                self.cache.delete(doc_id)
+
+        return output
+
+    def convert_detached(self, html: str,
+                         cached: Optional[Tuple[Optional[bytes], DocumentStructure]] = None
+                         ) -> Tuple[DocxOutput, DocumentStructure]:
         """
-        new_structure = DocumentStructure(html)
+        Convert HTML to docx against an explicit cache entry.
+
+        Does not touch the converter's own cache, so it can run in a
+        sandbox worker process.
+
+        Args:
+            html: HTML content
+            cached: (docx bytes, structure) of the previous conversion
 
+        Returns:
+            (generated package, parsed structure)
+        """
+        new_structure = DocumentStructure(html, parser=self.html_parser)
+        try:
+            return self._convert_structure(new_structure, cached), new_structure
+        finally:
+            new_structure.release_tree()
+
+    def _convert_structure(self, new_structure: DocumentStructure,
+                           cached: Optional[Tuple[Optional[bytes], DocumentStructure]]
+                           ) -> DocxOutput:
         # Check cache for incremental update
-        if doc_id and doc_id in self._cache:
-            cached_path, old_structure = self._cache[doc_id]
+        if cached:
+            base_docx, old_structure = cached
 
-            # Check if cached file exists
-            if os.path.exists(cached_path):
+            # Check if the previous package was kept and can be patched
+            if (base_docx is not None and new_structure.same_section(old_structure)
+                    and len(old_structure.block_counts) == len(old_structure.elements)):
                 diff = DocumentDiff()
                 changes = diff.diff(old_structure, new_structure)
 
@@ -330,23 +617,22 @@ class IncrementalConverter:
                 change_ratio = len(changes) / max(len(new_structure.elements), 1)
                 if change_ratio < 0.5:  # Less than 50% changed
                     try:
-                        output_path = self._apply_incremental(cached_path, changes, new_structure)
-                        self._cache[doc_id] = (output_path, new_structure)
-                        return output_path
+                        return self._apply_incremental(
+                            base_docx, old_structure, changes, new_structure
+                        )
+                    except ValueError:
+                        pass  # Package does not match the structure, convert in full
                     except Exception:
-                        pass  # Fall back to full conversion
-
-        # Full conversion
-        output_path = self._convert_full(new_structure)
-
-        if doc_id:
-            self._cache[doc_id] = (output_path, new_structure)
+                        logger.exception('Incremental preview update failed, converting in full')
 
-        return output_path
+        # Full conversion, still reusing unchanged parts of the previous package
+        base_docx = cached[0] if cached else None
+        return self._convert_full(new_structure, base_docx)
 
-    def _convert_full(self, structure: DocumentStructure) -> str:
+    def _convert_full(self, structure: DocumentStructure,
+                      base_docx: Optional[bytes] = None) -> DocxOutput:
         """Perform full HTML to docx conversion."""
-        doc = Document()
+        doc = open_document(engine=self.docx_engine, template=self.template_path)
 
         # Apply page setup
         if structure.page_setup:
@@ -365,65 +651,178 @@ class IncrementalConverter:
             footer = section.footer
             footer.paragraphs[0].text = structure.footer_content
 
-        # Add elements
-        for element in structure.elements:
-            self._add_element(doc, element)
-
-        # Save
-        temp_dir = tempfile.gettempdir()
-        output_path = os.path.join(temp_dir, f'{uuid.uuid4()}.docx')
-        doc.save(output_path)
-
-        return output_path
-
-    def _apply_incremental(self, base_path: str, changes: List[Change],
-                          new_structure: DocumentStructure) -> str:
-        """Apply incremental changes to existing docx."""
-        doc = Document(base_path)
-
-        # For simplicity, we'll rebuild the document body
-        # but preserve styles and page setup
-
-        # Clear existing content
-        for para in list(doc.paragraphs):
-            p = para._element
-            p.getparent().remove(p)
+        # Add elements, copying the blocks of those rendered before
+        context = self._fragment_context(doc)
+        block_counts = []
+        rendered = []
+        for i, element in enumerate(structure.elements):
+            key = self._fragment_key(element, context)
+            blocks = self.fragments.get(key) if key else None
+            if blocks is None:
+                block_counts.append(self._add_element(doc, element))
+                rendered.append((i, key))
+            else:
+                add_blocks(doc, blocks)
+                block_counts.append(len(blocks))
+        structure.block_counts = block_counts
+
+        # Cached blocks come with their runs merged; keep new ones the same
+        # way, before named styles tie them to this document
+        if rendered:
+            blocks = iter(doc.element.body)
+            groups = [list(islice(blocks, count)) for count in block_counts]
+            for i, key in rendered:
+                coalesce_blocks(groups[i])
+                if key:
+                    self.fragments.put(key, groups[i])
+
+        compact_document(doc, coalesce=False)
+
+        return save_docx(doc, self.max_memory_bytes, base_docx, self.compress_level,
+                         self.scratch_dir)
+
+    def _apply_incremental(self, base_docx: bytes, old_structure: DocumentStructure,
+                          changes: List[Change], new_structure: DocumentStructure) -> DocxOutput:
+        """
+        Patch the previous docx with the changed elements only.
 
-        for table in list(doc.tables):
-            t = table._element
-            t.getparent().remove(t)
+        Blocks of deleted and modified elements are removed, and blocks for
+        inserted and modified elements are built and spliced in before the
+        next unchanged block. Unchanged blocks are not touched.
 
-        # Add new elements
-        for element in new_structure.elements:
-            self._add_element(doc, element)
+        Raises:
+            ValueError: If the package does not match the old structure
+        """
+        doc = open_document(io.BytesIO(base_docx), engine=self.docx_engine)
+        body = doc.element.body
+        sect_pr = body[-1] if len(body) and body[-1].tag == _SECT_PR else None
+        if sect_pr is None:
+            raise ValueError('Body has no final section properties')
+
+        # Group the old blocks by the element that produced them
+        old_groups = []
+        blocks = sect_pr.itersiblings(preceding=True)
+        for count in reversed(old_structure.block_counts):
+            group = list(islice(blocks, count))
+            if len(group) != count:
+                raise ValueError('Body does not match the cached structure')
+            old_groups.append(group[::-1])
+        if next(blocks, None) is not None:
+            raise ValueError('Body does not match the cached structure')
+        old_groups.reverse()
+
+        deleted = {c.index for c in changes if c.type == ChangeType.DELETE}
+        inserted = {c.index for c in changes if c.type == ChangeType.INSERT}
+        modified = {c.index for c in changes if c.type == ChangeType.MODIFY}
+
+        # Pair unchanged old elements with new ones, in order
+        kept = (j for j in range(len(old_groups)) if j not in deleted)
+        removed = [old_groups[j] for j in deleted]
+        reused: Dict[int, list] = {}
+        for i in range(len(new_structure.elements)):
+            if i in inserted:
+                continue
+            j = next(kept)
+            if i in modified:
+                removed.append(old_groups[j])
+            else:
+                reused[i] = old_groups[j]
+
+        removed_images = set()
+        for group in removed:
+            for node in group:
+                removed_images.update(node.xpath('.//@r:embed'))
+                body.remove(node)
+
+        # Build changed elements back to front, each before the next kept block
+        context = self._fragment_context(doc)
+        added = []
+        block_counts = [0] * len(new_structure.elements)
+        anchor = sect_pr
+        for i in range(len(new_structure.elements) - 1, -1, -1):
+            group = reused.get(i)
+            if group is None:
+                group = self._build_blocks(doc, new_structure.elements[i], context)
+                for node in group:
+                    anchor.addprevious(node)
+                added.extend(group)
+            block_counts[i] = len(group)
+            if group:
+                anchor = group[0]
+        new_structure.block_counts = block_counts
+
+        # Drop images only the removed blocks used
+        if removed_images:
+            in_use = set(doc.element.xpath('.//@r:embed'))
+            for rId in removed_images - in_use:
+                del doc.part.rels[rId]
+
+        compact_blocks(doc, added, coalesce=False)
+
+        return save_docx(doc, self.max_memory_bytes, base_docx, self.compress_level,
+                         self.scratch_dir)
+
+    def _build_blocks(self, doc, element: DocumentElement, context: str) -> list:
+        """Build an element's body blocks, or copy them from the fragment cache.
+
+        Runs of the blocks are merged. Built blocks are returned still in
+        the body, copies detached.
+        """
+        key = self._fragment_key(element, context)
+        if key:
+            blocks = self.fragments.get(key)
+            if blocks is not None:
+                return blocks
+
+        count = self._add_element(doc, element)
+        # Reading the body also flushes blocks an OoxmlDocument keeps pending
+        sect_pr = doc.element.body[-1]
+        blocks = list(islice(sect_pr.itersiblings(preceding=True), count))[::-1]
+        coalesce_blocks(blocks)
+        if key:
+            self.fragments.put(key, blocks)
+        return blocks
+
+    def _fragment_context(self, doc) -> str:
+        """Everything besides the element that its rendered blocks depend on.
+
+        Style ids come from the template and table widths from the page setup.
+        """
+        mtime = os.path.getmtime(self.template_path) if self.template_path else 0.0
+        return f'{self.docx_engine}:{self.template_path}:{mtime}:{doc._block_width}'
 
-        # Save to new file
-        temp_dir = tempfile.gettempdir()
-        output_path = os.path.join(temp_dir, f'{uuid.uuid4()}.docx')
-        doc.save(output_path)
+    @staticmethod
+    def _fragment_key(element: DocumentElement, context: str) -> Optional[str]:
+        """Fragment cache key of an element; None if its blocks cannot be shared."""
+        if '<img' in element.html:
+            return None  # Images reference relationships of their own package
+        return f'{element.get_hash()}:{context}'
 
-        return output_path
+    def _add_element(self, doc: Document, element: DocumentElement) -> int:
+        """
+        Add a document element to the docx.
 
-    def _add_element(self, doc: Document, element: DocumentElement):
-        """Add a document element to the docx."""
+        Returns:
+            Number of body blocks added
+        """
         if element.type == ElementType.HEADING:
             heading = doc.add_heading(element.content, level=element.level)
             if element.styles:
-                para_style = self.style_parser.parse_paragraph_style(element.styles)
+                para_style = self.style_parser.paragraph_style(element.styles)
                 self.style_parser.apply_paragraph_style(heading, para_style)
 
         elif element.type == ElementType.PARAGRAPH:
             para = doc.add_paragraph()
             self._add_inline_content(para, element)
             if element.styles:
-                para_style = self.style_parser.parse_paragraph_style(element.styles)
+                para_style = self.style_parser.paragraph_style(element.styles)
                 self.style_parser.apply_paragraph_style(para, para_style)
 
         elif element.type == ElementType.LIST_ITEM:
             style = 'List Bullet' if element.list_type == 'bullet' else 'List Number'
             para = doc.add_paragraph(element.content, style=style)
             if element.styles:
-                para_style = self.style_parser.parse_paragraph_style(element.styles)
+                para_style = self.style_parser.paragraph_style(element.styles)
                 self.style_parser.apply_paragraph_style(para, para_style)
 
         elif element.type == ElementType.BLOCKQUOTE:
@@ -431,14 +830,18 @@ class IncrementalConverter:
             para.style = 'Quote'
 
         elif element.type == ElementType.TABLE:
-            self._add_table(doc, element)
+            return 0 if self._add_table(doc, element) is None else 1
+
+        else:
+            return 0
+        return 1
 
     def _add_inline_content(self, paragraph, element: DocumentElement):
         """Add inline content with styles to paragraph."""
-        soup = BeautifulSoup(element.html, 'html.parser')
-
-        # Find the main element (p, div, etc.)
-        main_elem = soup.find(['p', 'div', 'span'])
+        main_elem = element.node
+        if main_elem is None:
+            # Find the main element (p, div, etc.)
+            main_elem = parse_html(element.html, self.html_parser).find(['p', 'div', 'span'])
         if main_elem:
             self._process_inline_children(paragraph, main_elem)
         else:
@@ -464,47 +867,71 @@ class IncrementalConverter:
             elif child.name == 'span':
                 run = paragraph.add_run(child.get_text())
                 if child.get('style'):
-                    styles = self.style_parser.parse_style_string(child.get('style'))
-                    font_style = self.style_parser.parse_font_style(styles)
+                    font_style = self.style_parser.font_style(child.get('style'))
                     self.style_parser.apply_font_style(run, font_style)
             elif child.name == 'a':
                 paragraph.add_run(child.get_text())
+            elif child.name == 'img':
+                self._add_image(paragraph, child)
             else:
                 paragraph.add_run(child.get_text())
 
-    def _add_table(self, doc: Document, element: DocumentElement):
-        """Add a table to the document."""
-        if not element.children:
+    def _add_image(self, paragraph, img_element):
+        """Embed an <img> (data URI or media store URL) as an inline picture."""
+        stream = open_image(img_element.get('src'), self.media_store)
+        if stream is None:
             return
 
-        rows = len(element.children)
-        cols = max(len(row.children) for row in element.children) if element.children else 0
-
-        if rows == 0 or cols == 0:
-            return
+        width = None
+        if str(img_element.get('width', '')).isdigit():
+            width = self.style_parser.parse_size(f"{img_element.get('width')}px")
 
-        table = doc.add_table(rows=rows, cols=cols)
-        table.style = 'Table Grid'
+        try:
+            paragraph.add_run().add_picture(stream, width=width)
+        except UnrecognizedImageError:
+            pass  # Formats python-docx cannot embed (e.g. WMF) are skipped
 
-        for i, row_elem in enumerate(element.children):
-            for j, cell_elem in enumerate(row_elem.children):
-                if j < cols:
-                    table.rows[i].cells[j].text = cell_elem.content
+    def _add_table(self, doc: Document, element: DocumentElement):
+        """Add a table to the document; None if it has no cells."""
+        rows = []
+        for row_elem in element.children:
+            cells = []
+            for cell_elem in row_elem.children:
+                if cell_elem.node is not None:
+                    cells.append(cell_from_html(
+                        cell_elem.node, cell_elem.styles, self.style_parser, content=cell_elem
+                    ))
+                else:
+                    cells.append(TableCell(content=cell_elem))
+            rows.append(cells)
+        return build_table(doc, rows, self._fill_cell)
+
+    def _fill_cell(self, paragraph, cell: TableCell):
+        """Write a table cell's inline content and paragraph formatting."""
+        element = cell.content
+        if element.node is not None:
+            self._process_inline_children(paragraph, element.node)
+        elif element.content:
+            paragraph.add_run(element.content)
+        if element.styles:
+            para_style = self.style_parser.paragraph_style(element.styles)
+            self.style_parser.apply_paragraph_style(paragraph, para_style)
 
     def clear_cache(self, doc_id: str = None):
-        """Clear cache for a document or all documents."""
+        """Clear cache for a document or all documents, for every process sharing it."""
         if doc_id:
-            if doc_id in self._cache:
-                del self._cache[doc_id]
+            self.cache.delete(doc_id)
         else:
-            self._cache.clear()
+            self.cache.clear()
+            self.fragments.clear()
 
     def get_cache_info(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """Get cache information for a document."""
-        if doc_id in self._cache:
-            path, structure = self._cache[doc_id]
+        cached = self.cache.get(doc_id)
+        if cached is not None:
+            base_docx, structure = cached
             return {
-                'cached_path': path,
+                'cached_size': len(base_docx),
                 'element_count': len(structure.elements),
                 'hash': structure.get_hash()
             }
@@ -515,9 +942,24 @@ class IncrementalConverter:
 _converter_instance: Optional[IncrementalConverter] = None
 
 
-def get_converter() -> IncrementalConverter:
+def get_converter(media_store: Optional[MediaStore] = None,
+                  sandbox: Optional[ConversionSandbox] = None,
+                  html_parser: Optional[str] = None,
+                  docx_engine: str = 'python-docx',
+                  template_path: Optional[str] = None,
+                  max_memory_bytes: Optional[int] = None,
+                  compress_level: Optional[int] = None,
+                  cache: Optional[PreviewCache] = None,
+                  scratch_dir: Optional[str] = None,
+                  fragments: Optional[FragmentCache] = None) -> IncrementalConverter:
     """Get global converter instance."""
     global _converter_instance
     if _converter_instance is None:
-        _converter_instance = IncrementalConverter()
+        _converter_instance = IncrementalConverter(
+            media_store=media_store, sandbox=sandbox,
+            html_parser=html_parser, docx_engine=docx_engine,
+            template_path=template_path, max_memory_bytes=max_memory_bytes,
+            compress_level=compress_level, cache=cache, scratch_dir=scratch_dir,
+            fragments=fragments
+        )
     return _converter_instance
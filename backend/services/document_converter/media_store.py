@@ -0,0 +1,102 @@
+"""
+Content-addressed store for images extracted from documents.
+"""
+import io
+import os
+import re
+import base64
+import hashlib
+import mimetypes
+import uuid
+from typing import Iterable, Optional
+from urllib.parse import urlparse
+
+
+class MediaStore:
+    """Write document images once under their SHA-256 and serve them by URL.
+
+    Files live at ``{root_dir}/{hash[:2]}/{hash}{ext}`` and are addressed as
+    ``{base_url}{hash[:2]}/{hash}{ext}``. URLs under any of ``aliases`` (e.g.
+    an earlier base URL still found in saved content) resolve as well.
+    """
+
+    FILENAME_RE = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]+$')
+
+    def __init__(self, root_dir: str, base_url: str, aliases: Iterable[str] = ()):
+        self.root_dir = str(root_dir)
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        # Compared without the leading slash, so relative and absolute URLs both match
+        self._base_paths = [
+            urlparse(url if url.endswith('/') else url + '/').path.lstrip('/')
+            for url in (self.base_url, *aliases)
+        ]
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def save(self, data: bytes, content_type: str) -> str:
+        """Store image bytes and return their URL."""
+        digest = hashlib.sha256(data).hexdigest()
+        ext = mimetypes.guess_extension(content_type or '') or '.bin'
+        if ext == '.jpe':
+            ext = '.jpg'
+        name = f'{digest}{ext}'
+        path = os.path.join(self.root_dir, digest[:2], name)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+
+        return f'{self.base_url}{digest[:2]}/{name}'
+
+    def path_for_url(self, url: str) -> Optional[str]:
+        """Map a store URL back to its file path, or None if it is not ours."""
+        if not url:
+            return None
+        url_path = urlparse(url).path.lstrip('/')
+        for base_path in self._base_paths:
+            if url_path.startswith(base_path):
+                parts = url_path[len(base_path):].split('/')
+                if len(parts) == 2:
+                    return self.path_for_name(parts[0], parts[1])
+        return None
+
+    def path_for_name(self, prefix: str, name: str) -> Optional[str]:
+        """Map the last two segments of a store URL to an existing file path, or None."""
+        if not self.FILENAME_RE.match(name) or prefix != name[:2]:
+            return None
+        path = os.path.join(self.root_dir, prefix, name)
+        return path if os.path.exists(path) else None
+
+
+def open_image(src: str, media_store: Optional[MediaStore] = None) -> Optional[io.BytesIO]:
+    """
+    Open an <img> source for embedding into a docx.
+
+    Args:
+        src: Data URI or media store URL
+        media_store: Store used to resolve URLs
+
+    Returns:
+        Image bytes as a stream, or None if the source cannot be resolved
+    """
+    if not src:
+        return None
+
+    if src.startswith('data:'):
+        header, _, payload = src.partition(',')
+        if ';base64' not in header:
+            return None
+        try:
+            return io.BytesIO(base64.b64decode(payload))
+        except ValueError:
+            return None
+
+    if media_store:
+        path = media_store.path_for_url(src)
+        if path:
+            with open(path, 'rb') as f:
+                return io.BytesIO(f.read())
+
+    return None
@@ -0,0 +1,465 @@
+"""
+Pool of long-lived headless LibreOffice workers for format conversion.
+
+Pooling needs the LibreOffice Python bindings (``uno``): workers are kept
+warm and receive jobs over a UNO socket. Without them there is nothing to
+keep warm, so ``create_office_pool`` returns a ``OneShotOfficeConverter``
+that runs a cold ``soffice --convert-to`` per job instead.
+"""
+import os
+import time
+import queue
+import socket
+import shutil
+import logging
+import threading
+import subprocess
+from pathlib import Path
+from typing import Optional, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+except ImportError:  # LibreOffice Python bindings not installed
+    uno = None
+
+# Ports tried from the base port on before giving up
+PORT_RANGE = 1000
+
+
+class OfficeConversionError(Exception):
+    """Raised when LibreOffice fails to convert a file."""
+
+
+# Export filter per (target extension, source family)
+EXPORT_FILTERS = {
+    ('pdf', 'text'): 'writer_pdf_Export',
+    ('pdf', 'presentation'): 'impress_pdf_Export',
+    ('docx', 'text'): 'MS Word 2007 XML',
+    ('pptx', 'presentation'): 'Impress MS PowerPoint 2007 XML',
+}
+
+SOURCE_FAMILIES = {
+    '.doc': 'text',
+    '.docx': 'text',
+    '.rtf': 'text',
+    '.odt': 'text',
+    '.ppt': 'presentation',
+    '.pptx': 'presentation',
+    '.odp': 'presentation',
+}
+
+
+def _props(**kwargs):
+    """Build a UNO PropertyValue tuple."""
+    return tuple(PropertyValue(Name=k, Value=v) for k, v in kwargs.items())
+
+
+class PortLease:
+    """A local TCP port reserved for one worker on this host.
+
+    Workers of every process on the host take a lock file per port, so two
+    processes never pick the same one; a bind test skips ports used by
+    anything else. The lock is released with ``release`` or when the
+    process exits.
+    """
+
+    def __init__(self, base_port: int, lock_dir: str):
+        os.makedirs(lock_dir, exist_ok=True)
+        for port in range(base_port, base_port + PORT_RANGE):
+            lock_file = self._lock(os.path.join(lock_dir, f'port-{port}.lock'))
+            if lock_file is None:
+                continue
+            if port_is_free(port):
+                self.port = port
+                self._lock_file = lock_file
+                return
+            lock_file.close()
+        raise OfficeConversionError(
+            f'No free port for a LibreOffice worker in {base_port}-{base_port + PORT_RANGE - 1}'
+        )
+
+    @staticmethod
+    def _lock(path: str):
+        lock_file = open(path, 'a')
+        if fcntl is None:
+            return lock_file
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def release(self):
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+def port_is_free(port: int) -> bool:
+    """Whether nothing listens on or holds a local port."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind(('127.0.0.1', port))
+        except OSError:
+            return False
+    return True
+
+
+class OfficeWorker:
+    """One warm headless soffice process with its own user profile.
+
+    The worker connects over UNO once per process start and keeps the
+    connection for its jobs and health checks.
+    """
+
+    def __init__(self, index: int, base_port: int, port_lock_dir: str, profile_dir: str,
+                 soffice_path: str = 'soffice', timeout: int = 120):
+        self.index = index
+        self.base_port = base_port
+        self.port_lock_dir = port_lock_dir
+        self.profile_dir = profile_dir
+        self.soffice_path = soffice_path
+        self.timeout = timeout
+        self.jobs_done = 0
+        self._process: Optional[subprocess.Popen] = None
+        self._lease: Optional[PortLease] = None
+        self._desktop = None
+
+    @property
+    def port(self) -> Optional[int]:
+        return self._lease.port if self._lease else None
+
+    @property
+    def profile_url(self) -> str:
+        return Path(self.profile_dir).absolute().as_uri()
+
+    def start(self):
+        """Launch the soffice process and connect to it."""
+        self.jobs_done = 0
+        # Keep the port across restarts unless something else took it meanwhile
+        if self._lease is None or not port_is_free(self._lease.port):
+            if self._lease is not None:
+                self._lease.release()
+            self._lease = PortLease(self.base_port, self.port_lock_dir)
+
+        self._process = subprocess.Popen([
+            self.soffice_path,
+            '--headless',
+            '--invisible',
+            '--nologo',
+            '--nodefault',
+            '--norestore',
+            f'-env:UserInstallation={self.profile_url}',
+            f'--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext',
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            self._desktop = self._connect(timeout=self.timeout)
+        except Exception:
+            self.stop()
+            raise
+        logger.info('Started LibreOffice worker %s on port %s', self.index, self.port)
+
+    def stop(self):
+        """Terminate the soffice process; its port stays reserved for a restart."""
+        self._desktop = None
+        if self._process is None:
+            return
+        self._process.terminate()
+        try:
+            self._process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._process = None
+
+    def close(self):
+        """Stop the worker and give up its port."""
+        self.stop()
+        if self._lease is not None:
+            self._lease.release()
+            self._lease = None
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+    def is_healthy(self) -> bool:
+        """Check that the process is alive and answering on its connection."""
+        if self._desktop is None or self._process is None or self._process.poll() is not None:
+            return False
+        try:
+            self._desktop.getComponents()
+        except Exception:
+            return False
+        return True
+
+    def _connect(self, timeout: float):
+        """Connect to the worker and return its Desktop service."""
+        local_ctx = uno.getComponentContext()
+        resolver = local_ctx.ServiceManager.createInstanceWithContext(
+            'com.sun.star.bridge.UnoUrlResolver', local_ctx
+        )
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                ctx = resolver.resolve(
+                    f'uno:socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext'
+                )
+                return ctx.ServiceManager.createInstanceWithContext(
+                    'com.sun.star.frame.Desktop', ctx
+                )
+            except Exception:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.25)
+
+    def convert(self, src_path: str, target_ext: str, out_dir: str) -> str:
+        """
+        Convert a file and return the output path.
+
+        Args:
+            src_path: Source document
+            target_ext: Target format without dot ('pdf', 'docx', 'pptx')
+            out_dir: Directory for the converted file
+
+        Returns:
+            Path to the converted file
+        """
+        base_name = os.path.splitext(os.path.basename(src_path))[0]
+        out_path = os.path.join(out_dir, f'{base_name}.{target_ext}')
+
+        family = SOURCE_FAMILIES.get(os.path.splitext(src_path)[1].lower())
+        filter_name = EXPORT_FILTERS.get((target_ext, family))
+        if filter_name is None:
+            raise OfficeConversionError(f'Cannot convert {src_path} to {target_ext}')
+
+        # Kill the worker if a job hangs; the pending UNO call then fails
+        watchdog = threading.Timer(self.timeout, self.stop)
+        watchdog.start()
+        try:
+            document = self._desktop.loadComponentFromURL(
+                uno.systemPathToFileUrl(os.path.abspath(src_path)),
+                '_blank', 0, _props(Hidden=True, ReadOnly=True)
+            )
+            if document is None:
+                raise OfficeConversionError(f'LibreOffice could not open {src_path}')
+            try:
+                document.storeToURL(
+                    uno.systemPathToFileUrl(os.path.abspath(out_path)),
+                    _props(FilterName=filter_name, Overwrite=True)
+                )
+            finally:
+                document.close(True)
+        finally:
+            watchdog.cancel()
+
+        self.jobs_done += 1
+        if not os.path.exists(out_path):
+            raise OfficeConversionError(f'{target_ext} conversion produced no output')
+        return out_path
+
+
+class OfficeWorkerPool:
+    """Hand conversion jobs to a fixed set of warm LibreOffice workers.
+
+    Requires the LibreOffice Python bindings; see ``create_office_pool``.
+    """
+
+    def __init__(self, size: int, profile_root: str, port_lock_dir: str,
+                 base_port: int = 2002, max_jobs_per_worker: int = 50,
+                 soffice_path: str = 'soffice', timeout: int = 120):
+        """
+        Args:
+            size: Number of soffice processes
+            profile_root: Directory for the workers' user profiles
+            port_lock_dir: Directory for port lock files, shared by every
+                process on the host
+            base_port: First UNO port tried
+            max_jobs_per_worker: Jobs after which a worker is recycled
+            soffice_path: LibreOffice executable
+            timeout: Seconds allowed per conversion
+        """
+        if uno is None:
+            raise OfficeConversionError(
+                'OfficeWorkerPool requires the LibreOffice Python bindings (uno)'
+            )
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.timeout = timeout
+        self._idle: 'queue.Queue[OfficeWorker]' = queue.Queue()
+        self._workers = []
+
+        for i in range(size):
+            profile_dir = os.path.join(profile_root, f'worker-{i}')
+            os.makedirs(profile_dir, exist_ok=True)
+            worker = OfficeWorker(
+                index=i,
+                base_port=base_port,
+                port_lock_dir=port_lock_dir,
+                profile_dir=profile_dir,
+                soffice_path=soffice_path,
+                timeout=timeout,
+            )
+            self._workers.append(worker)
+            self._idle.put(worker)
+
+    def convert(self, src_path: str, target_ext: str, out_dir: str) -> str:
+        """Run a conversion on the next free worker."""
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise OfficeConversionError('No LibreOffice worker available')
+
+        try:
+            if not worker.is_healthy():
+                try:
+                    worker.restart()
+                except OfficeConversionError:
+                    raise
+                except Exception as e:  # e.g. soffice_path does not exist
+                    raise OfficeConversionError(f'Could not start LibreOffice: {e}') from e
+            try:
+                return worker.convert(src_path, target_ext, out_dir)
+            except OfficeConversionError:
+                raise
+            except Exception as e:
+                worker.stop()  # Restarted lazily by the next health check
+                raise OfficeConversionError(str(e)) from e
+        finally:
+            if worker.jobs_done >= self.max_jobs_per_worker:
+                # Recycle to release memory LibreOffice accumulates across jobs
+                try:
+                    worker.restart()
+                except Exception:
+                    logger.exception('Failed to recycle LibreOffice worker %s', worker.index)
+            self._idle.put(worker)
+
+    def shutdown(self):
+        """Stop every worker process and release their ports."""
+        for worker in self._workers:
+            worker.close()
+
+
+class OneShotOfficeConverter:
+    """Convert with a cold ``soffice --convert-to`` process per job.
+
+    The fallback without the LibreOffice Python bindings. Nothing is kept
+    warm, so every job pays LibreOffice's startup; at most ``size`` run at
+    once, each with its own user profile as LibreOffice locks a profile
+    per process.
+    """
+
+    def __init__(self, size: int, profile_root: str, soffice_path: str = 'soffice',
+                 timeout: int = 120):
+        self.soffice_path = soffice_path
+        self.timeout = timeout
+        self._profiles: 'queue.Queue[str]' = queue.Queue()
+        for i in range(size):
+            profile_dir = os.path.join(profile_root, f'worker-{i}')
+            os.makedirs(profile_dir, exist_ok=True)
+            self._profiles.put(profile_dir)
+
+    def convert(self, src_path: str, target_ext: str, out_dir: str) -> str:
+        """Convert a file and return the output path (see OfficeWorker.convert)."""
+        try:
+            profile_dir = self._profiles.get(timeout=self.timeout)
+        except queue.Empty:
+            raise OfficeConversionError('No LibreOffice worker available')
+
+        try:
+            subprocess.run([
+                self.soffice_path,
+                '--headless',
+                '--norestore',
+                f'-env:UserInstallation={Path(profile_dir).absolute().as_uri()}',
+                '--convert-to', target_ext,
+                '--outdir', out_dir,
+                src_path
+            ], check=True, timeout=self.timeout,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except (OSError, subprocess.SubprocessError) as e:
+            raise OfficeConversionError(str(e)) from e
+        finally:
+            self._profiles.put(profile_dir)
+
+        base_name = os.path.splitext(os.path.basename(src_path))[0]
+        out_path = os.path.join(out_dir, f'{base_name}.{target_ext}')
+        if not os.path.exists(out_path):
+            raise OfficeConversionError(f'{target_ext} conversion produced no output')
+        return out_path
+
+    def shutdown(self):
+        """Nothing runs between jobs."""
+
+
+OfficeConverter = Union[OfficeWorkerPool, OneShotOfficeConverter]
+
+
+def create_office_pool(size: int, profile_root: str, port_lock_dir: str,
+                       base_port: int = 2002, max_jobs_per_worker: int = 50,
+                       soffice_path: str = 'soffice', timeout: int = 120) -> OfficeConverter:
+    """
+    Create a warm worker pool, or the one-shot fallback without ``uno``.
+
+    Arguments are those of OfficeWorkerPool; the fallback only uses size,
+    profile_root, soffice_path and timeout.
+    """
+    if uno is None:
+        logger.warning(
+            'LibreOffice Python bindings (uno) not installed; '
+            'starting a new soffice process for every conversion'
+        )
+        return OneShotOfficeConverter(
+            size=size, profile_root=profile_root,
+            soffice_path=soffice_path, timeout=timeout,
+        )
+    return OfficeWorkerPool(
+        size=size, profile_root=profile_root, port_lock_dir=port_lock_dir,
+        base_port=base_port, max_jobs_per_worker=max_jobs_per_worker,
+        soffice_path=soffice_path, timeout=timeout,
+    )
+
+
+def convert_legacy_format(pool: OfficeConverter, file_path: str) -> str:
+    """
+    Convert a legacy .doc/.ppt file to .docx/.pptx, replacing the original.
+
+    The converted file is written next to the original, which is deleted
+    once the conversion succeeded. On failure the original is left as is.
+
+    Returns:
+        Path to the converted file, or the original path if it is not legacy
+    """
+    targets = {'.doc': 'docx', '.ppt': 'pptx'}
+    target_ext = targets.get(os.path.splitext(file_path)[1].lower())
+    if target_ext is None:
+        return file_path
+
+    out_dir = os.path.dirname(file_path)
+    final_path = f'{os.path.splitext(file_path)[0]}.{target_ext}'
+    if not os.path.exists(file_path) and os.path.exists(final_path):
+        # Converted by an earlier attempt (e.g. a retried import job)
+        return final_path
+
+    temp_dir = os.path.join(out_dir, f'.convert-{os.getpid()}-{threading.get_ident()}')
+    os.makedirs(temp_dir, exist_ok=True)
+    try:
+        converted = pool.convert(file_path, target_ext, temp_dir)
+        final_path = os.path.join(out_dir, os.path.basename(converted))
+        os.replace(converted, final_path)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    if final_path != file_path:
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+    return final_path
@@ -0,0 +1,219 @@
+"""
+Shrink generated docx bodies before saving.
+
+The converters write one ``w:r`` per text node and formatting tag, each
+with its own copy of the run properties. ``compact_document`` merges
+adjacent runs with identical formatting, then moves property combinations
+that repeat across the document into named character and paragraph styles
+in styles.xml, so each run or paragraph only references the style. ``compact_blocks``
+does the same for blocks spliced into an already compacted body. Merging
+runs only depends on the paragraph itself, so ``coalesce_blocks`` can be run
+ahead, e.g. on blocks that are cached for reuse.
+
+Properties that mammoth turns into HTML on import (bold, italic, underline,
+strike, ...) always stay on the run, so exported files import back the same.
+"""
+import copy
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+
+from .template_cache import own_styles_part
+
+# Repeated combinations used at least this often become named styles
+MIN_STYLE_USES = 3
+
+CHARACTER_STYLE_PREFIX = 'Inline Char'
+PARAGRAPH_STYLE_PREFIX = 'Inline Para'
+
+_P = qn('w:p')
+_R = qn('w:r')
+_T = qn('w:t')
+_RPR = qn('w:rPr')
+_PPR = qn('w:pPr')
+_RSTYLE = qn('w:rStyle')
+_PSTYLE = qn('w:pStyle')
+_VAL = qn('w:val')
+_XML_SPACE = qn('xml:space')
+
+# Run content that can be concatenated into one run
+_TEXT_CONTENT = {_T, qn('w:tab'), qn('w:br')}
+
+# Run properties kept direct because the HTML import reads them
+_DIRECT_RUN_PROPERTIES = {
+    qn(tag) for tag in (
+        'w:rStyle', 'w:b', 'w:bCs', 'w:i', 'w:iCs', 'w:u', 'w:strike', 'w:dstrike',
+        'w:caps', 'w:smallCaps', 'w:vertAlign', 'w:highlight',
+    )
+}
+
+# Paragraph properties the converters set directly
+_STYLE_PARAGRAPH_PROPERTIES = {qn('w:spacing'), qn('w:ind'), qn('w:jc')}
+
+
+def compact_document(document, min_uses: int = MIN_STYLE_USES, coalesce: bool = True):
+    """
+    Merge adjacent runs and promote repeated formatting to named styles.
+
+    Args:
+        document: python-docx Document (or OoxmlDocument)
+        min_uses: Uses of one combination needed to make it a style
+        coalesce: False if the runs of every block are already merged
+    """
+    compact_blocks(document, [document.element.body], min_uses, coalesce)
+
+
+def compact_blocks(document, blocks, min_uses: int = MIN_STYLE_USES, coalesce: bool = True):
+    """
+    Compact only the given elements of the body and their descendants.
+
+    Combinations are counted within these elements; existing inline
+    styles with the same properties are reused.
+
+    Args:
+        document: python-docx Document (or OoxmlDocument)
+        blocks: w:p/w:tbl elements (or the body itself)
+        min_uses: Uses of one combination needed to make it a style
+        coalesce: False if their runs are already merged
+    """
+    if coalesce:
+        coalesce_blocks(blocks)
+    _promote_styles(document, blocks, min_uses)
+
+
+def coalesce_blocks(blocks):
+    """Merge adjacent runs in every paragraph of the given elements."""
+    for block in blocks:
+        for p in block.iter(_P):
+            coalesce_runs(p)
+
+
+def coalesce_runs(p):
+    """Merge adjacent text-only runs of a w:p that have identical w:rPr."""
+    previous = None
+    previous_key = None
+    for child in list(p):
+        if child.tag != _R or not _is_text_run(child):
+            previous = None
+            continue
+        rPr = child.find(_RPR)
+        key = _key(rPr) if rPr is not None else ()
+        if previous is not None and key == previous_key:
+            for content in list(child):
+                if content.tag != _RPR:
+                    previous.append(content)
+            p.remove(child)
+        else:
+            if previous is not None:
+                _join_text(previous)
+            previous, previous_key = child, key
+    if previous is not None:
+        _join_text(previous)
+
+
+def _is_text_run(r) -> bool:
+    return all(child.tag == _RPR or child.tag in _TEXT_CONTENT for child in r)
+
+
+def _join_text(r):
+    """Join consecutive w:t children of a run into one."""
+    current = None
+    for child in list(r):
+        if child.tag != _T:
+            current = None
+        elif current is None:
+            current = child
+        else:
+            current.text = (current.text or '') + (child.text or '')
+            r.remove(child)
+            _set_space(current)
+
+
+def _set_space(t):
+    text = t.text or ''
+    if len(text.strip()) < len(text):
+        t.set(_XML_SPACE, 'preserve')
+    elif _XML_SPACE in t.attrib:
+        del t.attrib[_XML_SPACE]
+
+
+def _promote_styles(document, roots, min_uses: int):
+    runs: Dict[Tuple, List[Tuple]] = defaultdict(list)
+    paragraphs: Dict[Tuple, List[Tuple]] = defaultdict(list)
+    for root in roots:
+        for rPr in root.iter(_RPR):
+            if rPr.getparent().tag != _R or rPr.find(_RSTYLE) is not None:
+                continue
+            promoted = [child for child in rPr if child.tag not in _DIRECT_RUN_PROPERTIES]
+            if promoted:
+                runs[_key(promoted)].append((rPr, promoted))
+
+        for pPr in root.iter(_PPR):
+            children = list(pPr)
+            if children and all(child.tag in _STYLE_PARAGRAPH_PROPERTIES for child in children):
+                paragraphs[_key(children)].append((pPr, children))
+
+    runs = {key: uses for key, uses in runs.items() if len(uses) >= min_uses}
+    paragraphs = {key: uses for key, uses in paragraphs.items() if len(uses) >= min_uses}
+    if not runs and not paragraphs:
+        return
+
+    styles = _InlineStyles(own_styles_part(document).styles)
+    for key, uses in runs.items():
+        style_id = styles.get(key, WD_STYLE_TYPE.CHARACTER, uses[0][1])
+        for rPr, promoted in uses:
+            for child in promoted:
+                rPr.remove(child)
+            rPr.insert(0, OxmlElement('w:rStyle', {_VAL: style_id}))
+    for key, uses in paragraphs.items():
+        style_id = styles.get(key, WD_STYLE_TYPE.PARAGRAPH, uses[0][1])
+        for pPr, children in uses:
+            for child in children:
+                pPr.remove(child)
+            pPr.insert(0, OxmlElement('w:pStyle', {_VAL: style_id}))
+
+
+def _key(properties) -> Tuple:
+    """Compare properties by content, not by the namespaces declared on them."""
+    return tuple((child.tag, tuple(sorted(child.attrib.items())), _key(child)) for child in properties)
+
+
+class _InlineStyles:
+    """Named styles made from inline formatting, reused across saves."""
+
+    def __init__(self, styles):
+        self._styles = styles
+        self._ids: Dict[Tuple[Tuple, WD_STYLE_TYPE], str] = {}
+        self._names = set()
+        for style in styles:
+            self._names.add(style.name)
+            if style.type == WD_STYLE_TYPE.CHARACTER and style.name.startswith(CHARACTER_STYLE_PREFIX):
+                properties = style.element.rPr
+            elif style.type == WD_STYLE_TYPE.PARAGRAPH and style.name.startswith(PARAGRAPH_STYLE_PREFIX):
+                properties = style.element.pPr
+            else:
+                continue
+            if properties is not None:
+                self._ids[(_key(properties), style.type)] = style.style_id
+
+    def get(self, key: Tuple, style_type: WD_STYLE_TYPE, properties) -> str:
+        """Get the id of the style holding these properties, adding it if needed."""
+        if (key, style_type) not in self._ids:
+            prefix = (CHARACTER_STYLE_PREFIX if style_type == WD_STYLE_TYPE.CHARACTER
+                      else PARAGRAPH_STYLE_PREFIX)
+            number = 1
+            while f'{prefix} {number}' in self._names:
+                number += 1
+            name = f'{prefix} {number}'
+            style = self._styles.add_style(name, style_type)
+            if style_type == WD_STYLE_TYPE.CHARACTER:
+                style.element.get_or_add_rPr().extend(copy.deepcopy(p) for p in properties)
+            else:
+                style.base_style = self._styles.default(WD_STYLE_TYPE.PARAGRAPH)
+                style.element.get_or_add_pPr().extend(copy.deepcopy(p) for p in properties)
+            self._names.add(name)
+            self._ids[(key, style_type)] = style.style_id
+        return self._ids[(key, style_type)]
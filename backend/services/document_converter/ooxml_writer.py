@@ -0,0 +1,249 @@
+"""
+Direct OOXML writer engine for building docx files.
+
+python-docx's document API is convenient but slow for large documents:
+every ``add_paragraph`` scans the whole body to insert before ``w:sectPr``,
+every style assignment resolves the style name against styles.xml, and
+setting run text first clears the run with an XPath query. OoxmlDocument
+exposes the subset of the ``docx.Document`` API the converters use, but
+builds ``w:p``/``w:tbl`` elements detached from the tree and inserts them
+into ``word/document.xml`` in one step on save. The stock package parts
+(styles, numbering, settings, headers) are still written by python-docx,
+and the generated XML is identical to what the python-docx API produces.
+"""
+import re
+from typing import IO, Dict, List, Optional, Tuple, Union
+
+from lxml.etree import SubElement
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.oxml.shape import CT_Inline
+from docx.oxml.table import CT_Tbl
+from docx.shape import InlineShape
+from docx.table import Table, _Cell
+from docx.text.paragraph import Paragraph
+from docx.text.run import Run
+
+from .template_cache import get_template
+
+ENGINES = ('python-docx', 'ooxml')
+
+_R = qn('w:r')
+_T = qn('w:t')
+_TAB = qn('w:tab')
+_BR = qn('w:br')
+_XML_SPACE = qn('xml:space')
+_SPECIAL_CHARS = re.compile(r'([\t\r\n])')
+
+
+def _append_text(r, text: str):
+    """Append w:t/w:tab/w:br children for text, as python-docx's run.text does."""
+    for piece in _SPECIAL_CHARS.split(text):
+        if piece == '\t':
+            SubElement(r, _TAB)
+        elif piece in ('\r', '\n'):
+            SubElement(r, _BR)
+        elif piece:
+            t = SubElement(r, _T)
+            t.text = piece
+            if len(piece.strip()) < len(piece):
+                t.set(_XML_SPACE, 'preserve')
+
+
+def open_document(path: Optional[Union[str, IO[bytes]]] = None, engine: str = 'python-docx',
+                  template: Optional[str] = None):
+    """
+    Open a docx, or start a new one from a cached template, for writing.
+
+    Args:
+        path: Existing docx (path or stream) to modify, or None for a new document
+        engine: 'python-docx' for the plain python-docx API, 'ooxml' for
+            the direct writer
+        template: Template .docx for new documents; None for the default
+
+    Returns:
+        A ``docx.Document`` or an OoxmlDocument with the same API subset
+    """
+    if engine not in ENGINES:
+        raise ValueError(f'Unknown docx engine: {engine}')
+    document = Document(path) if path else get_template(template).new_document()
+    return OoxmlDocument(document) if engine == 'ooxml' else document
+
+
+def add_blocks(doc, blocks: List):
+    """
+    Append prebuilt body blocks (w:p, w:tbl) to a document, in order.
+
+    Args:
+        doc: python-docx Document or OoxmlDocument
+        blocks: Detached block elements
+    """
+    if isinstance(doc, OoxmlDocument):
+        doc.add_blocks(blocks)
+        return
+    body = doc.element.body
+    last = next(body.iterchildren(reversed=True), None)
+    sect_pr = last if last is not None and last.tag == qn('w:sectPr') else None
+    for block in blocks:
+        if sect_pr is not None:
+            sect_pr.addprevious(block)
+        else:
+            body.append(block)
+
+
+class OoxmlRun(Run):
+    """Run that numbers pictures from the writer instead of rescanning the document."""
+
+    def __init__(self, r, parent, writer: 'OoxmlDocument'):
+        super().__init__(r, parent)
+        self._writer = writer
+
+    def add_picture(self, image_path_or_stream, width=None, height=None) -> InlineShape:
+        part = self._writer.part
+        rId, image = part.get_or_add_image(image_path_or_stream)
+        cx, cy = image.scaled_dimensions(width, height)
+        inline = CT_Inline.new_pic_inline(
+            self._writer.next_shape_id(), rId, image.filename, cx, cy
+        )
+        self._r.add_drawing(inline)
+        return InlineShape(inline)
+
+
+class OoxmlParagraph(Paragraph):
+    """Paragraph built on a detached ``w:p`` element."""
+
+    def __init__(self, p, parent, writer: 'OoxmlDocument'):
+        super().__init__(p, parent)
+        self._writer = writer
+
+    def add_run(self, text: Optional[str] = None, style=None) -> Run:
+        r = SubElement(self._p, _R)
+        if text:
+            # A new run has no content to clear first
+            _append_text(r, text)
+        run = OoxmlRun(r, self, self._writer)
+        if style:
+            run.style = style
+        return run
+
+    @property
+    def style(self):
+        return Paragraph.style.fget(self)
+
+    @style.setter
+    def style(self, style_or_name):
+        self._p.style = self._writer.style_id(style_or_name, WD_STYLE_TYPE.PARAGRAPH)
+
+
+class _OoxmlRow:
+    def __init__(self, tr, table):
+        self.cells = [_Cell(tc, table) for tc in tr.tc_lst]
+
+
+class OoxmlTable(Table):
+    """Table built on a detached ``w:tbl`` element with no merged cells."""
+
+    def __init__(self, tbl, parent, writer: 'OoxmlDocument'):
+        super().__init__(tbl, parent)
+        self._writer = writer
+        self._rows = None
+
+    @property
+    def rows(self) -> List[_OoxmlRow]:
+        if self._rows is None:
+            self._rows = [_OoxmlRow(tr, self) for tr in self._tbl.tr_lst]
+        return self._rows
+
+    @property
+    def style(self):
+        return Table.style.fget(self)
+
+    @style.setter
+    def style(self, style_or_name):
+        self._tbl.tblStyle_val = self._writer.style_id(style_or_name, WD_STYLE_TYPE.TABLE)
+
+
+class OoxmlDocument:
+    """Write body content of a python-docx Document directly as OOXML elements.
+
+    New blocks are kept out of the document tree until ``save`` (or any
+    other access to the wrapped document), then inserted before the final
+    ``w:sectPr`` together.
+    """
+
+    def __init__(self, document):
+        self._document = document
+        self._pending: List = []
+        self._style_ids: Dict[Tuple[str, int], Optional[str]] = {}
+        self._next_shape_id: Optional[int] = None
+
+    def __getattr__(self, name):
+        # Anything not implemented here goes to the wrapped Document on the full tree
+        self._flush()
+        return getattr(self._document, name)
+
+    @property
+    def part(self):
+        return self._document.part
+
+    def add_paragraph(self, text: str = '', style=None) -> OoxmlParagraph:
+        p = OxmlElement('w:p')
+        self._pending.append(p)
+        paragraph = OoxmlParagraph(p, self._document._body, self)
+        if text:
+            paragraph.add_run(text)
+        if style is not None:
+            paragraph.style = style
+        return paragraph
+
+    def add_heading(self, text: str = '', level: int = 1) -> OoxmlParagraph:
+        if not 0 <= level <= 9:
+            raise ValueError('level must be in range 0-9, got %d' % level)
+        style = 'Title' if level == 0 else 'Heading %d' % level
+        return self.add_paragraph(text, style)
+
+    def add_table(self, rows: int, cols: int, style=None) -> OoxmlTable:
+        # Pending blocks are detached, so this only reads the small flushed tree
+        tbl = CT_Tbl.new_tbl(rows, cols, self._document._block_width)
+        self._pending.append(tbl)
+        table = OoxmlTable(tbl, self._document._body, self)
+        table.style = style
+        return table
+
+    def add_blocks(self, blocks: List):
+        """Append prebuilt block elements after the pending ones."""
+        self._pending.extend(blocks)
+
+    def style_id(self, style_or_name, style_type) -> Optional[str]:
+        """Resolve a style name to its id once per document."""
+        if not isinstance(style_or_name, str):
+            return self._document.part.get_style_id(style_or_name, style_type)
+        key = (style_or_name, style_type)
+        if key not in self._style_ids:
+            self._style_ids[key] = self._document.part.get_style_id(style_or_name, style_type)
+        return self._style_ids[key]
+
+    def next_shape_id(self) -> int:
+        """Next drawing id, counted locally after one scan of the document."""
+        if self._next_shape_id is None:
+            self._flush()
+            self._next_shape_id = self._document.part.next_id
+        shape_id = self._next_shape_id
+        self._next_shape_id += 1
+        return shape_id
+
+    def save(self, path_or_stream: IO):
+        self._flush()
+        self._document.save(path_or_stream)
+
+    def _flush(self):
+        """Insert pending blocks into the body, before its w:sectPr."""
+        if not self._pending:
+            return
+        body = self._document.element.body
+        sectPr = body.find(qn('w:sectPr'))
+        index = body.index(sectPr) if sectPr is not None else len(body)
+        body[index:index] = self._pending
+        self._pending = []
@@ -0,0 +1,355 @@
+"""
+Caches of the last preview package and parsed structure per document.
+
+IncrementalConverter diffs each preview against the cached entry. The
+memory backend is private to one process; the disk and Redis backends are
+shared by every worker (and node) that can reach them, so previews stay
+incremental whichever worker serves them, and deleting an entry removes
+it for all of them.
+"""
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .cache_stats import CacheStats
+from .disk_budget import DiskBudget, LOW_WATER
+
+# Bump when the entry format or DocumentStructure.to_dict changes
+VERSION = 'v2'
+
+
+class PreviewCache(ABC):
+    """Base class of preview cache backends.
+
+    Maps a document id to (docx bytes, DocumentStructure) of its last
+    preview. Entries unused for ``ttl`` seconds expire, and the least
+    recently used ones are evicted once the cache grows past ``max_bytes``.
+    """
+
+    name = 'preview cache'
+
+    def __init__(self, max_bytes: int, ttl: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._stats = CacheStats(self.name)
+
+    @abstractmethod
+    def get(self, doc_id: str) -> Optional[Tuple[bytes, Any]]:
+        """Return (docx, structure) for a document, or None on a miss."""
+
+    @abstractmethod
+    def put(self, doc_id: str, docx: bytes, structure):
+        """Store a document's latest preview and evict old entries if needed."""
+
+    @abstractmethod
+    def delete(self, doc_id: str):
+        """Remove a document's entry."""
+
+    @abstractmethod
+    def clear(self):
+        """Remove all entries."""
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for this process."""
+        return self._stats.as_dict()
+
+
+def _dumps(docx: bytes, structure) -> bytes:
+    # A line of JSON, then the package. Shared entries are never unpickled,
+    # so whoever can write to the cache cannot run code in the workers.
+    return json.dumps(structure.to_dict(), separators=(',', ':')).encode() + b'\n' + docx
+
+
+def _loads(data: bytes) -> Optional[Tuple[bytes, Any]]:
+    # Imported here, as incremental_converter imports this module
+    from .incremental_converter import DocumentStructure
+
+    header, _, docx = data.partition(b'\n')
+    try:
+        return docx, DocumentStructure.from_dict(json.loads(header))
+    except ValueError:
+        return None  # Not an entry of this version
+
+
+class MemoryPreviewCache(PreviewCache):
+    """Per-process LRU of preview entries."""
+
+    def __init__(self, max_bytes: int, ttl: Optional[int] = None):
+        super().__init__(max_bytes, ttl)
+        self._lock = threading.Lock()
+        # doc_id -> (docx, structure, size, last use)
+        self._entries: OrderedDict = OrderedDict()
+        self._size = 0
+
+    @staticmethod
+    def _entry_size(docx: bytes, structure) -> int:
+        # The structure keeps the HTML and each element's HTML, about twice its length
+        return len(docx) + 2 * len(structure.html)
+
+    def get(self, doc_id: str) -> Optional[Tuple[bytes, Any]]:
+        with self._lock:
+            entry = self._entries.get(doc_id)
+            if entry is not None and self.ttl and time.time() - entry[3] > self.ttl:
+                self._remove(doc_id)
+                entry = None
+            if entry is None:
+                self._stats.miss()
+                return None
+            self._stats.hit()
+            self._entries[doc_id] = entry[:3] + (time.time(),)
+            self._entries.move_to_end(doc_id)
+            return entry[0], entry[1]
+
+    def put(self, doc_id: str, docx: bytes, structure):
+        size = self._entry_size(docx, structure)
+        with self._lock:
+            self._remove(doc_id)
+            if size > self.max_bytes:
+                return
+            self._entries[doc_id] = (docx, structure, size, time.time())
+            self._size += size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats.evicted()
+
+    def delete(self, doc_id: str):
+        with self._lock:
+            self._remove(doc_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, doc_id: str):
+        entry = self._entries.pop(doc_id, None)
+        if entry is not None:
+            self._size -= entry[2]
+
+
+class DiskPreviewCache(PreviewCache):
+    """Preview entries as files in a directory shared by all workers.
+
+    Recency is tracked through file mtimes and the size through a
+    DiskBudget, as in ConversionCache.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, ttl: Optional[int] = None):
+        super().__init__(max_bytes, ttl)
+        self.cache_dir = str(cache_dir)
+        self._budget = DiskBudget(
+            self.cache_dir, max_bytes, '.preview', ttl=ttl, on_evict=self._stats.evicted
+        )
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_path(self, doc_id: str) -> str:
+        key = hashlib.sha256(doc_id.encode()).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f'{key}.{VERSION}.preview')
+
+    def get(self, doc_id: str) -> Optional[Tuple[bytes, Any]]:
+        path = self._entry_path(doc_id)
+        entry = None
+        try:
+            if self.ttl and time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+            else:
+                with open(path, 'rb') as f:
+                    entry = _loads(f.read())
+                os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+
+        if entry is None:
+            self._stats.miss()
+        else:
+            self._stats.hit()
+        return entry
+
+    def put(self, doc_id: str, docx: bytes, structure):
+        data = _dumps(docx, structure)
+        path = self._entry_path(doc_id)
+        if len(data) > self.max_bytes:
+            self.delete(doc_id)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temp file first so readers never see a partial entry
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        self._budget.added(len(data))
+
+    def delete(self, doc_id: str):
+        try:
+            os.remove(self._entry_path(doc_id))
+        except OSError:
+            pass
+
+    def clear(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.preview'):
+                    try:
+                        os.remove(os.path.join(root, name))
+                    except OSError:
+                        pass
+        self._budget.reset()
+
+
+# Stores an entry and returns the new total size.
+# KEYS: entry, lru, sizes, total; ARGV: doc id, data, now, ttl (0: none)
+_PUT_SCRIPT = """
+if redis.call('EXISTS', KEYS[4]) == 0 then
+    local total = 0
+    for _, size in ipairs(redis.call('HVALS', KEYS[3])) do
+        total = total + tonumber(size)
+    end
+    redis.call('SET', KEYS[4], total)
+end
+local old = redis.call('HGET', KEYS[3], ARGV[1])
+if old then
+    redis.call('DECRBY', KEYS[4], old)
+end
+if tonumber(ARGV[4]) > 0 then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[4])
+else
+    redis.call('SET', KEYS[1], ARGV[2])
+end
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+redis.call('HSET', KEYS[3], ARGV[1], string.len(ARGV[2]))
+return redis.call('INCRBY', KEYS[4], string.len(ARGV[2]))
+"""
+
+# Forgets expired entries, then pops least recently used ones down to the
+# target size. Returns the number of evicted entries.
+# KEYS: lru, sizes, total; ARGV: entry key prefix, target, expiry cutoff (0: none)
+_EVICT_SCRIPT = """
+local function forget(doc_id)
+    local size = redis.call('HGET', KEYS[2], doc_id)
+    redis.call('DEL', ARGV[1] .. doc_id)
+    redis.call('HDEL', KEYS[2], doc_id)
+    if size then
+        redis.call('DECRBY', KEYS[3], size)
+    end
+end
+if tonumber(ARGV[3]) > 0 then
+    for _, doc_id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[1], 0, ARGV[3])) do
+        redis.call('ZREM', KEYS[1], doc_id)
+        forget(doc_id)
+    end
+end
+local evicted = 0
+while tonumber(redis.call('GET', KEYS[3]) or 0) > tonumber(ARGV[2]) do
+    local popped = redis.call('ZPOPMIN', KEYS[1])
+    if #popped == 0 then
+        break
+    end
+    forget(popped[1])
+    evicted = evicted + 1
+end
+return evicted
+"""
+
+# KEYS: entry, lru, sizes, total; ARGV: doc id
+_DELETE_SCRIPT = """
+local size = redis.call('HGET', KEYS[3], ARGV[1])
+redis.call('DEL', KEYS[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[3], ARGV[1])
+if size then
+    redis.call('DECRBY', KEYS[4], size)
+end
+"""
+
+
+class RedisPreviewCache(PreviewCache):
+    """Preview entries in Redis, shared by all workers and nodes.
+
+    Entries expire through Redis TTLs. Their sizes, last use and total size
+    are kept in a hash, a sorted set and a counter, updated by Lua scripts
+    so they stay consistent across clients. A put only compares the
+    counter with the budget; once it is exceeded, least recently used
+    entries are popped off the sorted set down to ``LOW_WATER`` of it.
+
+    The eviction script builds entry keys itself, so the keys of one cache
+    must live on a single Redis node.
+    """
+
+    def __init__(self, client, max_bytes: int, ttl: Optional[int] = None,
+                 prefix: str = 'doc-studio:preview'):
+        """
+        Args:
+            client: redis.Redis connection (bytes responses)
+            max_bytes: Total size of all entries
+            ttl: Seconds an unused entry is kept
+            prefix: Namespace of the keys
+        """
+        super().__init__(max_bytes, ttl)
+        self.client = client
+        self.prefix = f'{prefix}:{VERSION}'
+        self._lru_key = f'{self.prefix}:lru'
+        self._sizes_key = f'{self.prefix}:sizes'
+        self._total_key = f'{self.prefix}:bytes'
+        self._put_script = client.register_script(_PUT_SCRIPT)
+        self._evict_script = client.register_script(_EVICT_SCRIPT)
+        self._delete_script = client.register_script(_DELETE_SCRIPT)
+
+    def _entry_key(self, doc_id: str) -> str:
+        return f'{self.prefix}:entry:{doc_id}'
+
+    def get(self, doc_id: str) -> Optional[Tuple[bytes, Any]]:
+        data = self.client.get(self._entry_key(doc_id))
+        entry = _loads(data) if data is not None else None
+        if entry is None:
+            self._stats.miss()
+            return None
+
+        pipe = self.client.pipeline()
+        # xx: never bring back an entry evicted since it was read
+        pipe.zadd(self._lru_key, {doc_id: time.time()}, xx=True)
+        if self.ttl:
+            pipe.expire(self._entry_key(doc_id), self.ttl)
+        pipe.execute()
+        self._stats.hit()
+        return entry
+
+    def put(self, doc_id: str, docx: bytes, structure):
+        data = _dumps(docx, structure)
+        if len(data) > self.max_bytes:
+            self.delete(doc_id)
+            return
+        total = self._put_script(
+            keys=[self._entry_key(doc_id), self._lru_key, self._sizes_key, self._total_key],
+            args=[doc_id, data, time.time(), self.ttl or 0],
+        )
+        if int(total) > self.max_bytes:
+            self._evict()
+
+    def delete(self, doc_id: str):
+        self._delete_script(
+            keys=[self._entry_key(doc_id), self._lru_key, self._sizes_key, self._total_key],
+            args=[doc_id],
+        )
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=f'{self.prefix}:*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def _evict(self):
+        """Forget expired entries, then remove least recently used ones down to the low-water mark."""
+        cutoff = time.time() - self.ttl if self.ttl else 0
+        evicted = self._evict_script(
+            keys=[self._lru_key, self._sizes_key, self._total_key],
+            args=[self._entry_key(''), int(self.max_bytes * LOW_WATER), cutoff],
+        )
+        if evicted:
+            self._stats.evicted(int(evicted))
@@ -0,0 +1,195 @@
+"""
+Sandboxed process pool for running document conversions.
+
+A malformed or adversarial file can make mammoth, BeautifulSoup or
+python-docx spin or balloon memory. Running conversions in separate worker
+processes with a wall-clock timeout and a memory ceiling keeps one bad file
+from stalling the web process that asked for it.
+"""
+import queue
+import logging
+import multiprocessing
+from typing import Any, Callable, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+class ConversionError(Exception):
+    """A sandboxed conversion did not complete.
+
+    ``code`` is one of 'timeout', 'memory', 'crashed', 'failed' or 'busy'.
+    """
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+    def to_dict(self):
+        return {'error': self.message, 'code': self.code}
+
+
+def _max_rss_bytes() -> int:
+    # ru_maxrss is reported in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 if resource else 0
+
+
+def _worker_main(conn, max_memory_bytes: int):
+    """Worker process loop: run jobs received over the pipe until told to stop."""
+    if resource and max_memory_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory_bytes, max_memory_bytes))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+
+        fn, args, kwargs = message
+        try:
+            reply = ('ok', fn(*args, **kwargs))
+        except MemoryError:
+            reply = ('memory', 'Conversion exceeded the memory limit')
+        except Exception as e:
+            reply = ('failed', f'{type(e).__name__}: {e}')
+
+        try:
+            conn.send(reply + (_max_rss_bytes(),))
+        except MemoryError:
+            conn.send(('memory', 'Conversion exceeded the memory limit', _max_rss_bytes()))
+
+
+class _SandboxWorker:
+    """One worker process slot; the process is started lazily and replaced on failure."""
+
+    def __init__(self, context, max_memory_bytes: int):
+        self._context = context
+        self._max_memory_bytes = max_memory_bytes
+        self.process = None
+        self.conn = None
+        self.jobs_done = 0
+
+    def ensure_started(self):
+        if self.process is not None and self.process.is_alive():
+            return
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self._max_memory_bytes),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        self.process = process
+        self.conn = parent_conn
+        self.jobs_done = 0
+
+    def stop(self, kill: bool = False):
+        if self.process is None:
+            return
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                self.process.kill()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        self.process = None
+        self.conn = None
+
+
+class ConversionSandbox:
+    """Run callables in a fixed pool of recyclable worker processes.
+
+    Each call gets ``timeout`` seconds of wall-clock time and the worker's
+    address space is capped at ``max_memory_mb``. Workers are replaced after
+    ``max_jobs_per_worker`` jobs, when their peak RSS passes ``max_rss_mb``,
+    and after any timeout or crash. Callables and their arguments must be
+    picklable.
+    """
+
+    def __init__(self, workers: int = 2, timeout: int = 60,
+                 max_memory_mb: int = 1024, max_rss_mb: int = 512,
+                 max_jobs_per_worker: int = 100):
+        self.timeout = timeout
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024
+        self.max_jobs_per_worker = max_jobs_per_worker
+        context = multiprocessing.get_context('spawn')
+        self._idle: 'queue.Queue[_SandboxWorker]' = queue.Queue()
+        self._workers = [
+            _SandboxWorker(context, max_memory_mb * 1024 * 1024)
+            for _ in range(workers)
+        ]
+        for worker in self._workers:
+            self._idle.put(worker)
+
+    def call(self, fn: Callable, *args, timeout: Optional[int] = None, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) in a worker process.
+
+        ``timeout`` overrides the pool's wall-clock limit for this call; it
+        is not passed on to fn.
+
+        Raises:
+            ConversionError: On timeout, memory exhaustion, worker crash,
+                an exception raised by fn, or when no worker frees up in time
+        """
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise ConversionError('busy', 'All conversion workers are busy')
+
+        try:
+            worker.ensure_started()
+            try:
+                worker.conn.send((fn, args, kwargs))
+            except (OSError, EOFError):
+                worker.stop(kill=True)
+                raise ConversionError('crashed', 'Conversion worker is not responding')
+
+            timeout = timeout or self.timeout
+            if not worker.conn.poll(timeout):
+                logger.warning('Conversion timed out after %ss, killing worker', timeout)
+                worker.stop(kill=True)
+                raise ConversionError(
+                    'timeout', f'Conversion took longer than {timeout} seconds'
+                )
+
+            try:
+                status, payload, rss = worker.conn.recv()
+            except (OSError, EOFError):
+                process = worker.process
+                worker.stop(kill=True)
+                exit_code = process.exitcode
+                raise ConversionError(
+                    'crashed', f'Conversion worker exited unexpectedly (exit code {exit_code})'
+                )
+
+            worker.jobs_done += 1
+            if worker.jobs_done >= self.max_jobs_per_worker or rss > self.max_rss_bytes:
+                worker.stop()
+
+            if status != 'ok':
+                if status == 'memory':
+                    worker.stop(kill=True)
+                raise ConversionError(status, payload)
+            return payload
+        finally:
+            self._idle.put(worker)
+
+    def shutdown(self):
+        """Stop every worker process."""
+        for worker in self._workers:
+            worker.stop()
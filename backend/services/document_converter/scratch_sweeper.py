@@ -0,0 +1,147 @@
+"""
+Garbage collection of files conversions leave behind.
+
+A package spilled to the scratch directory is unlinked as soon as its
+reader opens it, so files only stay behind when a process dies or a
+request is abandoned between the save and the open. Disk caches leave
+``.tmp`` files the same way when a write is interrupted. ``ScratchSweeper``
+removes both, periodically on a background thread or on demand.
+"""
+import os
+import time
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .docx_output import SCRATCH_PREFIX, SCRATCH_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+
+class ScratchSweeper:
+    """Delete expired scratch packages and abandoned cache temp files.
+
+    Scratch packages older than ``max_age`` seconds are removed; if the
+    rest still exceed ``max_bytes``, the oldest go first. Packages younger
+    than ``MIN_AGE`` are never touched, as a reader may be about to open
+    them.
+    """
+
+    MIN_AGE = 60
+
+    def __init__(self, scratch_dir: str, max_age: int, max_bytes: int,
+                 cache_dirs: Iterable[str] = (), interval: int = 300):
+        """
+        Args:
+            scratch_dir: Directory converters spill large packages to
+            max_age: Seconds after which scratch and temp files are abandoned
+            max_bytes: Quota for all scratch packages
+            cache_dirs: Disk cache roots to clear of abandoned .tmp files
+            interval: Seconds between background sweeps
+        """
+        self.scratch_dir = str(scratch_dir)
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.cache_dirs = [str(path) for path in cache_dirs]
+        self.interval = interval
+        self.reclaimed_files = 0
+        self.reclaimed_bytes = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Sweep every ``interval`` seconds on a daemon thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='scratch-sweeper', daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception('Scratch sweep failed')
+
+    def sweep(self) -> Dict[str, int]:
+        """
+        Delete abandoned files once.
+
+        Returns:
+            Files and bytes reclaimed by this sweep
+        """
+        now = time.time()
+        removed: List[Tuple[str, int]] = []
+
+        packages = []
+        total = 0
+        for mtime, size, path in self._scratch_packages():
+            if now - mtime > self.max_age:
+                removed.append((path, size))
+            else:
+                packages.append((mtime, size, path))
+                total += size
+        packages.sort()
+        for mtime, size, path in packages:
+            if total <= self.max_bytes or now - mtime < self.MIN_AGE:
+                break
+            removed.append((path, size))
+            total -= size
+
+        for root_dir in self.cache_dirs:
+            for root, _, files in os.walk(root_dir):
+                for name in files:
+                    if name.endswith('.tmp'):
+                        path = os.path.join(root, name)
+                        stat = _stat(path)
+                        if stat is not None and now - stat.st_mtime > self.max_age:
+                            removed.append((path, stat.st_size))
+
+        files = reclaimed = 0
+        for path, size in removed:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            files += 1
+            reclaimed += size
+
+        with self._lock:
+            self.reclaimed_files += files
+            self.reclaimed_bytes += reclaimed
+        if files:
+            logger.info('Scratch sweep removed %d files (%d bytes)', files, reclaimed)
+        return {'files': files, 'bytes': reclaimed}
+
+    def _scratch_packages(self):
+        try:
+            names = os.listdir(self.scratch_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith(SCRATCH_PREFIX) and name.endswith(SCRATCH_SUFFIX):
+                path = os.path.join(self.scratch_dir, name)
+                stat = _stat(path)
+                if stat is not None:
+                    yield stat.st_mtime, stat.st_size, path
+
+    def stats(self) -> Dict[str, int]:
+        """Get totals reclaimed by this process."""
+        with self._lock:
+            return {'files': self.reclaimed_files, 'bytes': self.reclaimed_bytes}
+
+
+def _stat(path: str) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
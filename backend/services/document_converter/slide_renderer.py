@@ -0,0 +1,159 @@
+"""
+Page-by-page PDF rasterization for slide previews.
+"""
+import os
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+SLIDE_RE = re.compile(r'^slide_(\d+)\.png$')
+
+
+def list_slides(slides_dir: str) -> List[Tuple[int, str]]:
+    """List rendered slides as (page, filename) in page order."""
+    if not os.path.isdir(slides_dir):
+        return []
+    pages = []
+    for name in os.listdir(slides_dir):
+        match = SLIDE_RE.match(name)
+        if match:
+            pages.append((int(match.group(1)), name))
+    return sorted(pages)
+
+
+class SlideRenderer:
+    """Rasterize a PDF one page at a time, straight to disk.
+
+    Each page is rendered by its own ``pdftoppm`` process via pdf2image, so
+    no page is ever held in memory as a PIL image and up to ``workers``
+    pages render in parallel. Pages appear in ``slides_dir`` as soon as they
+    are done.
+    """
+
+    def __init__(self, dpi: int = 150, workers: int = None):
+        self.dpi = dpi
+        self.workers = workers or os.cpu_count() or 1
+
+    def page_count(self, pdf_path: str) -> int:
+        from pdf2image import pdfinfo_from_path
+        return int(pdfinfo_from_path(pdf_path)['Pages'])
+
+    def render_page(self, pdf_path: str, page: int, slides_dir: str):
+        """Render one page to slide_{page}.png."""
+        from pdf2image import convert_from_path
+
+        # Render under a temp name so readers never see a partial PNG
+        temp_name = f'.tmp-{page}-{uuid.uuid4().hex}'
+        paths = convert_from_path(
+            pdf_path,
+            dpi=self.dpi,
+            first_page=page,
+            last_page=page,
+            fmt='png',
+            output_folder=slides_dir,
+            output_file=temp_name,
+            single_file=True,
+            paths_only=True,
+        )
+        os.replace(paths[0], os.path.join(slides_dir, f'slide_{page}.png'))
+
+    def render(self, pdf_path: str, slides_dir: str,
+               on_progress: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        Render every page of a PDF into slides_dir.
+
+        Args:
+            pdf_path: Source PDF
+            slides_dir: Output directory
+            on_progress: Called with (rendered, total) as pages complete
+
+        Returns:
+            Number of pages rendered
+        """
+        os.makedirs(slides_dir, exist_ok=True)
+        total = self.page_count(pdf_path)
+        if on_progress:
+            on_progress(0, total)
+
+        # Pages are submitted in order so early slides finish first
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [
+                pool.submit(self.render_page, pdf_path, page, slides_dir)
+                for page in range(1, total + 1)
+            ]
+            for rendered, future in enumerate(futures, start=1):
+                future.result()
+                if on_progress:
+                    on_progress(rendered, total)
+
+        return total
+
+
+class SlideDerivatives:
+    """Resized, re-encoded copies of rendered slides, generated on first use.
+
+    The full-resolution PNG written by SlideRenderer is the master and the
+    PNG fallback. Derivatives are stored next to it as
+    ``{size}/slide_{page}.{fmt}`` and never wider than the master.
+    """
+
+    # Target width in pixels per size name
+    SIZES = {
+        'thumb': 320,
+        'screen': 1280,
+        'hidpi': 2560,
+    }
+
+    # Availability of AVIF/WebP depends on the Pillow build
+    FORMATS = {
+        'webp': 'WEBP',
+        'avif': 'AVIF',
+        'png': 'PNG',
+    }
+
+    def __init__(self, quality: int = 80):
+        self.quality = quality
+
+    def supported_formats(self) -> List[str]:
+        from PIL import Image
+        Image.init()
+        return [fmt for fmt, name in self.FORMATS.items() if name in Image.SAVE]
+
+    def widths(self, slides_dir: str, page: int) -> Dict[str, int]:
+        """Pixel width of each size for a slide, for srcset descriptors."""
+        from PIL import Image
+
+        # Image.open only reads the header here
+        with Image.open(os.path.join(slides_dir, f'slide_{page}.png')) as image:
+            master_width = image.width
+        return {size: min(width, master_width) for size, width in self.SIZES.items()}
+
+    def get(self, slides_dir: str, page: int, size: str, fmt: str) -> Optional[str]:
+        """
+        Get the path of a derivative, generating it if needed.
+
+        Returns:
+            Path to the derivative, or None if the master slide does not exist
+        """
+        master = os.path.join(slides_dir, f'slide_{page}.png')
+        if not os.path.exists(master):
+            return None
+
+        path = os.path.join(slides_dir, size, f'slide_{page}.{fmt}')
+        if os.path.exists(path):
+            return path
+
+        from PIL import Image
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with Image.open(master) as image:
+            width = self.SIZES[size]
+            if image.width > width:
+                height = round(image.height * width / image.width)
+                image = image.resize((width, height), Image.LANCZOS)
+            options = {} if fmt == 'png' else {'quality': self.quality}
+            image.save(temp_path, self.FORMATS[fmt], **options)
+        os.replace(temp_path, path)
+        return path
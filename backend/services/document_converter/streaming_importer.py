@@ -0,0 +1,187 @@
+"""
+Streaming docx to HTML import for very large documents.
+
+mammoth parses ``word/document.xml`` into a DOM, builds a document model for
+the whole file and renders one HTML string at the end. This importer reads
+the body with an incremental XML parser instead and converts one top-level
+block (paragraph, table, ...) at a time, writing finished HTML to an output
+stream as it goes.
+
+Each block is still read and rendered by mammoth's own body reader and HTML
+converter, so the output matches ``mammoth.convert_to_html``. Those are
+internal mammoth APIs, which is why requirements.txt pins mammoth's minor
+version range.
+"""
+import io
+from typing import Callable, Optional, TextIO
+from xml.etree import ElementTree
+
+import mammoth
+from mammoth import documents, html, options, writers
+from mammoth.conversion import _DocumentConverter, _ConversionContext
+from mammoth.docx import (
+    _find_part_paths,
+    _find_relationships_path_for,
+    _read_comments,
+    _read_notes,
+    _read_relationships,
+    _part_with_body_reader,
+    _try_read_entry_or_default,
+    body_xml,
+    office_xml,
+)
+from mammoth.docx.content_types_xml import empty_content_types, read_content_types_xml_element
+from mammoth.docx.files import Files
+from mammoth.docx.numbering_xml import Numbering, read_numbering_xml_element
+from mammoth.docx.styles_xml import Styles, read_styles_xml_element
+from mammoth.docx.style_map import read_style_map
+from mammoth.docx.xmlparser import XmlElement, XmlText
+from mammoth.zips import open_zip
+
+# Clark-notation namespace URI -> mammoth prefix ('w', 'r', 'a', ...)
+_PREFIXES = {uri: prefix for prefix, uri in office_xml._namespaces}
+
+
+def _convert_name(name: str) -> str:
+    if name.startswith('{'):
+        uri, local = name[1:].split('}', 1)
+        prefix = _PREFIXES.get(uri)
+        return f'{prefix}:{local}' if prefix else name
+    return name
+
+
+def _to_xml_element(element) -> XmlElement:
+    """Convert an ElementTree element into mammoth's XML node type."""
+    children = []
+    if element.text:
+        children.append(XmlText(element.text))
+    for child in element:
+        children.append(_to_xml_element(child))
+        if child.tail:
+            children.append(XmlText(child.tail))
+    attributes = {_convert_name(k): v for k, v in element.attrib.items()}
+    return XmlElement(_convert_name(element.tag), attributes, children)
+
+
+class StreamingDocxImporter:
+    """Convert a docx to HTML block by block with bounded memory.
+
+    Only the block being converted and the last emitted top-level HTML
+    element are held in memory. The last element is kept back because
+    mammoth merges adjacent elements such as consecutive list items into
+    one ``<ul>``.
+    """
+
+    def __init__(self, convert_image: Optional[Callable] = None):
+        """
+        Args:
+            convert_image: mammoth image handler, e.g. built with
+                ``mammoth.images.img_element``; defaults to data URIs
+        """
+        self.convert_image = convert_image
+
+    def convert(self, file_path: str, out: TextIO):
+        """
+        Convert a docx file, writing HTML to a text stream in chunks.
+
+        Args:
+            file_path: Path to the docx file
+            out: Writable text stream
+        """
+        with open(file_path, 'rb') as docx_file:
+            style_map_options = {'embedded_style_map': read_style_map(docx_file)}
+            if self.convert_image:
+                style_map_options['convert_image'] = self.convert_image
+            convert_options = options.read_options(style_map_options).value
+
+            with open_zip(docx_file, 'r') as zip_file:
+                part_paths = _find_part_paths(zip_file)
+                read_part_with_body = _part_with_body_reader(
+                    file_path, zip_file, part_paths=part_paths, external_file_access=False
+                )
+                # Notes and comments are small parts, read up front like mammoth does
+                notes = _read_notes(read_part_with_body, part_paths).value
+                comments = _read_comments(read_part_with_body, part_paths).value
+
+                converter = _DocumentConverter(
+                    messages=[],
+                    style_map=convert_options['style_map'],
+                    convert_image=convert_options.get('convert_image', mammoth.images.data_uri),
+                    id_prefix='',
+                    ignore_empty_paragraphs=convert_options['ignore_empty_paragraphs'],
+                    note_references=[],
+                    comments={comment.comment_id: comment for comment in comments},
+                )
+                context = _ConversionContext(is_table_header=False)
+                body_reader = self._body_reader(file_path, zip_file, part_paths)
+
+                pending = []
+                for block in self._iter_body(zip_file, part_paths.main_document):
+                    for element in body_reader.read_all([block]).value:
+                        self._emit(out, pending, converter.visit(element, context))
+
+                # Footnotes, endnotes and comments referenced from the body
+                tail = documents.document([], notes=documents.notes(notes), comments=comments)
+                self._emit(out, pending, converter.visit(tail, context))
+                self._write(out, pending)
+
+    def convert_to_string(self, file_path: str) -> str:
+        """Convert a docx file and return the HTML."""
+        out = io.StringIO()
+        self.convert(file_path, out)
+        return out.getvalue()
+
+    def _body_reader(self, file_path, zip_file, part_paths):
+        """Build mammoth's body reader for the main document part."""
+        styles = _try_read_entry_or_default(
+            zip_file, part_paths.styles, read_styles_xml_element, Styles.EMPTY
+        )
+        return body_xml.reader(
+            numbering=_try_read_entry_or_default(
+                zip_file,
+                part_paths.numbering,
+                lambda element: read_numbering_xml_element(element, styles=styles),
+                default=Numbering.EMPTY,
+            ),
+            content_types=_try_read_entry_or_default(
+                zip_file, '[Content_Types].xml', read_content_types_xml_element, empty_content_types
+            ),
+            relationships=_read_relationships(
+                zip_file, _find_relationships_path_for(part_paths.main_document)
+            ),
+            styles=styles,
+            docx_file=zip_file,
+            files=Files(None, external_file_access=False),
+        )
+
+    def _iter_body(self, zip_file, document_path):
+        """Yield the children of w:body one at a time as mammoth XML nodes."""
+        with zip_file.open(document_path) as xml_file:
+            depth = 0
+            body = None
+            for event, element in ElementTree.iterparse(xml_file, events=('start', 'end')):
+                if event == 'start':
+                    depth += 1
+                    if depth == 2:
+                        body = element
+                    continue
+
+                depth -= 1
+                if depth == 2 and body is not None:
+                    # mc:AlternateContent collapses to its fallback, possibly several nodes
+                    yield from office_xml._collapse_alternate_content(_to_xml_element(element))
+                    body.remove(element)
+
+    def _emit(self, out: TextIO, pending: list, nodes: list):
+        """Collapse new HTML nodes into the pending list and write finished ones."""
+        for node in html.strip_empty(nodes):
+            html._collapsing_add(pending, node)
+        # Only the last top-level node can still absorb what comes next
+        if len(pending) > 1:
+            self._write(out, pending[:-1])
+            del pending[:-1]
+
+    def _write(self, out: TextIO, nodes: list):
+        writer = writers.writer('html')
+        html.write(writer, nodes)
+        out.write(writer.as_string())
@@ -2,14 +2,28 @@
 Style parser for converting CSS styles to python-docx format.
 """
 import re
+import copy
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Hashable, Iterable, Union
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
 from docx.shared import Pt, Inches, RGBColor, Cm, Emu
 from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
 from docx.enum.table import WD_TABLE_ALIGNMENT
+from docx.text.paragraph import Paragraph
+from docx.text.run import Run
 
+from .cache_stats import CacheStats
 
-@dataclass
+_PSTYLE = qn('w:pStyle')
+
+# Style lookups happen per run, so their hit rates are logged less often
+STYLE_LOG_EVERY = 100_000
+
+
+@dataclass(frozen=True)
 class FontStyle:
     """Font style properties."""
     name: Optional[str] = None
@@ -22,7 +36,7 @@ class FontStyle:
     highlight_color: Optional[RGBColor] = None
 
 
-@dataclass
+@dataclass(frozen=True)
 class ParagraphStyle:
     """Paragraph style properties."""
     alignment: Optional[WD_ALIGN_PARAGRAPH] = None
@@ -47,8 +61,79 @@ class PageSetup:
     footer_distance: Optional[Inches] = None
 
 
+class StyleCache:
+    """Bounded LRU mapping with hit/miss counters."""
+
+    def __init__(self, maxsize: int, name: str = 'style cache'):
+        self.maxsize = maxsize
+        self._stats = CacheStats(name, log_every=STYLE_LOG_EVERY)
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Get the value for key, creating it with factory on a miss."""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                value = self._items[key]
+                hit = True
+            else:
+                hit = False
+        if hit:
+            self._stats.hit()
+            return value
+        self._stats.miss()
+        value = factory()
+        with self._lock:
+            self._items[key] = value
+            if len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+                self._stats.evicted()
+        return value
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._items)
+        return {**self._stats.as_dict(), 'size': size, 'maxsize': self.maxsize}
+
+
+@dataclass(frozen=True)
+class StyleCaches:
+    """The caches behind a StyleParser."""
+    font_styles: StyleCache
+    paragraph_styles: StyleCache
+    run_properties: StyleCache
+    paragraph_properties: StyleCache
+
+
+_shared: Dict[int, StyleCaches] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_style_caches(cache_size: int) -> StyleCaches:
+    """Get this process's style caches with the given size."""
+    with _shared_lock:
+        caches = _shared.get(cache_size)
+        if caches is None:
+            caches = _shared[cache_size] = StyleCaches(
+                font_styles=StyleCache(cache_size, 'font style cache'),
+                paragraph_styles=StyleCache(cache_size, 'paragraph style cache'),
+                run_properties=StyleCache(cache_size, 'run properties cache'),
+                paragraph_properties=StyleCache(cache_size, 'paragraph properties cache'),
+            )
+        return caches
+
+
 class StyleParser:
-    """Parse CSS styles and convert to python-docx format."""
+    """Parse CSS styles and convert to python-docx format.
+
+    ``font_style`` and ``paragraph_style`` memoize the parsed style per raw
+    ``style`` attribute, and the apply methods build the matching
+    ``w:rPr``/``w:pPr`` XML once per style and copy it onto each run or
+    paragraph. The memos are shared by every parser of the process with the
+    same ``cache_size``, so they outlive single documents and converters;
+    a pickled parser picks up the receiving process's memos.
+    """
 
     # CSS color name to RGB mapping
     COLOR_MAP = {
@@ -67,6 +152,58 @@ class StyleParser:
         'justify': WD_ALIGN_PARAGRAPH.JUSTIFY,
     }
 
+    def __init__(self, cache_size: int = 1024):
+        """
+        Args:
+            cache_size: Distinct styles kept per cache
+        """
+        self.cache_size = cache_size
+        self._init_caches()
+
+    def _init_caches(self):
+        caches = shared_style_caches(self.cache_size)
+        self._font_styles = caches.font_styles
+        self._paragraph_styles = caches.paragraph_styles
+        self._run_properties = caches.run_properties
+        self._paragraph_properties = caches.paragraph_properties
+
+    def __getstate__(self):
+        # Caches hold locks and lxml elements; workers use their own
+        return {'cache_size': self.cache_size}
+
+    def __setstate__(self, state):
+        self.cache_size = state['cache_size']
+        self._init_caches()
+
+    def cache_info(self) -> Dict[str, Dict[str, Any]]:
+        """Hit/miss counters of the style string caches of this process."""
+        return {
+            'font_styles': self._font_styles.info(),
+            'paragraph_styles': self._paragraph_styles.info(),
+        }
+
+    def font_style(self, style_str: str) -> FontStyle:
+        """Get the FontStyle for a raw CSS style attribute, memoized."""
+        return self._font_styles.get(
+            style_str or '', lambda: self.parse_font_style(self.parse_style_string(style_str))
+        )
+
+    def paragraph_style(self, styles: Union[str, Dict[str, str]]) -> ParagraphStyle:
+        """
+        Get the ParagraphStyle for a style attribute, memoized.
+
+        Args:
+            styles: Raw CSS style attribute, or one already split by
+                ``parse_style_string``
+        """
+        if isinstance(styles, str):
+            return self._paragraph_styles.get(
+                styles, lambda: self.parse_paragraph_style(self.parse_style_string(styles))
+            )
+        return self._paragraph_styles.get(
+            tuple(styles.items()), lambda: self.parse_paragraph_style(styles)
+        )
+
     def parse_style_string(self, style_str: str) -> Dict[str, str]:
         """Parse CSS style string into dict."""
         if not style_str:
@@ -189,71 +326,71 @@ class StyleParser:
 
     def parse_font_style(self, styles: Dict[str, str]) -> FontStyle:
         """Parse CSS styles to FontStyle."""
-        font = FontStyle()
+        font = {}
 
         if 'font-family' in styles:
             # Take first font family
-            font.name = styles['font-family'].split(',')[0].strip().strip('"\'')
+            font['name'] = styles['font-family'].split(',')[0].strip().strip('"\'')
 
         if 'font-size' in styles:
-            font.size = self.parse_size(styles['font-size'])
+            font['size'] = self.parse_size(styles['font-size'])
 
         if 'font-weight' in styles:
             weight = styles['font-weight'].lower()
-            font.bold = weight in ('bold', '700', '800', '900')
+            font['bold'] = weight in ('bold', '700', '800', '900')
 
         if 'font-style' in styles:
-            font.italic = styles['font-style'].lower() == 'italic'
+            font['italic'] = styles['font-style'].lower() == 'italic'
 
         if 'text-decoration' in styles:
             dec = styles['text-decoration'].lower()
-            font.underline = 'underline' in dec
-            font.strike = 'line-through' in dec
+            font['underline'] = 'underline' in dec
+            font['strike'] = 'line-through' in dec
 
         if 'color' in styles:
-            font.color = self.parse_color(styles['color'])
+            font['color'] = self.parse_color(styles['color'])
 
         if 'background-color' in styles:
-            font.highlight_color = self.parse_color(styles['background-color'])
+            font['highlight_color'] = self.parse_color(styles['background-color'])
 
-        return font
+        return FontStyle(**font)
 
     def parse_paragraph_style(self, styles: Dict[str, str]) -> ParagraphStyle:
         """Parse CSS styles to ParagraphStyle."""
-        para = ParagraphStyle()
+        para = {}
 
         if 'text-align' in styles:
             align = styles['text-align'].lower()
-            para.alignment = self.ALIGN_MAP.get(align)
+            para['alignment'] = self.ALIGN_MAP.get(align)
 
         if 'line-height' in styles:
             lh = styles['line-height']
             try:
                 if lh.endswith('%'):
-                    para.line_spacing = float(lh[:-1]) / 100
+                    para['line_spacing'] = float(lh[:-1]) / 100
                 else:
-                    para.line_spacing = float(lh)
+                    para['line_spacing'] = float(lh)
             except ValueError:
                 pass
 
         if 'margin-top' in styles:
-            para.space_before = self.parse_size(styles['margin-top'])
+            para['space_before'] = self.parse_size(styles['margin-top'])
 
         if 'margin-bottom' in styles:
-            para.space_after = self.parse_size(styles['margin-bottom'])
+            para['space_after'] = self.parse_size(styles['margin-bottom'])
 
         if 'text-indent' in styles:
-            para.first_line_indent = self.parse_size(styles['text-indent'])
+            para['first_line_indent'] = self.parse_size(styles['text-indent'])
 
         if 'margin-left' in styles or 'padding-left' in styles:
             indent_str = styles.get('margin-left') or styles.get('padding-left')
-            para.left_indent = self.parse_size(indent_str)
+            para['left_indent'] = self.parse_size(indent_str)
 
         if 'margin-right' in styles or 'padding-right' in styles:
             indent_str = styles.get('margin-right') or styles.get('padding-right')
-            para.right_indent = self.parse_size(indent_str)
+            para['right_indent'] = self.parse_size(indent_str)
 
-        return para
+        return ParagraphStyle(**para)
 
     def parse_page_setup(self, attrs: Dict[str, str]) -> PageSetup:
         """Parse page-setup element attributes to PageSetup."""
@@ -276,6 +413,25 @@ class StyleParser:
 
     def apply_font_style(self, run, font_style: FontStyle):
         """Apply FontStyle to a python-docx Run."""
+        self.apply_font_style_to_runs([run], font_style)
+
+    def apply_font_style_to_runs(self, runs: Iterable, font_style: FontStyle):
+        """Apply one FontStyle to many runs, building its w:rPr only once."""
+        rPr = self._run_properties.get(font_style, lambda: self._compile_run_properties(font_style))
+        for run in runs:
+            if run._r.rPr is None:
+                if rPr is not None:
+                    run._r.insert(0, copy.deepcopy(rPr))
+            else:
+                self._set_font_style(run, font_style)
+
+    def _compile_run_properties(self, font_style: FontStyle):
+        """Build the w:rPr a fresh run gets for this style, or None if it gets none."""
+        run = Run(OxmlElement('w:r'), None)
+        self._set_font_style(run, font_style)
+        return run._r.rPr
+
+    def _set_font_style(self, run, font_style: FontStyle):
         if font_style.name:
             run.font.name = font_style.name
         if font_style.size:
@@ -293,6 +449,27 @@ class StyleParser:
 
     def apply_paragraph_style(self, paragraph, para_style: ParagraphStyle):
         """Apply ParagraphStyle to a python-docx Paragraph."""
+        pPr = self._paragraph_properties.get(
+            para_style, lambda: self._compile_paragraph_properties(para_style)
+        )
+        if pPr is None:
+            return
+        existing = paragraph._p.pPr
+        if existing is None:
+            paragraph._p.insert(0, copy.deepcopy(pPr))
+        elif all(child.tag == _PSTYLE for child in existing):
+            # w:pStyle comes first in w:pPr, so the compiled properties follow it
+            existing.extend(copy.deepcopy(child) for child in pPr)
+        else:
+            self._set_paragraph_style(paragraph, para_style)
+
+    def _compile_paragraph_properties(self, para_style: ParagraphStyle):
+        """Build the w:pPr a fresh paragraph gets for this style, or None."""
+        paragraph = Paragraph(OxmlElement('w:p'), None)
+        self._set_paragraph_style(paragraph, para_style)
+        return paragraph._p.pPr
+
+    def _set_paragraph_style(self, paragraph, para_style: ParagraphStyle):
         if para_style.alignment:
             paragraph.alignment = para_style.alignment
         if para_style.line_spacing:
@@ -0,0 +1,192 @@
+"""
+Bulk construction of docx tables.
+
+python-docx rebuilds a row's cell list on every ``table.rows[i].cells``
+access and resolves merged cells by walking the whole grid, so filling a
+large table cell by cell gets slower with every row. ``build_table`` lays
+out the HTML grid (including rowspan/colspan) once and appends all
+``w:tr``/``w:tc`` elements in a single pass.
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from lxml.etree import SubElement
+from docx.oxml.ns import qn
+from docx.table import _Cell
+from docx.text.paragraph import Paragraph
+
+from .ooxml_writer import OoxmlDocument, OoxmlParagraph
+
+_TR = qn('w:tr')
+_TR_PR = qn('w:trPr')
+_TBL_HEADER = qn('w:tblHeader')
+_TC = qn('w:tc')
+_TC_PR = qn('w:tcPr')
+_TC_W = qn('w:tcW')
+_GRID_SPAN = qn('w:gridSpan')
+_V_MERGE = qn('w:vMerge')
+_SHD = qn('w:shd')
+_V_ALIGN = qn('w:vAlign')
+_P = qn('w:p')
+_GRID_COL = qn('w:gridCol')
+_VAL = qn('w:val')
+_W = qn('w:w')
+_TYPE = qn('w:type')
+_FILL = qn('w:fill')
+_COLOR = qn('w:color')
+
+# Same limits browsers apply to colspan/rowspan
+MAX_COLSPAN = 1000
+MAX_ROWSPAN = 65534
+
+# CSS vertical-align -> w:vAlign
+V_ALIGN_MAP = {'top': 'top', 'middle': 'center', 'bottom': 'bottom'}
+
+
+@dataclass
+class TableCell:
+    """One HTML cell and its formatting."""
+    content: Any = None  # Passed back to the fill callback
+    colspan: int = 1
+    rowspan: int = 1
+    header: bool = False
+    shading: Optional[str] = None  # Fill color as RRGGBB
+    vertical_alignment: Optional[str] = None  # 'top', 'center' or 'bottom'
+
+
+def layout_grid(rows: List[List[TableCell]]) -> Tuple[List[List[Optional[Tuple]]], int]:
+    """
+    Place cells on a grid the way HTML tables do.
+
+    Args:
+        rows: Cells per row in source order
+
+    Returns:
+        (grid, column count). Each grid slot is None (no cell), or
+        (cell, is_origin) for the first column a cell covers in a row,
+        or False for the other columns covered by a colspan.
+    """
+    grid: List[List] = [[] for _ in rows]
+    for r, row in enumerate(rows):
+        c = 0
+        for cell in row:
+            # Skip slots taken by rowspans from rows above
+            while c < len(grid[r]) and grid[r][c] is not None:
+                c += 1
+            colspan = max(1, cell.colspan)
+            rowspan = max(1, min(cell.rowspan, len(rows) - r))
+            for dr in range(rowspan):
+                slots = grid[r + dr]
+                if len(slots) < c + colspan:
+                    slots.extend([None] * (c + colspan - len(slots)))
+                slots[c] = (cell, dr == 0)
+                for dc in range(1, colspan):
+                    slots[c + dc] = False
+            c += colspan
+    cols = max((len(slots) for slots in grid), default=0)
+    for slots in grid:
+        slots.extend([None] * (cols - len(slots)))
+    return grid, cols
+
+
+def build_table(doc, rows: List[List[TableCell]],
+                fill: Callable[[Paragraph, TableCell], None],
+                style: Optional[str] = 'Table Grid'):
+    """
+    Add a table with all its rows to a document in one pass.
+
+    Args:
+        doc: python-docx Document or OoxmlDocument
+        rows: Cells per row, as in the HTML
+        fill: Called with each cell's first paragraph to write its content
+        style: Table style name
+
+    Returns:
+        The table, or None if there are no cells
+    """
+    grid, cols = layout_grid(rows)
+    if not grid or cols == 0:
+        return None
+
+    table = doc.add_table(rows=0, cols=cols)
+    table.style = style
+    tbl = table._tbl
+    col_width = int(tbl.tblGrid.find(_GRID_COL).get(_W))
+    writer = doc if isinstance(doc, OoxmlDocument) else None
+
+    for cells, slots in zip(rows, grid):
+        tr = SubElement(tbl, _TR)
+        if cells and all(cell.header for cell in cells):
+            SubElement(SubElement(tr, _TR_PR), _TBL_HEADER)
+        for slot in slots:
+            if slot is False:
+                continue
+            if slot is None:
+                _add_tc(tr, col_width, 1)
+                continue
+            cell, is_origin = slot
+            tc = _add_tc(tr, col_width, max(1, cell.colspan), cell, is_origin)
+            if is_origin and fill is not None:
+                p = tc.find(_P)
+                parent = _Cell(tc, table)
+                paragraph = OoxmlParagraph(p, parent, writer) if writer else Paragraph(p, parent)
+                fill(paragraph, cell)
+    return table
+
+
+def _add_tc(tr, col_width: int, colspan: int, cell: Optional[TableCell] = None,
+            is_origin: bool = True):
+    """Append a w:tc with its properties and an empty paragraph."""
+    tc = SubElement(tr, _TC)
+    tcPr = SubElement(tc, _TC_PR)
+    tcW = SubElement(tcPr, _TC_W)
+    tcW.set(_TYPE, 'dxa')
+    tcW.set(_W, str(col_width * colspan))
+    if colspan > 1:
+        SubElement(tcPr, _GRID_SPAN).set(_VAL, str(colspan))
+    if cell is not None:
+        if cell.rowspan > 1 or not is_origin:
+            v_merge = SubElement(tcPr, _V_MERGE)
+            if is_origin:
+                v_merge.set(_VAL, 'restart')
+        if cell.shading:
+            shd = SubElement(tcPr, _SHD)
+            shd.set(_VAL, 'clear')
+            shd.set(_COLOR, 'auto')
+            shd.set(_FILL, cell.shading)
+        if cell.vertical_alignment:
+            SubElement(tcPr, _V_ALIGN).set(_VAL, cell.vertical_alignment)
+    SubElement(tc, _P)
+    return tc
+
+
+def cell_from_html(element, styles: Dict[str, str], style_parser, content: Any = None) -> TableCell:
+    """
+    Describe an HTML td/th as a TableCell.
+
+    Args:
+        element: The td/th tag
+        styles: Its parsed style attribute
+        style_parser: StyleParser used to read colors
+        content: Value handed to the fill callback; defaults to the tag
+    """
+    shading = None
+    if styles.get('background-color'):
+        color = style_parser.parse_color(styles['background-color'])
+        if color is not None:
+            shading = str(color)
+    return TableCell(
+        content=element if content is None else content,
+        colspan=_span(element.get('colspan'), MAX_COLSPAN),
+        rowspan=_span(element.get('rowspan'), MAX_ROWSPAN),
+        header=element.name == 'th',
+        shading=shading,
+        vertical_alignment=V_ALIGN_MAP.get(styles.get('vertical-align', '').lower()),
+    )
+
+
+def _span(value, limit: int) -> int:
+    try:
+        return min(max(1, int(value)), limit)
+    except (TypeError, ValueError):
+        return 1
@@ -0,0 +1,111 @@
+"""
+Per-process cache of parsed docx templates for new documents.
+"""
+import os
+import copy
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import qn
+from docx.parts.numbering import NumberingPart
+from docx.parts.styles import StylesPart
+
+# Styles the converters assign by name; templates must define them
+REQUIRED_STYLES = (
+    'Title', 'Heading 1', 'Heading 2', 'Heading 3', 'Heading 4', 'Heading 5',
+    'Heading 6', 'List Bullet', 'List Number', 'Quote', 'Table Grid',
+)
+
+# Parts the converters only read, so every copy can share the parsed XML
+SHARED_PART_TYPES = (StylesPart, NumberingPart)
+
+# Parts currently shared by template copies; they must not be modified
+_shared_parts = weakref.WeakSet()
+
+
+class DocxTemplate:
+    """A docx package parsed once and copied for each new document.
+
+    Body content of the template is dropped; its section setup, headers,
+    footers, styles and numbering are kept. Styles and numbering parts are
+    shared between copies, everything else is deep-copied.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Template .docx, or None for python-docx's default template
+
+        Raises:
+            ValueError: If the template lacks a style the converters use
+        """
+        self.path = path
+        self._document = Document(path)
+
+        body = self._document.element.body
+        for child in list(body):
+            if child.tag != qn('w:sectPr'):
+                body.remove(child)
+
+        style_names = {style.name for style in self._document.styles}
+        missing = [name for name in REQUIRED_STYLES if name not in style_names]
+        if missing:
+            raise ValueError(f'Template {path} is missing styles: {", ".join(missing)}')
+
+        self._shared_parts = [
+            part for part in self._document.part.package.iter_parts()
+            if isinstance(part, SHARED_PART_TYPES)
+        ]
+        _shared_parts.update(self._shared_parts)
+
+    def new_document(self):
+        """Get an independent python-docx Document based on this template."""
+        memo = {id(part): part for part in self._shared_parts}
+        return copy.deepcopy(self._document, memo)
+
+
+def own_styles_part(document) -> StylesPart:
+    """
+    Get a styles part of the document that is safe to modify.
+
+    A styles part shared with the template is replaced by a private copy
+    for this document first.
+
+    Args:
+        document: python-docx Document
+    """
+    part = document.part
+    styles_part = part._styles_part
+    if styles_part in _shared_parts:
+        private = StylesPart(
+            styles_part.partname, styles_part.content_type,
+            copy.deepcopy(styles_part.element), part.package
+        )
+        for rel in part.rels.values():
+            if rel.reltype == RT.STYLES:
+                rel._target = private
+        styles_part = private
+    return styles_part
+
+
+_templates: Dict[Tuple[Optional[str], float], DocxTemplate] = {}
+_templates_lock = threading.Lock()
+
+
+def get_template(path: Optional[str] = None) -> DocxTemplate:
+    """Get a parsed template, reloading it when the file changes."""
+    key = (path, os.path.getmtime(path) if path else 0.0)
+    template = _templates.get(key)
+    if template is None:
+        with _templates_lock:
+            template = _templates.get(key)
+            if template is None:
+                template = DocxTemplate(path)
+                # Drop older versions of the same template
+                for stale in [k for k in _templates if k[0] == path]:
+                    del _templates[stale]
+                _templates[key] = template
+    return template
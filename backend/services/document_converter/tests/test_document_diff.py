@@ -0,0 +1,119 @@
+"""
+DocumentDiff must find a common subsequence of the element hashes, and
+the longest one when no element is unique (Myers alone does the work).
+"""
+import random
+import unittest
+
+from services.document_converter.incremental_converter import (
+    ChangeType,
+    DocumentDiff,
+    DocumentStructure,
+)
+
+
+def lcs_length(a, b):
+    """Textbook dynamic-programming LCS length."""
+    row = [0] * (len(b) + 1)
+    for x in a:
+        previous = 0
+        for j, y in enumerate(b, start=1):
+            current = row[j]
+            row[j] = previous + 1 if x == y else max(row[j], row[j - 1])
+            previous = current
+    return row[-1]
+
+
+def anchor_free(a, b):
+    """Whether _matches will hand both sequences to Myers untrimmed and unanchored."""
+    if not a or not b or a[0] == b[0] or a[-1] == b[-1]:
+        return False
+    return not any(a.count(value) == 1 and b.count(value) == 1 for value in set(a))
+
+
+class DocumentDiffTests(unittest.TestCase):
+
+    def setUp(self):
+        self.random = random.Random(22)
+
+    def assertCommonSubsequence(self, a, b, matches):
+        for i, j in matches:
+            self.assertEqual(a[i], b[j])
+        for (i, j), (k, l) in zip(matches, matches[1:]):
+            self.assertLess(i, k)
+            self.assertLess(j, l)
+
+    def random_sequence(self, alphabet, max_length):
+        return [self.random.choice(alphabet) for _ in range(self.random.randint(0, max_length))]
+
+    def test_matches_are_a_common_subsequence(self):
+        for _ in range(500):
+            a = self.random_sequence('abcdefgh', 30)
+            b = self.random_sequence('abcdefgh', 30)
+            self.assertCommonSubsequence(a, b, DocumentDiff()._matches(a, b))
+
+    def test_lcs_without_anchors(self):
+        cases = 0
+        while cases < 300:
+            a = self.random_sequence('abcd', 25)
+            b = self.random_sequence('abcd', 25)
+            if not anchor_free(a, b):
+                continue
+            cases += 1
+            matches = DocumentDiff()._matches(a, b)
+            self.assertCommonSubsequence(a, b, matches)
+            self.assertEqual(len(matches), lcs_length(a, b), (a, b))
+
+    def test_middle_snake_edit_distance(self):
+        for _ in range(300):
+            a = self.random_sequence('abc', 20)
+            b = self.random_sequence('abc', 20)
+            if not a or not b:
+                continue
+            snake = DocumentDiff._middle_snake(a, 0, len(a), b, 0, len(b), None)
+            x, y, u, v, edits = snake
+            self.assertEqual(edits, len(a) + len(b) - 2 * lcs_length(a, b))
+            # The snake is a run of matches inside both ranges
+            self.assertEqual(u - x, v - y)
+            self.assertEqual(a[x:u], b[y:v])
+
+    def test_max_gap_edits_replaces_the_gap(self):
+        a = list('xxababyy')
+        b = list('yybabaxx')
+        self.assertTrue(anchor_free(a, b))
+        self.assertEqual(len(DocumentDiff()._matches(a, b)), lcs_length(a, b))
+
+        # Too many edits: nothing in the gap is matched
+        self.assertEqual(DocumentDiff(max_gap_edits=2)._matches(a, b), [])
+        self.assertIsNone(DocumentDiff._middle_snake(a, 0, len(a), b, 0, len(b), 2))
+
+        # The common prefix, a unique anchor and the suffix still match
+        a = ['p'] + a + ['m'] + a + ['q']
+        b = ['p'] + b + ['m'] + b + ['q']
+        matches = DocumentDiff(max_gap_edits=2)._matches(a, b)
+        self.assertEqual(matches, [(0, 0), (9, 9), (18, 18)])
+
+    def test_max_gap_edits_within_bound(self):
+        a = list('abab')
+        b = list('baba')
+        self.assertTrue(anchor_free(a, b))
+        matches = DocumentDiff(max_gap_edits=2)._matches(a, b)
+        self.assertEqual(len(matches), 3)
+
+    def test_diff_changes(self):
+        old = DocumentStructure('<p>one</p><p>two</p><p>three</p><p>four</p>')
+        new = DocumentStructure(
+            '<p>zero</p><p>one</p><p style="color: red">two</p><p>four</p>'
+        )
+        changes = DocumentDiff().diff(old, new)
+        self.assertEqual(
+            [(c.type, c.index) for c in changes],
+            [(ChangeType.INSERT, 0), (ChangeType.DELETE, 1), (ChangeType.DELETE, 2),
+             (ChangeType.INSERT, 2)],
+        )
+        # A style change is a replaced element, never a modify
+        self.assertNotIn(ChangeType.MODIFY, {c.type for c in changes})
+
+
+if __name__ == '__main__':
+    unittest.main()
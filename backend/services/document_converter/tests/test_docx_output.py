@@ -0,0 +1,107 @@
+"""
+Packages saved over a base package must be valid zips with the same parts.
+
+_PartReusingWriter copies compressed members by hand through zipfile and
+python-docx internals, so these tests guard the python-docx pin.
+"""
+import io
+import zipfile
+import unittest
+
+from docx import Document
+
+from services.document_converter.docx_output import save_docx
+
+
+def build(paragraphs):
+    document = Document()
+    for text in paragraphs:
+        document.add_paragraph(text)
+    return document
+
+
+def members(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as package:
+        return {info.filename: (info.compress_type, package.read(info)) for info in package.infolist()}
+
+
+class _Unseekable(io.RawIOBase):
+    """Write-only stream, which makes zipfile use data descriptors."""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+
+def with_data_descriptors(data):
+    """Rewrite a package the way streaming zip writers lay it out."""
+    sink = _Unseekable()
+    with zipfile.ZipFile(io.BytesIO(data)) as source, \
+            zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            with target.open(info.filename, 'w') as member:
+                member.write(source.read(info))
+    return sink.buffer.getvalue()
+
+
+class PartReuseTests(unittest.TestCase):
+
+    def assertValidPackage(self, data, expected):
+        with zipfile.ZipFile(io.BytesIO(data)) as package:
+            self.assertIsNone(package.testzip())
+        self.assertEqual(
+            {name: blob for name, (_, blob) in members(expected).items()},
+            {name: blob for name, (_, blob) in members(data).items()},
+        )
+        # python-docx reads it back
+        Document(io.BytesIO(data))
+
+    def test_reused_parts_round_trip(self):
+        base = save_docx(build(['one', 'two'])).data
+        document = build(['one', 'two', 'three'])
+        expected = save_docx(document).data
+
+        # Written parts are stored, so deflated ones were copied from the base
+        saved = save_docx(document, base=base, compress_level=0).data
+        self.assertValidPackage(saved, expected)
+        types = {name: compress_type for name, (compress_type, _) in members(saved).items()}
+        self.assertEqual(zipfile.ZIP_STORED, types.pop('word/document.xml'))
+        self.assertEqual({zipfile.ZIP_DEFLATED}, set(types.values()))
+
+    def test_chained_reuse(self):
+        # Each preview is the base of the next, so copies get copied again
+        base = None
+        for count in range(1, 5):
+            document = build([f'paragraph {i}' for i in range(count)])
+            saved = save_docx(document, base=base).data
+            self.assertValidPackage(saved, save_docx(document).data)
+            base = saved
+
+    def test_base_with_data_descriptors(self):
+        base = with_data_descriptors(save_docx(build(['one'])).data)
+        with zipfile.ZipFile(io.BytesIO(base)) as package:
+            self.assertTrue(all(info.flag_bits & 0x08 for info in package.infolist()))
+
+        document = build(['one', 'two'])
+        saved = save_docx(document, base=base, compress_level=0).data
+        self.assertValidPackage(saved, save_docx(document).data)
+        with zipfile.ZipFile(io.BytesIO(saved)) as package:
+            self.assertFalse(any(info.flag_bits & 0x08 for info in package.infolist()))
+
+    def test_reuse_into_spilled_file(self):
+        base = save_docx(build(['one'])).data
+        document = build(['one', 'two'])
+        output = save_docx(document, max_memory_bytes=1024, base=base)
+        self.assertIsNone(output.data)
+        with output.open() as stream:
+            saved = stream.read()
+        self.assertValidPackage(saved, save_docx(document).data)
+
+
+if __name__ == '__main__':
+    unittest.main()
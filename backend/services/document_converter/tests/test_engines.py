@@ -0,0 +1,138 @@
+"""
+The python-docx and ooxml engines must write identical packages.
+
+Run with ``python manage.py test services`` (or pytest) from the backend
+directory.
+"""
+import base64
+import shutil
+import zipfile
+import tempfile
+import unittest
+
+from services.document_converter import (
+    DocumentConverter,
+    IncrementalConverter,
+    MediaStore,
+    MemoryPreviewCache,
+)
+from services.document_converter.fragment_cache import FragmentCache
+from services.document_converter.ooxml_writer import ENGINES
+
+# 2x2 red PNG
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAIAAAACCAIAAAD91JpzAAAAEklEQVR4nGP4z8DAwMDAwMAAAA0GAQDQ2yzVAAAAAElFTkSuQmCC'
+)
+PNG_URI = 'data:image/png;base64,' + base64.b64encode(PNG).decode()
+
+TABLE_HTML = (
+    '<table>'
+    '<tr><th>Name</th><th colspan="2">Contact</th></tr>'
+    '<tr><td rowspan="2" style="background-color: #eef">Group</td><td>a</td><td>b</td></tr>'
+    '<tr><td colspan="2"><strong>merged</strong> cell</td></tr>'
+    '<tr><td>x</td><td style="background-color: yellow">y</td><td>z</td></tr>'
+    '</table>'
+)
+
+LIST_HTML = (
+    '<ul><li>First</li><li>Second with <em>emphasis</em></li></ul>'
+    '<ol><li style="text-align: center">One</li><li>Two <strong>bold</strong></li></ol>'
+)
+
+IMAGE_HTML = (
+    f'<p>Inline <img src="{PNG_URI}" width="40"> image</p>'
+    f'<img src="{PNG_URI}">'
+)
+
+STYLED_HTML = (
+    '<h1>Title</h1>'
+    '<h2 style="text-align: center">Subtitle</h2>'
+    '<p style="text-align: justify; line-height: 150%; margin-top: 6pt; margin-bottom: 8pt">'
+    'Plain <strong>bold</strong> <em>italic</em> <u>underline</u> <s>strike</s> '
+    '<span style="color: #c00; font-size: 14pt; font-family: Georgia">styled</span> '
+    '<span style="color: rgb(0, 128, 0)"><strong>nested</strong></span></p>'
+    '<blockquote>Quoted</blockquote>'
+    '<p style="text-indent: 12pt; margin-left: 24pt">Indented</p>'
+)
+
+
+def read_parts(output):
+    """Map each part name of a generated package to its bytes."""
+    with zipfile.ZipFile(output.open()) as package:
+        return {name: package.read(name) for name in package.namelist()}
+
+
+class EngineEquivalenceTests(unittest.TestCase):
+
+    def setUp(self):
+        self.media_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_dir, ignore_errors=True)
+        self.media_store = MediaStore(self.media_dir, '/media/images/')
+
+    def export(self, html, engine):
+        converter = DocumentConverter(media_store=self.media_store, docx_engine=engine)
+        return read_parts(converter.html_to_docx(html, 'test'))
+
+    def preview(self, engine, *versions):
+        # Each engine gets its own caches, so neither reuses the other's blocks
+        converter = IncrementalConverter(
+            media_store=self.media_store, docx_engine=engine,
+            cache=MemoryPreviewCache(64 * 1024 * 1024), fragments=FragmentCache(0),
+        )
+        for html in versions:
+            parts = read_parts(converter.convert(html, doc_id='doc'))
+        return parts
+
+    def assertSamePackages(self, packages):
+        first_engine, first = packages[0]
+        for engine, parts in packages[1:]:
+            self.assertEqual(sorted(first), sorted(parts), f'{first_engine} vs {engine}: part names')
+            for name in first:
+                self.assertEqual(first[name], parts[name], f'{first_engine} vs {engine}: {name}')
+        return first
+
+    def check(self, html):
+        """Assert identical export and preview packages; return the export's parts."""
+        self.assertSamePackages([(engine, self.preview(engine, html)) for engine in ENGINES])
+        return self.assertSamePackages([(engine, self.export(html, engine)) for engine in ENGINES])
+
+    def test_tables_with_spans(self):
+        document = self.check(TABLE_HTML)['word/document.xml']
+        self.assertIn(b'w:gridSpan', document)
+        self.assertIn(b'w:vMerge', document)
+        self.assertIn(b'w:shd', document)
+
+    def test_lists(self):
+        document = self.check(LIST_HTML)['word/document.xml']
+        self.assertEqual(2, document.count(b'w:val="ListBullet"'))
+        self.assertEqual(2, document.count(b'w:val="ListNumber"'))
+
+    def test_images(self):
+        parts = self.check(IMAGE_HTML)
+        # Both pictures share one media part, as their bytes are identical
+        self.assertEqual(1, sum(name.startswith('word/media/') for name in parts))
+        self.assertEqual(2, parts['word/document.xml'].count(b'<w:drawing'))
+
+    def test_media_store_images(self):
+        url = self.media_store.save(PNG, 'image/png')
+        parts = self.check(f'<p>Stored <img src="{url}"></p>')
+        self.assertTrue(any(name.startswith('word/media/') for name in parts))
+
+    def test_styled_runs(self):
+        document = self.check(STYLED_HTML)['word/document.xml']
+        for tag in (b'w:b/', b'w:i/', b'w:u ', b'w:strike', b'w:color', b'w:sz ', b'w:jc'):
+            self.assertIn(tag, document)
+
+    def test_mixed_document(self):
+        self.check(STYLED_HTML + LIST_HTML + TABLE_HTML + IMAGE_HTML)
+
+    def test_incremental_preview(self):
+        before = STYLED_HTML + LIST_HTML + TABLE_HTML + IMAGE_HTML
+        after = before.replace('Quoted', 'Quoted and edited').replace('<li>First</li>', '')
+        self.assertSamePackages([
+            (engine, self.preview(engine, before, after)) for engine in ENGINES
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
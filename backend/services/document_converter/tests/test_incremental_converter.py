@@ -0,0 +1,104 @@
+"""
+A preview patched from the previous package must equal a full conversion.
+"""
+import re
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from services.document_converter import IncrementalConverter, MediaStore, MemoryPreviewCache
+from services.document_converter.fragment_cache import FragmentCache
+from services.document_converter.ooxml_writer import ENGINES
+from services.document_converter.tests.test_engines import (
+    IMAGE_HTML,
+    LIST_HTML,
+    STYLED_HTML,
+    TABLE_HTML,
+    read_parts,
+)
+
+PARAGRAPHS = ''.join(f'<p>Paragraph {i}</p>' for i in range(20))
+BEFORE = STYLED_HTML + LIST_HTML + PARAGRAPHS + TABLE_HTML + IMAGE_HTML
+
+EDITS = {
+    'insert': BEFORE.replace('<p>Paragraph 5</p>', '<p>New</p><p>Paragraph 5</p>'),
+    'delete': BEFORE.replace('<p>Paragraph 5</p>', ''),
+    'modify': BEFORE.replace('Paragraph 5', 'Paragraph <em>five</em>'),
+    'modify table': BEFORE.replace('<td>x</td>', '<td>changed</td>'),
+    'modify list': BEFORE.replace('<li>Two <strong>bold</strong></li>', '<li>Two</li><li>Three</li>'),
+    'several': BEFORE.replace('<p>Paragraph 0</p>', '')
+                     .replace('Paragraph 9', 'Paragraph nine')
+                     .replace('<p>Paragraph 15</p>', '<p>Paragraph 15</p><h2>Inserted</h2>'),
+    'delete image': BEFORE.replace(IMAGE_HTML, ''),
+}
+
+# Drawings are numbered in the order they were built
+DOC_PR = re.compile(rb'<wp:docPr id="\d+" name="Picture \d+"/>')
+
+
+class IncrementalPreviewTests(unittest.TestCase):
+
+    def setUp(self):
+        media_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_dir, ignore_errors=True)
+        self.media_store = MediaStore(media_dir, '/media/images/')
+
+    def converter(self, engine):
+        return IncrementalConverter(
+            media_store=self.media_store, docx_engine=engine,
+            cache=MemoryPreviewCache(64 * 1024 * 1024), fragments=FragmentCache(0),
+        )
+
+    def patched(self, engine, before, after):
+        """Convert before, then after, failing if after is not patched in place."""
+        converter = self.converter(engine)
+        converter.convert(before, doc_id='doc')
+        with mock.patch.object(converter, '_convert_full',
+                               side_effect=AssertionError('converted in full')):
+            return read_parts(converter.convert(after, doc_id='doc'))
+
+    def full(self, engine, html):
+        return read_parts(self.converter(engine).convert(html, doc_id='doc'))
+
+    def test_patched_equals_full(self):
+        for engine in ENGINES:
+            for name, after in EDITS.items():
+                with self.subTest(engine=engine, edit=name):
+                    self.assertEqual(self.full(engine, after), self.patched(engine, BEFORE, after))
+
+    def test_inserted_image(self):
+        after = BEFORE.replace('<p>Paragraph 7</p>', IMAGE_HTML)
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                full = self.full(engine, after)
+                patched = self.patched(engine, BEFORE, after)
+                self.assertEqual(sorted(full), sorted(patched))
+                for name in full:
+                    if name == 'word/document.xml':
+                        self.assertEqual(DOC_PR.sub(b'', full[name]), DOC_PR.sub(b'', patched[name]))
+                    else:
+                        self.assertEqual(full[name], patched[name], name)
+
+    def test_mismatched_package_converts_in_full(self):
+        after = EDITS['modify']
+        converter = self.converter('python-docx')
+        converter.convert(BEFORE, doc_id='doc')
+        with mock.patch.object(converter, '_apply_incremental',
+                               side_effect=ValueError('Body does not match the cached structure')):
+            with self.assertNoLogs('services.document_converter.incremental_converter'):
+                parts = read_parts(converter.convert(after, doc_id='doc'))
+        self.assertEqual(self.full('python-docx', after), parts)
+
+    def test_unexpected_error_is_logged(self):
+        after = EDITS['modify']
+        converter = self.converter('python-docx')
+        converter.convert(BEFORE, doc_id='doc')
+        with mock.patch.object(converter, '_apply_incremental', side_effect=KeyError('rId9')):
+            with self.assertLogs('services.document_converter.incremental_converter', 'ERROR'):
+                parts = read_parts(converter.convert(after, doc_id='doc'))
+        self.assertEqual(self.full('python-docx', after), parts)
+
+
+if __name__ == '__main__':
+    unittest.main()
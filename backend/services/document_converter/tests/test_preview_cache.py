@@ -0,0 +1,78 @@
+"""
+Shared preview cache entries are plain JSON plus the package bytes.
+"""
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from services.document_converter import DiskPreviewCache, IncrementalConverter
+from services.document_converter.fragment_cache import FragmentCache
+from services.document_converter.incremental_converter import DocumentDiff, DocumentStructure
+from services.document_converter.tests.test_engines import LIST_HTML, STYLED_HTML, TABLE_HTML
+
+HTML = (
+    '<page-setup margin-top="1in" margin-left="2cm"></page-setup>'
+    '<header>Head</header><footer>Foot</footer>'
+    + STYLED_HTML + LIST_HTML + TABLE_HTML
+)
+
+
+def exploit():
+    raise AssertionError('cache entry was unpickled')
+
+
+class Exploit:
+    def __reduce__(self):
+        return exploit, ()
+
+
+class DiskPreviewCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        self.cache = DiskPreviewCache(self.cache_dir, 64 * 1024 * 1024)
+
+    def test_round_trip(self):
+        structure = DocumentStructure(HTML)
+        structure.block_counts = list(range(len(structure.elements)))
+        self.cache.put('doc', b'PK docx', structure)
+
+        docx, restored = self.cache.get('doc')
+        self.assertEqual(b'PK docx', docx)
+        self.assertEqual(structure.get_element_hashes(), restored.get_element_hashes())
+        self.assertEqual(structure.get_hash(), restored.get_hash())
+        self.assertEqual(structure.block_counts, restored.block_counts)
+        self.assertIsNotNone(restored.page_setup)
+        self.assertTrue(structure.same_section(restored))
+        self.assertEqual([], DocumentDiff().diff(restored, DocumentStructure(HTML)))
+
+    def test_incremental_preview_through_cache(self):
+        converter = IncrementalConverter(cache=self.cache, fragments=FragmentCache(0))
+        converter.convert(HTML, doc_id='doc')
+        with mock.patch.object(converter, '_convert_full',
+                               side_effect=AssertionError('converted in full')):
+            converter.convert(HTML.replace('Quoted', 'Quoted again'), doc_id='doc')
+
+    def test_pickled_entry_is_not_loaded(self):
+        path = self.cache._entry_path('doc')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(pickle.dumps((b'PK', Exploit())))
+        self.assertIsNone(self.cache.get('doc'))
+
+    def test_malformed_entry_is_a_miss(self):
+        for data in (b'', b'{}\nPK', b'[1, 2]\nPK', b'{"elements": [["nope", 0, "", "x"]]}\nPK'):
+            with self.subTest(data=data):
+                path = self.cache._entry_path('doc')
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as f:
+                    f.write(data)
+                self.assertIsNone(self.cache.get('doc'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+ConversionSandbox must turn runaway jobs into structured ConversionErrors.
+
+Jobs run in spawned worker processes, so they are module-level functions.
+"""
+import os
+import time
+import unittest
+
+from services.document_converter import ConversionError, ConversionSandbox
+from services.document_converter.sandbox import resource
+
+
+def echo(value):
+    return value
+
+
+def sleep(seconds):
+    time.sleep(seconds)
+
+
+def allocate(size):
+    return len(bytearray(size))
+
+
+def exit_hard(code):
+    os._exit(code)
+
+
+def fail():
+    raise RuntimeError('bad input')
+
+
+class ConversionSandboxTests(unittest.TestCase):
+
+    def setUp(self):
+        self.sandbox = ConversionSandbox(workers=1, timeout=20, max_memory_mb=512)
+        self.addCleanup(self.sandbox.shutdown)
+
+    def assertConversionError(self, code, fn, *args, **kwargs):
+        with self.assertRaises(ConversionError) as raised:
+            self.sandbox.call(fn, *args, **kwargs)
+        error = raised.exception
+        self.assertEqual(code, error.code)
+        self.assertEqual({'error': error.message, 'code': code}, error.to_dict())
+        return error
+
+    def test_result(self):
+        self.assertEqual({'a': [1, 2]}, self.sandbox.call(echo, {'a': [1, 2]}))
+
+    def test_timeout(self):
+        started = time.monotonic()
+        error = self.assertConversionError('timeout', sleep, 30, timeout=1)
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertIn('1 seconds', error.message)
+        # The killed worker is replaced
+        self.assertEqual('ok', self.sandbox.call(echo, 'ok'))
+
+    @unittest.skipIf(resource is None, 'memory limits need the resource module')
+    def test_memory(self):
+        self.assertConversionError('memory', allocate, 2 * 1024 * 1024 * 1024)
+        self.assertEqual(1024, self.sandbox.call(allocate, 1024))
+
+    def test_crashed(self):
+        error = self.assertConversionError('crashed', exit_hard, 3)
+        self.assertIn('exit code 3', error.message)
+        self.assertEqual('ok', self.sandbox.call(echo, 'ok'))
+
+    def test_failed(self):
+        error = self.assertConversionError('failed', fail)
+        self.assertEqual('RuntimeError: bad input', error.message)
+
+    def test_busy(self):
+        sandbox = ConversionSandbox(workers=0, timeout=0.1)
+        with self.assertRaises(ConversionError) as raised:
+            sandbox.call(echo, 'ok')
+        self.assertEqual('busy', raised.exception.code)
+
+
+if __name__ == '__main__':
+    unittest.main()
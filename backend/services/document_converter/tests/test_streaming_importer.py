@@ -0,0 +1,198 @@
+"""
+StreamingDocxImporter must write the same HTML as mammoth.convert_to_html.
+
+The importer drives private mammoth APIs block by block, so these cases
+cover state that crosses body blocks: list numbering, tables, images,
+complex fields spanning paragraphs, and notes referenced from the body.
+"""
+import os
+import shutil
+import zipfile
+import tempfile
+import unittest
+
+import mammoth
+from docx import Document
+from docx.enum.text import WD_BREAK
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from docx.shared import Inches
+
+from services.document_converter import StreamingDocxImporter
+from services.document_converter.tests.test_engines import PNG
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+
+# The default template only has single-level lists; this one nests bullets
+OUTLINE_NUM_ID = 90
+
+
+def add_outline_numbering(document):
+    numbering = document.part.numbering_part.element
+    levels = ''.join(
+        f'<w:lvl w:ilvl="{level}"><w:start w:val="1"/><w:numFmt w:val="bullet"/>'
+        f'<w:lvlText w:val="-"/></w:lvl>'
+        for level in range(2)
+    )
+    # abstractNum elements must come before the first num
+    numbering.find(f'{{{W_NS}}}num').addprevious(parse_xml(
+        f'<w:abstractNum {nsdecls("w")} w:abstractNumId="{OUTLINE_NUM_ID}">'
+        f'<w:multiLevelType w:val="multilevel"/>{levels}</w:abstractNum>'
+    ))
+    numbering.append(parse_xml(
+        f'<w:num {nsdecls("w")} w:numId="{OUTLINE_NUM_ID}">'
+        f'<w:abstractNumId w:val="{OUTLINE_NUM_ID}"/></w:num>'
+    ))
+
+
+def add_numbered(document, style, items, level=None):
+    """Add list paragraphs; with a level they use the outline numbering."""
+    for text in items:
+        paragraph = document.add_paragraph(text, style=style)
+        if level is not None:
+            paragraph._p.get_or_add_pPr().append(parse_xml(
+                f'<w:numPr {nsdecls("w")}><w:ilvl w:val="{level}"/>'
+                f'<w:numId w:val="{OUTLINE_NUM_ID}"/></w:numPr>'
+            ))
+
+
+def add_field(paragraph, instruction, text):
+    """Open a complex field in a paragraph; close_field ends it later."""
+    paragraph._p.append(parse_xml(f'<w:r {nsdecls("w")}><w:fldChar w:fldCharType="begin"/></w:r>'))
+    paragraph._p.append(parse_xml(
+        f'<w:r {nsdecls("w")}><w:instrText xml:space="preserve"> {instruction} </w:instrText></w:r>'
+    ))
+    paragraph._p.append(parse_xml(f'<w:r {nsdecls("w")}><w:fldChar w:fldCharType="separate"/></w:r>'))
+    paragraph.add_run(text)
+
+
+def close_field(paragraph, text):
+    paragraph.add_run(text)
+    paragraph._p.append(parse_xml(f'<w:r {nsdecls("w")}><w:fldChar w:fldCharType="end"/></w:r>'))
+
+
+def add_note_reference(paragraph, kind, note_id):
+    paragraph._p.append(parse_xml(
+        f'<w:r {nsdecls("w")}><w:{kind}Reference w:id="{note_id}"/></w:r>'
+    ))
+
+
+def build_document(path, blocks):
+    """Write a docx exercising every block kind, repeated blocks times."""
+    document = Document()
+    add_outline_numbering(document)
+    image_path = os.path.join(os.path.dirname(path), 'image.png')
+    with open(image_path, 'wb') as f:
+        f.write(PNG)
+
+    for i in range(blocks):
+        document.add_heading(f'Section {i}', level=1 + i % 3)
+        paragraph = document.add_paragraph(f'Paragraph {i} with ')
+        paragraph.add_run('bold').bold = True
+        paragraph.add_run(' and ')
+        paragraph.add_run('italic').italic = True
+        add_note_reference(paragraph, 'footnote', 1 + i % 2)
+
+        add_numbered(document, 'List Paragraph', [f'bullet {i}a', f'bullet {i}b'], level=0)
+        add_numbered(document, 'List Paragraph', [f'nested {i}'], level=1)
+        add_numbered(document, 'List Number', [f'step {i}.1', f'step {i}.2'])
+
+        table = document.add_table(rows=3, cols=3)
+        for r, row in enumerate(table.rows):
+            for c, cell in enumerate(row.cells):
+                cell.text = f'{i}:{r}{c}'
+        table.cell(0, 0).merge(table.cell(0, 1))
+        table.cell(1, 2).merge(table.cell(2, 2))
+
+        picture = document.add_paragraph('Figure: ')
+        picture.add_run().add_picture(image_path, width=Inches(0.5))
+
+        # A hyperlink field that starts in one paragraph and ends in the next
+        start = document.add_paragraph('Before link ')
+        add_field(start, f'HYPERLINK "https://example.com/{i}"', 'link starts')
+        end = document.add_paragraph()
+        close_field(end, 'link ends')
+        end.add_run(' after link')
+        add_note_reference(end, 'endnote', 1)
+        end.add_run().add_break(WD_BREAK.LINE)
+
+    document.save(path)
+    add_notes(path)
+
+
+def run(text):
+    return f'<w:r><w:t xml:space="preserve">{text}</w:t></w:r>'
+
+
+def add_notes(path):
+    """Add footnotes and endnotes parts, which python-docx cannot write."""
+    notes = {
+        'footnote': [
+            run('First footnote'),
+            run('Second ') + '<w:r><w:rPr><w:b/></w:rPr><w:t>bold</w:t></w:r>' + run(' footnote'),
+        ],
+        'endnote': [run('The endnote')],
+    }
+    temp_path = f'{path}.tmp'
+    with zipfile.ZipFile(path) as source, zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            data = source.read(item.filename)
+            if item.filename == '[Content_Types].xml':
+                overrides = ''.join(
+                    f'<Override PartName="/word/{kind}s.xml" ContentType="application/'
+                    f'vnd.openxmlformats-officedocument.wordprocessingml.{kind}s+xml"/>'
+                    for kind in notes
+                )
+                data = data.replace(b'</Types>', overrides.encode() + b'</Types>')
+            elif item.filename == 'word/_rels/document.xml.rels':
+                rels = ''.join(
+                    f'<Relationship Id="rIdNotes{kind}" Type="{REL_NS}/{kind}s" Target="{kind}s.xml"/>'
+                    for kind in notes
+                )
+                data = data.replace(b'</Relationships>', rels.encode() + b'</Relationships>')
+            target.writestr(item, data)
+        for kind, texts in notes.items():
+            body = ''.join(
+                f'<w:{kind} w:id="{note_id}"><w:p>{runs}</w:p></w:{kind}>'
+                for note_id, runs in enumerate(texts, start=1)
+            )
+            target.writestr(f'word/{kind}s.xml', f'<w:{kind}s xmlns:w="{W_NS}">{body}</w:{kind}s>')
+    os.replace(temp_path, path)
+
+
+class StreamingImporterTests(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+
+    def assertMatchesMammoth(self, path):
+        with open(path, 'rb') as f:
+            expected = mammoth.convert_to_html(f).value
+        self.assertEqual(expected, StreamingDocxImporter().convert_to_string(path))
+        return expected
+
+    def test_corpus(self):
+        for blocks in (1, 2, 5, 20):
+            with self.subTest(blocks=blocks):
+                path = os.path.join(self.temp_dir, f'corpus-{blocks}.docx')
+                build_document(path, blocks)
+                html = self.assertMatchesMammoth(path)
+                # The corpus must actually exercise every feature
+                for marker in ('<li>bullet 0b<ul><li>nested 0</li></ul></li>', '<ol><li>step 0.1',
+                               'rowspan="2"', 'colspan="2"', '<img', '<a href="https://example.com/0">link ends',
+                               'id="footnote-1"', 'id="endnote-1"'):
+                    self.assertIn(marker, html)
+                if blocks > 1:
+                    self.assertIn('<strong>bold</strong> footnote', html)
+
+    def test_empty_document(self):
+        path = os.path.join(self.temp_dir, 'empty.docx')
+        Document().save(path)
+        self.assertMatchesMammoth(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,31 +1,43 @@
 'use client';
 
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { ChevronLeft, ChevronRight, Loader2, AlertCircle } from 'lucide-react';
 import { api } from '@/lib/api';
 
 interface Slide {
   page: number;
   url: string;
+  thumbnail?: string;
+  srcset?: string;
 }
 
 interface PptPreviewProps {
   documentId: string;
 }
 
+// Interval between polls while slides are still rendering
+const POLL_INTERVAL_MS = 1500;
+
 export default function PptPreview({ documentId }: PptPreviewProps) {
   const [slides, setSlides] = useState<Slide[]>([]);
   const [currentSlide, setCurrentSlide] = useState(0);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const [rendering, setRendering] = useState(false);
+  const pollTimer = useRef<ReturnType<typeof setTimeout> | null>(null);
 
   useEffect(() => {
     loadSlides();
+    return () => {
+      if (pollTimer.current) clearTimeout(pollTimer.current);
+    };
   }, [documentId]);
 
-  const loadSlides = async () => {
-    setLoading(true);
-    setError(null);
+  const loadSlides = async (poll = false) => {
+    if (!poll) {
+      setLoading(true);
+      setError(null);
+    }
 
     try {
       const token = api.getToken();
@@ -40,10 +52,20 @@ export default function PptPreview({ documentId }: PptPreviewProps) {
       }
 
       const data = await response.json();
-      setSlides(data.slides || []);
+      const loaded: Slide[] = data.slides || [];
+      setSlides(loaded);
+
+      // Keep polling until the backend finishes rendering; show slides as they arrive
+      const stillRendering = data.status === 'rendering';
+      setRendering(stillRendering);
+      if (stillRendering) {
+        pollTimer.current = setTimeout(() => loadSlides(true), POLL_INTERVAL_MS);
+        if (loaded.length === 0) return;
+      }
+      setLoading(false);
     } catch (err: any) {
       setError(err.message || 'Failed to load PPT preview');
-    } finally {
+      setRendering(false);
       setLoading(false);
     }
   };
@@ -74,7 +96,7 @@ export default function PptPreview({ documentId }: PptPreviewProps) {
           <AlertCircle className="w-8 h-8 mx-auto mb-2" />
           <p className="text-sm">{error}</p>
           <button
-            onClick={loadSlides}
+            onClick={() => loadSlides()}
             className="mt-4 px-4 py-2 text-sm bg-primary text-primary-foreground rounded-lg hover:opacity-90"
           >
             Retry
@@ -98,6 +120,8 @@ export default function PptPreview({ documentId }: PptPreviewProps) {
       <div className="flex-1 flex items-center justify-center p-4 bg-secondary/30">
         <img
           src={slides[currentSlide]?.url}
+          srcSet={slides[currentSlide]?.srcset}
+          sizes="(max-width: 1280px) 100vw, 1280px"
           alt={`Slide ${currentSlide + 1}`}
           className="max-w-full max-h-full object-contain shadow-lg rounded"
         />
@@ -115,6 +139,7 @@ export default function PptPreview({ documentId }: PptPreviewProps) {
 
         <span className="text-sm">
           {currentSlide + 1} / {slides.length}
+          {rendering && <Loader2 className="inline w-3 h-3 ml-2 animate-spin" />}
         </span>
 
         <button
@@ -138,8 +163,9 @@ export default function PptPreview({ documentId }: PptPreviewProps) {
             `}
           >
             <img
-              src={slide.url}
+              src={slide.thumbnail || slide.url}
               alt={`Thumbnail ${index + 1}`}
+              loading="lazy"
               className="w-full h-full object-cover"
             />
           </button>